@@ -0,0 +1,223 @@
+"""
+Inference backends: which library turns 16 kHz PCM into segments.
+
+Every backend loads a model by name and returns the same result shape as
+openai-whisper's transcribe(): {"language": ..., "segments": [{"start", "end",
+"text", "words": [{"start", "end", "word"}] (only with word timestamps)}]}, so
+the cache, VAD, chunking and writers don't care which one ran. Backends are
+only imported when a model is loaded; is_installed() checks for the library
+with importlib.util.find_spec() without importing it.
+"""
+import importlib.util
+import os
+import threading
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import runcontrol
+
+DEFAULT_BACKEND = "whisper"
+
+
+class Backend(NamedTuple):
+    """load(name, device, dtype) -> model; transcribe(model, audio, language, word_timestamps) -> result dict."""
+    name: str
+    module: str # Library that has to be installed (checked without importing it)
+    load: object
+    transcribe: object
+    default_device: object # () -> device used when none is given
+    description: str
+    install_hint: str
+    batching: bool = False # Model works with batching.transcribe_batch() (openai-whisper models)
+    model_size: object = None # (model, name, device, dtype) -> bytes held, or None; see model_size_bytes()
+
+
+BACKENDS = {}
+
+# Parameters per Whisper size, for models whose library doesn't tell how much memory they hold
+PARAMETER_COUNTS = {"tiny": 39e6, "base": 74e6, "small": 244e6, "medium": 769e6, "large": 1550e6, "turbo": 809e6}
+UNKNOWN_SIZE = "small" # Assumed when the name doesn't say
+BYTES_PER_PARAMETER = {"int8": 1, "int8_float16": 1, "int8_bfloat16": 1, "int8_float32": 1, "int16": 2,
+                       "float16": 2, "bfloat16": 2, "float32": 4}
+
+
+def register_backend(backend: Backend):
+    """Adds (or replaces) a backend."""
+    BACKENDS[backend.name] = backend
+
+
+def is_installed(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(BACKENDS[name].module) is not None
+    except (KeyError, ImportError, ValueError):
+        return False
+
+
+def available_backends() -> list:
+    """Names of the registered backends whose library is installed."""
+    return [name for name in BACKENDS if is_installed(name)]
+
+
+def get_backend(name: str) -> Backend:
+    """
+    Raises:
+        ValueError: For an unknown or not installed backend (the message says how to install it).
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}' (choose from {', '.join(BACKENDS)})")
+    if not is_installed(name):
+        raise ValueError(f"Backend '{name}' is not installed. Please install it using: {BACKENDS[name].install_hint}")
+    return BACKENDS[name]
+
+
+def estimated_size_bytes(name: str, dtype=None) -> int:
+    """Rough memory use of a model from its name ('small.en', 'large-v3', '.../faster-whisper-medium') and dtype."""
+    base_name = os.path.basename(str(name).rstrip("/\\")).lower()
+    size = next((size for size in ("turbo", "large", "medium", "small", "base", "tiny") if size in base_name), UNKNOWN_SIZE)
+    return int(PARAMETER_COUNTS[size] * BYTES_PER_PARAMETER.get(dtype or "float32", 4))
+
+
+def model_size_bytes(model, name: str, device=None, dtype=None, backend: str = DEFAULT_BACKEND) -> int:
+    """Memory held by a loaded model: what its backend's model_size() reports, else estimated_size_bytes()."""
+    size_of = BACKENDS[backend].model_size if backend in BACKENDS else None
+    size = size_of(model, name, device, dtype) if size_of else None
+    return size if size else estimated_size_bytes(name, dtype)
+
+
+_stop_check = threading.local() # .check: the innermost interruptible() check of this thread
+
+
+def _check_stop():
+    check = getattr(_stop_check, "check", None)
+    if check:
+        check()
+
+
+@contextmanager
+def interruptible(model, should_stop=None):
+    """
+    Makes transcription with model stop (and pause) in the middle of a file: should_stop()
+    is polled before every forward pass of a PyTorch model's encoder and decoder, and
+    between the segments of backends that yield them (faster-whisper).
+
+    Raises:
+        runcontrol.Cancelled: From inside the block, once should_stop() returns True.
+    """
+    if should_stop is None:
+        yield
+        return
+
+    def check(*args):
+        if should_stop():
+            raise runcontrol.Cancelled("stopped during transcription")
+
+    handles = [module.register_forward_pre_hook(check)
+               for module in (getattr(model, "encoder", None), getattr(model, "decoder", None))
+               if hasattr(module, "register_forward_pre_hook")]
+    previous = getattr(_stop_check, "check", None)
+    _stop_check.check = check
+    try:
+        yield
+    finally:
+        _stop_check.check = previous
+        for handle in handles:
+            handle.remove()
+
+
+# --- openai-whisper (PyTorch) ---
+def _torch_device() -> str:
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _torch_model_size(model, name, device, dtype):
+    """Bytes of a PyTorch model's parameters and buffers, or None if it isn't a torch module."""
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+    except AttributeError:
+        return None
+    for module in model.modules() if hasattr(model, "modules") else ():
+        # Dynamically quantized Linear layers keep their int8 weights packed, outside parameters()
+        if callable(getattr(module, "weight", None)) and callable(getattr(module, "bias", None)):
+            tensors += [t for t in (module.weight(), module.bias()) if t is not None]
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def _load_whisper(name: str, device=None, dtype=None):
+    """whisper.load_model(), converted to half precision for dtype 'float16'."""
+    try:
+        import whisper
+    except ImportError as e:
+        raise ImportError("Could not import the 'whisper' library. "
+                          "Please install it using: pip install -U openai-whisper") from e
+    model = whisper.load_model(name, device=device)
+    if dtype == "float16":
+        model = model.half()
+    return model
+
+
+def _transcribe_whisper(model, audio, language, word_timestamps: bool) -> dict:
+    options = {"word_timestamps": True} if word_timestamps else {} # Add other options like fp16=False if needed
+    return model.transcribe(audio, language=language, **options, verbose=False) # verbose=False suppresses console output
+
+
+def _load_whisper_int8(name: str, device=None, dtype=None):
+    """openai-whisper with its Linear layers dynamically quantized to int8 (CPU only)."""
+    import torch
+    import whisper.model
+    if device not in (None, "cpu"):
+        raise ValueError("int8 quantized models only run on the CPU")
+    model = _load_whisper(name, "cpu")
+    # whisper's Linear only adds a dtype cast to forward(); quantize_dynamic only swaps plain nn.Linear
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+register_backend(Backend("whisper", "whisper", _load_whisper, _transcribe_whisper, _torch_device,
+                         "openai-whisper (PyTorch)", "pip install -U openai-whisper", batching=True,
+                         model_size=_torch_model_size))
+register_backend(Backend("whisper-int8", "whisper", _load_whisper_int8, _transcribe_whisper, lambda: "cpu",
+                         "openai-whisper, int8 quantized (CPU)", "pip install -U openai-whisper", batching=True,
+                         model_size=_torch_model_size))
+
+
+# --- faster-whisper (CTranslate2) ---
+def _ctranslate2_device() -> str:
+    import ctranslate2
+    return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+
+
+def _compute_type(device, dtype) -> str:
+    """CTranslate2 compute type: int8 on the CPU and float16 on CUDA unless dtype says otherwise."""
+    return dtype or ("float16" if device == "cuda" else "int8")
+
+
+def _load_faster_whisper(name: str, device=None, dtype=None):
+    """CTranslate2 model (see _compute_type)."""
+    from faster_whisper import WhisperModel
+    device = device or _ctranslate2_device()
+    return WhisperModel(name, device=device, compute_type=_compute_type(device, dtype))
+
+
+def _faster_whisper_size(model, name, device, dtype):
+    """CTranslate2 doesn't report its memory: estimated for the compute type in use."""
+    return estimated_size_bytes(name, _compute_type(device or _ctranslate2_device(), dtype))
+
+
+def _transcribe_faster_whisper(model, audio, language, word_timestamps: bool) -> dict:
+    segments, info = model.transcribe(audio, language=language, word_timestamps=word_timestamps)
+    result = {"language": info.language, "segments": []}
+    for segment in segments: # A generator: decoding happens while iterating
+        _check_stop()
+        entry = {"start": segment.start, "end": segment.end, "text": segment.text}
+        if word_timestamps:
+            entry["words"] = [{"start": word.start, "end": word.end, "word": word.word} for word in segment.words or ()]
+        result["segments"].append(entry)
+    return result
+
+
+register_backend(Backend("faster-whisper", "faster_whisper", _load_faster_whisper, _transcribe_faster_whisper,
+                         _ctranslate2_device, "faster-whisper (CTranslate2, int8 on CPU)",
+                         "pip install -U faster-whisper", model_size=_faster_whisper_size))
@@ -0,0 +1,105 @@
+"""
+Batched transcription of short files (up to one 30-second Whisper window each).
+
+Instead of one transcribe() call per file, the mel spectrograms of several
+files are stacked, encoded in one forward pass and decoded together with
+whisper.decode(), and the timestamp tokens of each result are turned back into
+per-file segments. Only greedy decoding at temperature 0 is batched: results
+that whisper.transcribe() would retry at a higher temperature (repetitive or
+low-confidence text) come back as None, so the caller can transcribe those
+files the normal way.
+"""
+from collections import defaultdict
+
+from decoder import SAMPLE_RATE
+
+MAX_SECONDS = 30 # One Whisper window
+DEFAULT_BATCH_SIZE = 8
+
+# Same thresholds as whisper.transcribe()
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+def fits(duration) -> bool:
+    """True if a file of this duration (seconds) fits in one batched window."""
+    return duration is not None and 0 < duration <= MAX_SECONDS
+
+
+def segments_from_tokens(tokens, tokenizer, duration: float) -> list:
+    """
+    Splits decoded tokens (<|t0|> text <|t1|><|t1|> text <|t2|>...) into Whisper-style
+    segments. Text without a closing timestamp ends at `duration`.
+    """
+    segments = []
+    start, last_time, text_tokens = None, 0.0, []
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            last_time = min((token - tokenizer.timestamp_begin) * 0.02, duration) # Timestamp tokens are 20 ms apart
+            if text_tokens:
+                segments.append({"start": last_time if start is None else start, "end": last_time,
+                                 "text": tokenizer.decode(text_tokens)})
+                start, text_tokens = None, []
+            else:
+                start = last_time
+        elif token < tokenizer.eot:
+            text_tokens.append(token)
+    if text_tokens:
+        segments.append({"start": last_time if start is None else start, "end": duration,
+                         "text": tokenizer.decode(text_tokens)})
+    return [segment for segment in segments if segment["text"].strip()]
+
+
+def _to_result(decoded, tokenizer, duration: float):
+    """Whisper-style result dict for one DecodingResult, or None if it needs the temperature fallback."""
+    if decoded.no_speech_prob > NO_SPEECH_THRESHOLD and decoded.avg_logprob < LOGPROB_THRESHOLD:
+        return {"segments": [], "language": decoded.language, "text": ""} # Silence
+    if decoded.compression_ratio > COMPRESSION_RATIO_THRESHOLD or decoded.avg_logprob < LOGPROB_THRESHOLD:
+        return None
+    segments = segments_from_tokens(decoded.tokens, tokenizer, duration)
+    return {"segments": segments, "language": decoded.language, "text": "".join(s["text"] for s in segments)}
+
+
+def transcribe_batch(model, audios, language=None, group_by_language: bool = False) -> list:
+    """
+    Transcribes several short 16 kHz float32 clips (see fits()) in one batch.
+
+    Args:
+        language: Language code, or None to detect it per clip.
+        group_by_language (bool): With auto-detect, detect the languages first and decode
+            each language group with its language fixed (the encoder still runs once).
+
+    Returns:
+        list: A Whisper-style result dict per clip, or None where the caller should fall
+            back to model.transcribe().
+    """
+    import torch
+    import whisper
+    from whisper.tokenizer import get_tokenizer
+
+    fp16 = model.device.type == "cuda" # Same default as whisper.transcribe()
+    dtype = torch.float16 if fp16 else torch.float32
+    mel = torch.stack([whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audio)), model.dims.n_mels)
+                       for audio in audios]).to(model.device, dtype)
+    durations = [len(audio) / SAMPLE_RATE for audio in audios]
+
+    results = [None] * len(audios)
+    with torch.no_grad():
+        features = model.encoder(mel)
+        if language is None and group_by_language and model.is_multilingual:
+            _, probs = model.detect_language(features)
+            groups = defaultdict(list)
+            for i, lang_probs in enumerate(probs):
+                groups[max(lang_probs, key=lang_probs.get)].append(i)
+        else:
+            groups = {language: list(range(len(audios)))} # Mixed languages are detected per clip by decode()
+
+        for group_language, indexes in groups.items():
+            options = whisper.DecodingOptions(language=group_language, task="transcribe", temperature=0.0, fp16=fp16)
+            decoded = whisper.decode(model, features[indexes], options)
+            for i, item in zip(indexes, decoded):
+                tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                                          language=item.language, task="transcribe")
+                results[i] = _to_result(item, tokenizer, durations[i])
+    return results
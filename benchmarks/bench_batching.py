@@ -0,0 +1,105 @@
+"""
+Throughput of batched vs one-by-one transcription of short clips on one model.
+
+Synthesizes short clips (tones and noise bursts, no audio files needed), then
+times model.transcribe() on each clip against batching.transcribe_batch() at
+several batch sizes, and prints files per second and the speedup.
+
+Usage:
+    python benchmarks/bench_batching.py [--model tiny] [--files 16] [--batch-sizes 2,4,8] [--json]
+
+--model also takes a path to a .pt checkpoint. CPU is used unless --device says otherwise.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import batching # noqa: E402
+import pipeline # noqa: E402
+
+
+def synth_clips(count: int, seconds: float, seed: int = 0) -> list:
+    """Deterministic clips of `seconds` each: a few tone bursts over low noise."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * batching.SAMPLE_RATE)
+    t = np.arange(n) / batching.SAMPLE_RATE
+    clips = []
+    for _ in range(count):
+        audio = rng.normal(0, 0.005, n)
+        for _ in range(3):
+            start = rng.uniform(0, seconds * 0.8)
+            mask = (t >= start) & (t < start + rng.uniform(0.5, 2.0))
+            audio[mask] += 0.3 * np.sin(2 * np.pi * rng.uniform(150, 600) * t[mask])
+        clips.append(audio.astype(np.float32))
+    return clips
+
+
+def bench(model, clips, batch_sizes, language) -> dict:
+    results = {"files": len(clips), "runs": []}
+    fp16 = model.device.type == "cuda"
+
+    started = time.perf_counter()
+    for clip in clips:
+        model.transcribe(clip, language=language, verbose=None, fp16=fp16)
+    sequential = time.perf_counter() - started
+    results["runs"].append({"batch_size": 1, "seconds": round(sequential, 3), "fallbacks": 0,
+                            "files_per_second": round(len(clips) / sequential, 2), "speedup": 1.0})
+
+    for batch_size in batch_sizes:
+        started = time.perf_counter()
+        fallbacks = 0
+        for i in range(0, len(clips), batch_size):
+            batch = clips[i:i + batch_size]
+            for clip, result in zip(batch, batching.transcribe_batch(model, batch, language)):
+                if result is None: # Same fallback as the pipeline
+                    model.transcribe(clip, language=language, verbose=None, fp16=fp16)
+                    fallbacks += 1
+        elapsed = time.perf_counter() - started
+        results["runs"].append({"batch_size": batch_size, "seconds": round(elapsed, 3), "fallbacks": fallbacks,
+                                "files_per_second": round(len(clips) / elapsed, 2),
+                                "speedup": round(sequential / elapsed, 2)})
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="tiny", help="Whisper model name or checkpoint path (default: tiny)")
+    parser.add_argument("--device", default="cpu", help="torch device (default: cpu)")
+    parser.add_argument("--files", type=int, default=16, help="number of clips (default: 16)")
+    parser.add_argument("--seconds", type=float, default=20.0, help="length of each clip (default: 20)")
+    parser.add_argument("--batch-sizes", default="2,4,8", help="comma-separated batch sizes (default: 2,4,8)")
+    parser.add_argument("--language", default="en", help="language code or 'auto' (default: en)")
+    parser.add_argument("-t", "--threads", type=int, default=None, help="torch threads (default: torch default)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",") if size.strip()]
+    if args.seconds > batching.MAX_SECONDS:
+        parser.error(f"--seconds must be at most {batching.MAX_SECONDS}")
+
+    pipeline.set_torch_threads(args.threads)
+    model = pipeline.load_whisper_model(args.model, device=args.device)
+    clips = synth_clips(args.files, args.seconds)
+    language = pipeline.normalize_language(args.language)
+    model.transcribe(clips[0], language=language, verbose=None, fp16=args.device == "cuda") # Warm-up
+
+    results = bench(model, clips, batch_sizes, language)
+    results.update(model=args.model, device=args.device, seconds_per_file=args.seconds)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{results['files']} clips of {args.seconds:g} s, model {args.model} on {args.device}")
+        for run in results["runs"]:
+            print(f"  batch {run['batch_size']:3d}: {run['seconds']:8.2f} s  {run['files_per_second']:7.2f} files/s  "
+                  f"x{run['speedup']:.2f}  ({run['fallbacks']} fell back)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""
+Stage-by-stage benchmark of the transcription pipeline and the SRT/LRC conversion path.
+
+Generates its fixtures offline in a temporary directory: WAV files (tones,
+noise, silence and a mix, spread over nested folders) and a corpus of large
+SRT files. Then it times each stage on its own (directory scan, ffmpeg decode,
+model load, transcribe, generate_srt_content, srt_to_lrc.srt_to_lrc and
+output writes) and whole pipeline.transcribe_folder() runs for every
+combination of --models and --workers, and reports throughput (audio seconds
+per wall second, files per minute) and peak RSS.
+
+The default 'stub' backend returns canned segments without any model, so
+everything but inference can be benchmarked without downloading weights;
+--stub-rtf makes it sleep for that fraction of the audio length to mimic a
+model. Use --backend whisper --models tiny,base to measure real inference.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--files 24] [--workers 1,2] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import backends # noqa: E402
+import decoder # noqa: E402
+import pipeline # noqa: E402
+import scanner # noqa: E402
+import srt_to_lrc # noqa: E402
+import subtitles # noqa: E402
+
+SAMPLE_RATE = decoder.SAMPLE_RATE
+FIXTURE_KINDS = ("tone", "noise", "silence", "mix")
+
+
+# --- Stub Backend (no model weights) ---
+class StubModel:
+    def __init__(self, name: str):
+        self.name = name
+
+
+def _stub_transcribe(model, audio, language, word_timestamps: bool) -> dict:
+    """A segment every 2.5 s of audio, optionally with word timings; sleeps STUB_RTF x the audio length."""
+    duration = len(audio) / SAMPLE_RATE
+    if STUB_RTF:
+        time.sleep(duration * STUB_RTF)
+    segments = []
+    for i, start in enumerate(np.arange(0.0, duration, 2.5).tolist()):
+        end = min(duration, start + 2.0)
+        segment = {"start": start, "end": end, "text": f" synthetic line {i} of {model.name}"}
+        if word_timestamps:
+            words = segment["text"].split()
+            step = (end - start) / len(words)
+            segment["words"] = [{"start": start + j * step, "end": start + (j + 1) * step, "word": " " + word}
+                                for j, word in enumerate(words)]
+        segments.append(segment)
+    return {"language": language or "en", "segments": segments}
+
+
+# Module level, so spawned worker processes (which import this script as __mp_main__) know it too
+STUB_RTF = float(os.environ.get("AUTO2LRC_BENCH_STUB_RTF", "0"))
+backends.register_backend(backends.Backend("stub", "numpy", lambda name, device, dtype: StubModel(name),
+                                           _stub_transcribe, lambda: "cpu", "Stub (benchmarks only)", "-"))
+
+
+# --- Fixtures ---
+def synth_audio(kind: str, seconds: float, rng) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    if kind == "tone":
+        audio = 0.3 * np.sin(2 * np.pi * rng.uniform(150, 800) * t)
+    elif kind == "noise":
+        audio = rng.normal(0, 0.1, len(t))
+    elif kind == "silence":
+        audio = np.zeros(len(t))
+    else: # Tone bursts over low noise
+        audio = rng.normal(0, 0.005, len(t))
+        for start in np.arange(0, seconds, 4.0):
+            mask = (t >= start) & (t < start + 2.0)
+            audio[mask] += 0.3 * np.sin(2 * np.pi * rng.uniform(150, 800) * t[mask])
+    return np.clip(audio, -1.0, 1.0)
+
+
+def write_wav(path: Path, audio: np.ndarray):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((audio * 32767).astype("<i2").tobytes())
+
+
+def make_audio_fixtures(root: Path, files: int, seconds: float, dirs: int, seed: int = 0) -> float:
+    """Writes `files` WAVs of varying length under root/<dir>/; returns the total audio seconds."""
+    rng = np.random.default_rng(seed)
+    total = 0.0
+    for i in range(files):
+        folder = root / f"album{i % max(1, dirs):03d}" / ("disc2" if i % 3 == 2 else "")
+        folder.mkdir(parents=True, exist_ok=True)
+        length = round(seconds * rng.uniform(0.5, 1.5), 2)
+        kind = FIXTURE_KINDS[i % len(FIXTURE_KINDS)]
+        write_wav(folder / f"{i:04d}_{kind}.wav", synth_audio(kind, length, rng))
+        total += length
+    return total
+
+
+def synth_segments(count: int) -> list:
+    return [{"start": i * 2.5, "end": i * 2.5 + 2.0, "text": f" Synthetic subtitle line number {i}, with some words"}
+            for i in range(count)]
+
+
+def make_srt_corpus(root: Path, files: int, cues: int) -> int:
+    """Writes `files` SRT files of `cues` cues each; returns the total size in bytes."""
+    root.mkdir(parents=True, exist_ok=True)
+    content = subtitles.format_srt(subtitles.cues_from_segments(synth_segments(cues)))
+    for i in range(files):
+        (root / f"{i:04d}.srt").write_text(content, encoding="utf-8")
+    return len(content.encode("utf-8")) * files
+
+
+# --- Measurements ---
+def peak_rss_mb() -> dict:
+    """Peak resident set size of this process and of its finished children (None where unsupported)."""
+    try:
+        import resource
+    except ImportError: # Windows
+        return {"self": None, "children": None}
+    scale = 1 if sys.platform == "darwin" else 1024 # ru_maxrss is in bytes on macOS, KiB elsewhere
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 2 ** 20, 1),
+    }
+
+
+def timed(function, *args, **kwargs) -> tuple:
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def rate(amount, seconds: float):
+    return round(amount / seconds, 2) if seconds > 0 else None
+
+
+def clear_outputs(root: Path):
+    suffixes = tuple(writer.suffix for writer in subtitles.WRITERS.values())
+    for path in root.rglob("*"):
+        if path.name.endswith(suffixes):
+            path.unlink()
+
+
+def bench_stages(audio_dir: Path, srt_dir: Path, args) -> dict:
+    stages = {}
+    formats = subtitles.parse_formats(args.formats)
+
+    files, seconds = timed(lambda: list(scanner.iter_audio_files(audio_dir, pipeline.AUDIO_EXTENSIONS,
+                                                                 subtitles.output_suffixes(formats))))
+    stages["scan"] = {"seconds": round(seconds, 4), "files": len(files), "files_per_second": rate(len(files), seconds)}
+
+    decoded, seconds = timed(lambda: [decoder.decode(path) for path in files])
+    audio_seconds = sum(item.duration or 0 for item in decoded)
+    stages["decode"] = {"seconds": round(seconds, 3), "files": len(decoded), "audio_seconds": round(audio_seconds, 1),
+                        "audio_seconds_per_second": rate(audio_seconds, seconds),
+                        "errors": sum(1 for item in decoded if item.error)}
+
+    backend = backends.get_backend(args.backend)
+    word_timestamps = subtitles.needs_word_timestamps(formats)
+    stages["model_load"], stages["transcribe"] = {}, {}
+    results = []
+    for model_name in args.models:
+        model, seconds = timed(backend.load, model_name, None, None)
+        stages["model_load"][model_name] = {"seconds": round(seconds, 3)}
+        results, seconds = timed(lambda: [backend.transcribe(model, item.audio, args.language, word_timestamps)
+                                          for item in decoded if not item.error])
+        stages["transcribe"][model_name] = {"seconds": round(seconds, 3), "files": len(results),
+                                            "audio_seconds_per_second": rate(audio_seconds, seconds)}
+        del model
+
+    big_result = {"segments": synth_segments(args.srt_cues)}
+    _, seconds = timed(lambda: [pipeline.generate_srt_content(result) for result in results])
+    _, big_seconds = timed(pipeline.generate_srt_content, big_result)
+    stages["generate_srt_content"] = {"seconds": round(seconds, 4), "files": len(results),
+                                      "large_result_cues": args.srt_cues, "large_result_seconds": round(big_seconds, 4),
+                                      "cues_per_second": rate(args.srt_cues, big_seconds)}
+
+    srt_files = sorted(srt_dir.glob("*.srt"))
+    srt_bytes = sum(path.stat().st_size for path in srt_files)
+    converted, seconds = timed(lambda: [srt_to_lrc.srt_to_lrc(path) for path in srt_files]) # Deletes the SRTs
+    stages["srt_to_lrc"] = {"seconds": round(seconds, 3), "files": len(srt_files),
+                            "failed": sum(1 for path in converted if path is None),
+                            "cues_per_second": rate(len(srt_files) * args.srt_cues, seconds),
+                            "mb_per_second": rate(srt_bytes / 2 ** 20, seconds)}
+
+    cues = [subtitles.cues_from_segments(result["segments"]) for result in results]
+    items = [item for item in decoded if not item.error]
+    _, seconds = timed(lambda: [subtitles.write_outputs(item.path, file_cues, formats, {"language": args.language})
+                                for item, file_cues in zip(items, cues)])
+    stages["write_outputs"] = {"seconds": round(seconds, 4), "files": len(items) * len(formats),
+                               "files_per_second": rate(len(items) * len(formats), seconds)}
+    clear_outputs(audio_dir)
+    return stages
+
+
+def bench_runs(audio_dir: Path, audio_seconds: float, args) -> list:
+    """Whole transcribe_folder() runs for every model x worker count (no cache, no manifest)."""
+    runs = []
+    for model_name in args.models:
+        for workers in args.workers:
+            clear_outputs(audio_dir)
+            summary, seconds = timed(pipeline.transcribe_folder, audio_dir, model_name, args.language,
+                                     backend=args.backend, formats=args.formats, use_cache=False, use_manifest=False,
+                                     workers=workers, keep_model=False)
+            runs.append({"model": model_name, "workers": workers, "status": summary["status"],
+                         "succeeded": summary["succeeded"], "failed": summary["failed"], "seconds": round(seconds, 3),
+                         "files_per_minute": rate(summary["succeeded"] * 60, seconds),
+                         "audio_seconds_per_second": rate(audio_seconds, seconds), "peak_rss_mb": peak_rss_mb()})
+    clear_outputs(audio_dir)
+    return runs
+
+
+def environment() -> dict:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                  cwd=Path(__file__).resolve().parent).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), "revision": revision,
+            "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()}
+
+
+def print_report(report: dict):
+    fixtures, stages = report["fixtures"], report["stages"]
+    print(f"{fixtures['audio_files']} audio files ({fixtures['audio_seconds']:.0f} s), "
+          f"{fixtures['srt_files']} SRT files x {fixtures['srt_cues']} cues, backend {report['backend']}")
+    print(f"  scan                 {stages['scan']['seconds']:9.4f} s  {stages['scan']['files_per_second']} files/s")
+    print(f"  decode               {stages['decode']['seconds']:9.3f} s  "
+          f"{stages['decode']['audio_seconds_per_second']} audio s/s")
+    for model_name, load in stages["model_load"].items():
+        transcribe = stages["transcribe"][model_name]
+        print(f"  model load {model_name:<10}{load['seconds']:9.3f} s")
+        print(f"  transcribe {model_name:<10}{transcribe['seconds']:9.3f} s  "
+              f"{transcribe['audio_seconds_per_second']} audio s/s")
+    generate = stages["generate_srt_content"]
+    print(f"  generate_srt_content {generate['large_result_seconds']:9.4f} s  {generate['cues_per_second']} cues/s")
+    print(f"  srt_to_lrc           {stages['srt_to_lrc']['seconds']:9.3f} s  {stages['srt_to_lrc']['mb_per_second']} MB/s")
+    print(f"  write_outputs        {stages['write_outputs']['seconds']:9.4f} s  "
+          f"{stages['write_outputs']['files_per_second']} files/s")
+    for run in report["runs"]:
+        print(f"  run {run['model']} x{run['workers']:<3} {run['seconds']:9.3f} s  {run['files_per_minute']} files/min  "
+              f"{run['audio_seconds_per_second']} audio s/s  "
+              f"peak RSS {run['peak_rss_mb']['self']}/{run['peak_rss_mb']['children']} MB (self/children)")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", default="stub", help="backend to benchmark (default: stub, no model needed)")
+    parser.add_argument("--models", default="stub", help="comma-separated model names or paths (default: stub)")
+    parser.add_argument("--workers", default="1,2", help="comma-separated worker counts for the full runs (default: 1,2)")
+    parser.add_argument("--files", type=int, default=24, help="number of audio fixtures (default: 24)")
+    parser.add_argument("--seconds", type=float, default=20.0, help="average fixture length (default: 20)")
+    parser.add_argument("--dirs", type=int, default=6, help="folders the fixtures are spread over (default: 6)")
+    parser.add_argument("--srt-files", type=int, default=20, help="number of SRT files (default: 20)")
+    parser.add_argument("--srt-cues", type=int, default=5000, help="cues per SRT file (default: 5000)")
+    parser.add_argument("--formats", default="lrc,srt", help="output formats (default: lrc,srt)")
+    parser.add_argument("--language", default="en", help="language passed to the model (default: en)")
+    parser.add_argument("--stub-rtf", type=float, default=None,
+                        help="stub backend sleeps this fraction of the audio length per file (default: 0)")
+    parser.add_argument("--keep-fixtures", type=Path, default=None,
+                        help="generate the fixtures in this folder and keep them (default: a temporary folder)")
+    parser.add_argument("--output", type=Path, default=None, help="also write the JSON report to this file")
+    parser.add_argument("--json", action="store_true", help="print the JSON report instead of a table")
+    args = parser.parse_args(argv)
+    args.models = [name.strip() for name in args.models.split(",") if name.strip()]
+    args.workers = [int(count) for count in args.workers.split(",") if count.strip()]
+
+    global STUB_RTF
+    if args.stub_rtf is not None:
+        STUB_RTF = args.stub_rtf
+        os.environ["AUTO2LRC_BENCH_STUB_RTF"] = str(args.stub_rtf) # Inherited by worker processes
+    if not pipeline.check_ffmpeg():
+        parser.error("FFmpeg not found in PATH (needed for the decode stage)")
+    try:
+        backends.get_backend(args.backend)
+    except ValueError as e:
+        parser.error(str(e))
+
+    root = args.keep_fixtures or Path(tempfile.mkdtemp(prefix="auto2lrc-bench-"))
+    try:
+        audio_dir, srt_dir = root / "audio", root / "srt"
+        audio_seconds = make_audio_fixtures(audio_dir, args.files, args.seconds, args.dirs)
+        make_srt_corpus(srt_dir, args.srt_files, args.srt_cues)
+        report = {
+            "environment": environment(),
+            "backend": args.backend,
+            "fixtures": {"audio_files": args.files, "audio_seconds": round(audio_seconds, 1),
+                         "srt_files": args.srt_files, "srt_cues": args.srt_cues, "formats": args.formats},
+            "stages": bench_stages(audio_dir, srt_dir, args),
+            "runs": bench_runs(audio_dir, audio_seconds, args),
+        }
+        report["peak_rss_mb"] = peak_rss_mb()
+    finally:
+        if args.keep_fixtures is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
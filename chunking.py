@@ -0,0 +1,160 @@
+"""
+Chunked transcription of long audio (podcasts, DJ mixes).
+
+The decoded audio is cut into fixed windows that overlap a little, and each
+window is transcribed on its own, so memory doesn't grow with the file, progress
+moves per chunk and a Stop takes effect after the current chunk. Segments of
+neighbouring chunks are stitched on segment boundaries inside their overlap,
+which drops the lines both chunks transcribed without losing the ones that run
+across a chunk boundary. Every finished chunk is checkpointed, so
+an interrupted file resumes at the first missing chunk on the next run.
+"""
+import gzip
+import json
+import shutil
+from pathlib import Path
+
+import result_cache
+import runcontrol
+import subtitles
+from decoder import SAMPLE_RATE
+
+DEFAULT_CHUNK_SECONDS = 60
+DEFAULT_OVERLAP_SECONDS = 4
+STITCH_TOLERANCE_SECONDS = 0.2 # A segment of the next chunk may start this much before the last kept end
+
+
+class Cancelled(runcontrol.Cancelled):
+    """should_stop() returned True between two chunks."""
+
+    def __init__(self, done: int, total: int):
+        super().__init__(f"stopped after chunk {done}/{total}, finished chunks are kept for the next run")
+        self.done = done
+        self.total = total
+
+
+def chunk_windows(n_samples: int, chunk_samples: int, overlap_samples: int) -> list:
+    """(start, end) sample windows covering n_samples, each overlapping the previous one."""
+    overlap_samples = min(overlap_samples, chunk_samples // 2)
+    windows = []
+    start = 0
+    while True:
+        end = min(n_samples, start + chunk_samples)
+        windows.append((start, end))
+        if end >= n_samples:
+            return windows
+        start = end - overlap_samples
+
+
+def _shifted(segment: dict, offset: float) -> dict:
+    segment = dict(segment, start=segment["start"] + offset, end=segment["end"] + offset)
+    if segment.get("words"):
+        segment["words"] = [dict(word, start=word["start"] + offset, end=word["end"] + offset)
+                            for word in segment["words"]]
+    return segment
+
+
+def _clamped(segment: dict, earliest: float) -> dict:
+    """segment with no time before earliest (so it can't overlap the segment kept before it)."""
+    if segment["start"] >= earliest:
+        return segment
+    segment = dict(segment, start=earliest, end=max(segment["end"], earliest))
+    if segment.get("words"):
+        segment["words"] = [dict(word, start=max(word["start"], earliest), end=max(word["end"], earliest))
+                            for word in segment["words"]]
+    return segment
+
+
+def stitch(results, windows, sample_rate: int = SAMPLE_RATE) -> dict:
+    """
+    Joins per-chunk results into one, cutting on segment boundaries inside each overlap.
+    Chunk i keeps its segments that end by the middle of its overlap with chunk i+1, and a
+    segment running past that point only if most of it lies before chunk i+1 starts (so
+    chunk i+1 couldn't hear it). Chunk i+1 then goes on with its first segment that starts
+    at (or within STITCH_TOLERANCE_SECONDS of) the last kept end; if that segment was cut
+    off by the start of its window, it gets the start of chunk i's copy of the line back.
+    Times are clamped so segments never overlap.
+    """
+    segments = []
+    last_end = float("-inf")
+    carried_start = None # Start of the line chunk i left to chunk i+1
+    for i, (result, (start, end)) in enumerate(zip(results, windows)):
+        window_start = start / sample_rate
+        if i + 1 < len(windows):
+            next_start = windows[i + 1][0] / sample_rate
+            cut = (end / sample_rate + next_start) / 2
+        else:
+            next_start = cut = float("inf")
+        for segment in result["segments"]:
+            segment = _shifted(segment, window_start)
+            if segment["start"] < last_end - STITCH_TOLERANCE_SECONDS:
+                continue # The previous chunk already has this part
+            if segment["end"] > cut and (segment["start"] + segment["end"]) / 2 >= next_start:
+                carried_start = segment["start"]
+                break # The next chunk heard (most of) this and everything after it
+            if carried_start is not None and segment["start"] <= window_start + STITCH_TOLERANCE_SECONDS:
+                segment = dict(segment, start=carried_start) # The line began before this window
+            carried_start = None
+            segment = _clamped(segment, last_end)
+            segments.append(segment)
+            last_end = max(last_end, segment["end"])
+    language = next((result.get("language") for result in results if result.get("language")), None)
+    return {"language": language, "segments": segments}
+
+
+class Checkpoints:
+    """Finished chunk results of one file (gzip JSON per chunk) in their own directory."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _path(self, index: int) -> Path:
+        return self.directory / f"{index:05d}.json.gz"
+
+    def load(self, index: int):
+        try:
+            with gzip.open(self._path(index), 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError, EOFError):
+            return None
+
+    def save(self, index: int, result: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(result_cache.compact_result(result), ensure_ascii=False, default=float)
+        subtitles.write_atomic(self._path(index), gzip.compress(data.encode("utf-8")))
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def transcribe_chunked(transcribe, audio, language=None, checkpoints=None,
+                       chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+                       overlap_seconds: float = DEFAULT_OVERLAP_SECONDS,
+                       on_chunk=None, should_stop=None) -> dict:
+    """
+    Transcribes audio window by window with transcribe(samples, language) -> Whisper result.
+    With auto-detect, the language found in the first chunk is used for the rest.
+
+    Args:
+        checkpoints: Checkpoints to resume from and save to (None: no checkpointing).
+        on_chunk: Called as on_chunk(done, total) after each chunk.
+        should_stop: Polled before each chunk.
+
+    Raises:
+        Cancelled: should_stop() returned True; finished chunks are checkpointed.
+    """
+    windows = chunk_windows(len(audio), int(chunk_seconds * SAMPLE_RATE), int(overlap_seconds * SAMPLE_RATE))
+    results = []
+    for index, (start, end) in enumerate(windows):
+        result = checkpoints.load(index) if checkpoints else None
+        if result is None:
+            if should_stop and should_stop():
+                raise Cancelled(index, len(windows))
+            result = transcribe(audio[start:end], language)
+            if checkpoints:
+                checkpoints.save(index, result)
+        language = language or result.get("language")
+        results.append(result)
+        if on_chunk:
+            on_chunk(index + 1, len(windows))
+    return stitch(results, windows)
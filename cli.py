@@ -0,0 +1,250 @@
+"""
+Headless command line entry point (no PyQt5 required).
+
+Usage:
+    python -m cli <folder> [--model base] [--backend faster-whisper] [--language en] [--formats lrc,srt] [--json]
+    python -m cli <folder> --watch [--settle-seconds 2] [--idle-unload 300]
+
+Exit codes:
+    0  every file was transcribed (or there was nothing to do)
+    1  at least one file failed
+    2  setup error (bad arguments, FFmpeg/backend missing, model failed to load)
+    3  the run was cancelled (Ctrl+C)
+"""
+import argparse
+import json
+import multiprocessing
+import signal
+import sys
+from pathlib import Path
+
+import backends
+import chunking
+import metrics
+import pipeline
+import routing
+import runcontrol
+import subtitles
+import watcher
+
+EXIT_OK = 0
+EXIT_FILE_ERRORS = 1
+EXIT_SETUP_ERROR = 2
+EXIT_CANCELLED = 3
+
+def exit_code_for(summary: dict) -> int:
+    """Maps a pipeline run summary to the CLI exit code."""
+    if summary["status"] == pipeline.RUN_FAILED:
+        return EXIT_SETUP_ERROR
+    if summary["status"] == pipeline.RUN_CANCELLED:
+        return EXIT_CANCELLED
+    if summary["failed"]:
+        return EXIT_FILE_ERRORS
+    return EXIT_OK
+
+
+def formats_arg(value: str) -> tuple:
+    try:
+        return subtitles.parse_formats(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m cli",
+        description="Transcribe every audio file in a folder (recursively) to .lrc (and other formats) using Whisper.")
+    parser.add_argument("folder", type=Path, help="folder containing audio files")
+    parser.add_argument("-m", "--model", default="base", choices=pipeline.MODEL_NAMES, help="Whisper model (default: base)")
+    parser.add_argument("-b", "--backend", default=backends.DEFAULT_BACKEND, choices=list(backends.BACKENDS),
+                        help="inference library: 'whisper' (PyTorch), 'whisper-int8' (quantized, CPU) or "
+                             "'faster-whisper' (CTranslate2, int8 on CPU) (default: whisper)")
+    parser.add_argument("-l", "--language", default="auto", help="language code such as 'en' or 'ja', or 'auto' (default)")
+    parser.add_argument("-f", "--formats", type=formats_arg, default=subtitles.DEFAULT_FORMATS,
+                        help=f"comma-separated output formats: {', '.join(subtitles.WRITERS)} (default: lrc)")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="number of worker processes, each with its own model (default: 1)")
+    parser.add_argument("-t", "--threads", type=int, default=None,
+                        help="torch threads per process (default: cores / workers)")
+    parser.add_argument("--manifest", type=Path, default=None,
+                        help="manifest database (default: <folder>/.auto2lrc/manifest.sqlite3)")
+    parser.add_argument("--no-manifest", action="store_true",
+                        help="don't use a manifest; skip files that already have their outputs next to them")
+    parser.add_argument("--requeue-weaker", action="store_true",
+                        help="redo files whose .lrc was made with a weaker model than --model")
+    parser.add_argument("--hash", action="store_true",
+                        help="record content hashes so touched or copied files aren't redone")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="don't reuse or store raw transcription results in the result cache")
+    parser.add_argument("--cache-dir", type=Path, default=None,
+                        help="result cache directory (default: <user cache dir>/whisper_auto2lrc/results)")
+    parser.add_argument("--vad", action="store_true",
+                        help="detect speech first and only transcribe those parts (skips silence)")
+    parser.add_argument("--chunk-seconds", type=int, default=None,
+                        help="transcribe files longer than this in overlapping chunks of this many seconds, "
+                             "with per-chunk progress and resume after an interruption (default: off)")
+    parser.add_argument("--prefetch", type=int, default=2,
+                        help="files decoded ahead of the one being transcribed (default: 2)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="transcribe up to this many short files (30 s or less) in one batch; "
+                             "single process only (default: 1, no batching)")
+    parser.add_argument("--group-language", action="store_true",
+                        help="with --batch-size and auto-detect, decode each detected language of a batch separately")
+    parser.add_argument("--route-languages", action="store_true",
+                        help="detect each file's language first and transcribe English with the .en model of the "
+                             "same size, other languages with the multilingual one")
+    parser.add_argument("--route", default=None, metavar="LANG=MODEL,...",
+                        help="extra routes for --route-languages, e.g. en=small.en,ja=medium")
+    parser.add_argument("--detect-model", default=routing.DEFAULT_DETECT_MODEL,
+                        choices=[name for name in pipeline.MODEL_NAMES if not routing.is_english_only(name)],
+                        help=f"model for the language pre-pass (default: {routing.DEFAULT_DETECT_MODEL})")
+    parser.add_argument("--scan-threads", type=int, default=8,
+                        help="threads listing directories in parallel (default: 8)")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and transcribe audio files as they are added or changed, until Ctrl+C "
+                             "(one process; --batch-size and --prefetch don't apply)")
+    parser.add_argument("--settle-seconds", type=float, default=watcher.DEFAULT_SETTLE_SECONDS,
+                        help=f"--watch: queue a file once its size stayed the same this long "
+                             f"(default: {watcher.DEFAULT_SETTLE_SECONDS:g})")
+    parser.add_argument("--idle-unload", type=float, default=watcher.DEFAULT_IDLE_UNLOAD_SECONDS,
+                        help=f"--watch: unload the model after this many seconds without new files, 0 keeps it "
+                             f"(default: {watcher.DEFAULT_IDLE_UNLOAD_SECONDS:g})")
+    parser.add_argument("--max-queued", type=int, default=watcher.DEFAULT_MAX_QUEUED,
+                        help=f"--watch: settled files waiting for transcription before new ones are held back "
+                             f"(default: {watcher.DEFAULT_MAX_QUEUED})")
+    parser.add_argument("--poll", action="store_true",
+                        help="--watch: rescan the folder instead of using filesystem events (e.g. network shares)")
+    parser.add_argument("--poll-seconds", type=float, default=watcher.DEFAULT_POLL_SECONDS,
+                        help=f"--watch: rescan interval when polling (default: {watcher.DEFAULT_POLL_SECONDS:g})")
+    parser.add_argument("--json", action="store_true", help="print the run summary as JSON on stdout")
+    parser.add_argument("--summary-file", type=Path, help="also write the JSON run summary to this file")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only report errors on stderr")
+    parser.add_argument("--metrics-jsonl", type=Path, default=None,
+                        help="append per-stage timing spans, counters and gauges to this file as JSON lines")
+    parser.add_argument("--metrics-prom", type=Path, default=None,
+                        help="keep Prometheus text-format metrics in this file (e.g. for a textfile collector)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics during the run")
+    return parser
+
+
+def start_metrics(args) -> list:
+    """Attaches the requested metrics exporters to metrics.default; returns their close functions."""
+    closers = []
+    try:
+        if args.metrics_jsonl:
+            sink = metrics.JsonlSink(args.metrics_jsonl)
+            metrics.default.add_sink(sink)
+            closers.append(lambda: (metrics.default.remove_sink(sink), sink.close()))
+        if args.metrics_prom:
+            closers.append(metrics.PrometheusFile(metrics.default, args.metrics_prom).close)
+        if args.metrics_port is not None:
+            closers.append(metrics.serve_prometheus(metrics.default, args.metrics_port).close)
+    except OSError:
+        for close in reversed(closers):
+            close()
+        raise
+    return closers
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if not args.folder.is_dir():
+        print(f"Error: Selected path is not a valid folder: {args.folder}", file=sys.stderr)
+        return EXIT_SETUP_ERROR
+    if (args.workers < 1 or args.scan_threads < 1 or args.prefetch < 1 or args.batch_size < 1
+            or (args.threads is not None and args.threads < 1)):
+        print("Error: --workers, --threads, --prefetch, --batch-size and --scan-threads must be at least 1.",
+              file=sys.stderr)
+        return EXIT_SETUP_ERROR
+    if args.watch and (args.workers > 1 or args.max_queued < 1 or args.settle_seconds < 0 or args.poll_seconds <= 0):
+        print("Error: --watch runs in one process (--workers 1) and needs --max-queued of at least 1.",
+              file=sys.stderr)
+        return EXIT_SETUP_ERROR
+    if args.chunk_seconds is not None and args.chunk_seconds < 2 * chunking.DEFAULT_OVERLAP_SECONDS:
+        print(f"Error: --chunk-seconds must be at least {2 * chunking.DEFAULT_OVERLAP_SECONDS}.", file=sys.stderr)
+        return EXIT_SETUP_ERROR
+    if not backends.is_installed(args.backend):
+        print(f"Error: Backend '{args.backend}' is not installed. Please install it using: "
+              f"{backends.BACKENDS[args.backend].install_hint}", file=sys.stderr)
+        return EXIT_SETUP_ERROR
+    if not pipeline.check_ffmpeg():
+        print("Error: FFmpeg not found in system PATH. Cannot proceed without FFmpeg.", file=sys.stderr)
+        return EXIT_SETUP_ERROR
+
+    def on_progress(message, percent):
+        if not args.quiet:
+            print(f"[{percent:3d}%] {message}", file=sys.stderr, flush=True)
+
+    def on_error(message):
+        print(f"[ERROR] {message}", file=sys.stderr, flush=True)
+
+    # First Ctrl+C stops within seconds (a chunked file keeps its finished chunks), a second one aborts immediately.
+    control = runcontrol.RunControl()
+
+    def on_sigint(signum, frame):
+        if control.cancelled:
+            raise KeyboardInterrupt
+        control.cancel()
+        print("Stopping (press Ctrl+C again to abort)...", file=sys.stderr, flush=True)
+
+    try:
+        closers = start_metrics(args)
+    except OSError as e:
+        print(f"Error: Could not start the metrics export: {e}", file=sys.stderr)
+        return EXIT_SETUP_ERROR
+
+    previous_handler = signal.signal(signal.SIGINT, on_sigint)
+    try:
+        if args.watch:
+            if not args.poll and not watcher.watchdog_available() and not args.quiet:
+                print("watchdog is not installed (pip install watchdog), so the folder is polled "
+                      f"every {args.poll_seconds:g} s.", file=sys.stderr)
+            summary = watcher.watch_folder(args.folder, args.model, args.language, backend=args.backend,
+                                           formats=args.formats,
+                                           use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                                           vad=args.vad, chunk_seconds=args.chunk_seconds,
+                                           route_languages=args.route_languages, routes=args.route,
+                                           detect_model=args.detect_model, threads=args.threads,
+                                           use_manifest=not args.no_manifest, manifest_path=args.manifest,
+                                           requeue_weaker=args.requeue_weaker, hash_files=args.hash,
+                                           settle_seconds=args.settle_seconds, poll_seconds=args.poll_seconds,
+                                           use_watchdog=not args.poll, idle_unload_seconds=args.idle_unload,
+                                           max_queued=args.max_queued, scan_threads=args.scan_threads,
+                                           on_progress=on_progress, on_error=on_error,
+                                           control=control)
+        else:
+            summary = pipeline.transcribe_folder(args.folder, args.model, args.language, backend=args.backend,
+                                                 formats=args.formats,
+                                                 use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                                                 vad=args.vad, chunk_seconds=args.chunk_seconds,
+                                                 prefetch=args.prefetch, batch_size=args.batch_size,
+                                                 group_by_language=args.group_language,
+                                                 route_languages=args.route_languages, routes=args.route,
+                                                 detect_model=args.detect_model,
+                                                 workers=args.workers, threads=args.threads,
+                                                 use_manifest=not args.no_manifest, manifest_path=args.manifest,
+                                                 requeue_weaker=args.requeue_weaker, hash_files=args.hash,
+                                                 scan_threads=args.scan_threads,
+                                                 on_progress=on_progress, on_error=on_error,
+                                                 control=control)
+    except KeyboardInterrupt:
+        print("Processing aborted.", file=sys.stderr)
+        return EXIT_CANCELLED
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+        for close in reversed(closers):
+            close()
+
+    summary_json = json.dumps(summary, indent=2, ensure_ascii=False)
+    if args.summary_file:
+        args.summary_file.write_text(summary_json + "\n", encoding="utf-8")
+    if args.json:
+        print(summary_json)
+    return exit_code_for(summary)
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support() # See main.py
+    sys.exit(main())
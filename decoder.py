@@ -0,0 +1,148 @@
+"""
+Audio decode stage: ffmpeg -> 16 kHz mono float32 PCM (numpy), decoded once per file.
+
+Whisper gets the decoded array instead of a path, so it doesn't run ffmpeg
+itself, and the same buffer serves the VAD, the duration and the content hash
+used by the result cache. Prefetcher decodes the next files on a thread pool
+while the current one is being transcribed; a bounded number of buffers is
+kept ahead, which caps memory use (an hour of audio is ~230 MB).
+"""
+import hashlib
+import queue
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+import runcontrol
+
+SAMPLE_RATE = 16000 # What Whisper works with
+DEFAULT_PREFETCH = 2 # Files decoded ahead of the one being transcribed
+DEFAULT_DECODE_THREADS = 2
+STOP_POLL_SECONDS = 0.25 # How often a running ffmpeg checks should_stop()
+
+
+class DecodeError(Exception):
+    """ffmpeg could not decode the file."""
+
+
+class DecodedAudio(NamedTuple):
+    path: Path
+    audio: object # float32 numpy array, or None if decoding failed
+    duration: object # Seconds, or None
+    pcm_hash: object # SHA-256 of the decoded samples, or None
+    error: object # Message if decoding failed
+    decode_seconds: float = 0.0 # Time spent decoding (and hashing)
+
+
+def load_audio(audio_file, sample_rate: int = SAMPLE_RATE, should_stop=None):
+    """
+    Decodes audio_file to a mono float32 numpy array at sample_rate with ffmpeg (same conversion as whisper.audio.load_audio).
+    should_stop() is polled while ffmpeg runs; ffmpeg is killed once it returns True.
+
+    Raises:
+        DecodeError: ffmpeg is missing or failed.
+        runcontrol.Cancelled: should_stop() returned True.
+    """
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0", "-i", str(audio_file),
+           "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-"]
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise DecodeError(f"Could not run ffmpeg: {e}") from e
+    with process:
+        while True:
+            try:
+                stdout, stderr = process.communicate(timeout=STOP_POLL_SECONDS if should_stop else None)
+                break
+            except subprocess.TimeoutExpired: # communicate() keeps what was read so far
+                if should_stop():
+                    process.kill()
+                    process.communicate()
+                    raise runcontrol.Cancelled(f"stopped while decoding {Path(audio_file).name}")
+            except BaseException:
+                process.kill()
+                raise
+    if process.returncode != 0:
+        if should_stop and should_stop(): # e.g. Ctrl+C also reached ffmpeg
+            raise runcontrol.Cancelled(f"stopped while decoding {Path(audio_file).name}")
+        lines = stderr.decode("utf-8", "replace").strip().splitlines()
+        raise DecodeError(f"ffmpeg failed to decode {Path(audio_file).name}: {lines[-1] if lines else process.returncode}")
+    import numpy as np # Imported on first use, so importing the pipeline stays cheap
+    return np.frombuffer(stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def pcm_hash(audio) -> str:
+    """Content hash of decoded audio (numpy array); unlike a file hash it ignores tags and container changes."""
+    import numpy as np
+    return hashlib.sha256(np.ascontiguousarray(audio).tobytes()).hexdigest()
+
+
+def decode(audio_file, should_stop=None) -> DecodedAudio:
+    """
+    Decodes one file; failures are returned in .error instead of raised.
+
+    Raises:
+        runcontrol.Cancelled: should_stop() returned True while ffmpeg was running.
+    """
+    audio_file = Path(audio_file)
+    started = time.perf_counter()
+    try:
+        audio = load_audio(audio_file, should_stop=should_stop)
+    except DecodeError as e:
+        return DecodedAudio(audio_file, None, None, None, str(e), time.perf_counter() - started)
+    digest = pcm_hash(audio)
+    return DecodedAudio(audio_file, audio, len(audio) / SAMPLE_RATE, digest, None, time.perf_counter() - started)
+
+
+class Prefetcher:
+    """
+    Decodes files from an iterable ahead of the consumer and yields DecodedAudio
+    in the same order. At most `depth` files are decoded or being decoded beyond
+    the one the consumer holds. With should_stop, a decode that gets stopped
+    raises runcontrol.Cancelled from the iteration when the consumer reaches it.
+    """
+    _END = object()
+
+    def __init__(self, files, depth: int = DEFAULT_PREFETCH, threads: int = DEFAULT_DECODE_THREADS,
+                 should_stop=None):
+        self._should_stop = should_stop
+        self._slots = threading.Semaphore(max(1, depth))
+        self._decoded = queue.Queue()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="decode")
+        self._feeder = threading.Thread(target=self._feed, args=(files,), name="decode-feeder", daemon=True)
+        self._feeder.start()
+
+    def _feed(self, files):
+        try:
+            for path in files:
+                while not self._slots.acquire(timeout=0.25):
+                    if self._stop.is_set():
+                        return
+                if self._stop.is_set():
+                    return
+                try:
+                    self._decoded.put(self._executor.submit(decode, path, self._should_stop))
+                except RuntimeError: # Executor shut down by close()
+                    return
+        finally:
+            self._decoded.put(self._END)
+
+    def __iter__(self):
+        while True:
+            future = self._decoded.get()
+            if future is self._END:
+                return
+            try:
+                decoded = future.result()
+            finally:
+                self._slots.release() # The consumer holds this one; decode the next
+            yield decoded
+
+    def close(self):
+        """Stops decoding ahead; buffers not handed out yet are dropped."""
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
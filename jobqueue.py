@@ -0,0 +1,574 @@
+"""
+Work queue shared by several hosts transcribing one library (e.g. on a NAS).
+
+A coordinator enqueues the files that are missing outputs into a SQLite queue
+next to the library (<library>/.auto2lrc/queue.sqlite3), together with the
+settings every worker uses. Workers on any host claim one file at a time with a
+lease that a heartbeat thread keeps extending; a lease that runs out (crashed
+or disconnected host) puts the file back in the queue, up to MAX_ATTEMPTS
+claims. Outputs are written atomically by the pipeline, so a file that two
+workers ended up transcribing is never seen half-written. Paths are stored
+relative to the library, so every host can mount it at a different path.
+
+Usage:
+    python -m jobqueue enqueue <library> [--model base] [--language en] [--formats lrc,srt] [--route-languages]
+    python -m jobqueue work <library> [--processes 2] [--wait]
+    python -m jobqueue status <library> [--json]
+
+Leases compare wall-clock times of different hosts, so their clocks should be
+roughly in sync (well within the lease length).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import backends
+import manifest
+import metrics
+import pipeline
+import result_cache
+import routing
+import runcontrol
+import scanner
+import subtitles
+
+SCHEMA_VERSION = 1
+QUEUE_FILE_NAME = "queue.sqlite3"
+DEFAULT_LEASE_SECONDS = 120 # A claimed file goes back to the queue if its worker is silent this long
+MAX_ATTEMPTS = 3 # Claims per file before a file whose leases keep expiring counts as failed
+POLL_SECONDS = 5 # How often an idle worker looks for new or expired jobs
+
+JOB_QUEUED = "queued"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_STATUSES = (JOB_QUEUED, JOB_LEASED, JOB_DONE, JOB_FAILED)
+
+
+def default_queue_path(root) -> Path:
+    return Path(root) / manifest.MANIFEST_DIR_NAME / QUEUE_FILE_NAME
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """
+    SQLite job queue of a library. Every method is one short transaction, so any
+    number of processes and hosts can use the same file. Not thread-safe: use
+    one JobQueue per thread.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), timeout=60, isolation_level=None) # Transactions are explicit
+        self._db.execute("PRAGMA journal_mode=DELETE") # Not WAL, for the reason given in manifest.Manifest
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._transaction() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    path TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    lease_expires REAL,
+                    enqueued_at REAL NOT NULL,
+                    finished_at REAL,
+                    elapsed_seconds REAL,
+                    outputs TEXT,
+                    error TEXT
+                )""")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, enqueued_at)")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS workers (
+                    id TEXT PRIMARY KEY,
+                    host TEXT NOT NULL,
+                    pid INTEGER NOT NULL,
+                    state TEXT NOT NULL,
+                    current TEXT,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0,
+                    lease_seconds REAL NOT NULL,
+                    started_at REAL NOT NULL,
+                    heartbeat_at REAL NOT NULL
+                )""")
+            db.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE takes the write lock up front, so two claims can't pick the same job."""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._db
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # --- Coordinator ---
+    def set_settings(self, settings: dict):
+        """Transcription settings every worker uses (the latest enqueue wins)."""
+        with self._transaction() as db:
+            db.execute("DELETE FROM settings")
+            db.executemany("INSERT INTO settings (key, value) VALUES (?, ?)",
+                           [(key, json.dumps(value)) for key, value in settings.items()])
+
+    def settings(self) -> dict:
+        return {key: json.loads(value) for key, value in self._db.execute("SELECT key, value FROM settings")}
+
+    def enqueue(self, rel_paths, requeue_failed: bool = False) -> int:
+        """
+        Adds files (paths relative to the library). Files already queued or leased are left
+        alone; finished ones are queued again (they were found without their outputs).
+
+        Returns:
+            int: Number of files added or queued again.
+        """
+        statuses = (JOB_DONE, JOB_FAILED) if requeue_failed else (JOB_DONE,)
+        now = time.time()
+        added = 0
+        with self._transaction() as db:
+            for rel_path in rel_paths:
+                cursor = db.execute(
+                    f"""INSERT INTO jobs (path, status, enqueued_at) VALUES (?, ?, ?)
+                        ON CONFLICT (path) DO UPDATE SET status = excluded.status, attempts = 0, worker = NULL,
+                            lease_expires = NULL, enqueued_at = excluded.enqueued_at, error = NULL
+                        WHERE jobs.status IN ({", ".join("?" * len(statuses))})""",
+                    (rel_path, JOB_QUEUED, now, *statuses))
+                added += cursor.rowcount
+        return added
+
+    # --- Workers ---
+    def register_worker(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        now = time.time()
+        host, _, pid = worker_id.rpartition(":")
+        with self._transaction() as db:
+            db.execute("""INSERT OR REPLACE INTO workers (id, host, pid, state, lease_seconds, started_at, heartbeat_at)
+                          VALUES (?, ?, ?, 'idle', ?, ?, ?)""",
+                       (worker_id, host or worker_id, int(pid) if pid.isdigit() else 0, lease_seconds, now, now))
+
+    def set_worker_state(self, worker_id: str, state: str):
+        with self._transaction() as db:
+            db.execute("UPDATE workers SET state = ?, current = NULL, heartbeat_at = ? WHERE id = ?",
+                       (state, time.time(), worker_id))
+
+    def _expire_leases(self, db, now):
+        db.execute("""UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, worker = NULL,
+                          lease_expires = NULL, error = 'lease expired (worker ' || worker || ' stopped responding)'
+                      WHERE status = ? AND lease_expires < ?""",
+                   (MAX_ATTEMPTS, JOB_FAILED, JOB_QUEUED, JOB_LEASED, now))
+
+    def claim(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        """Leases the oldest queued file (after re-queueing expired leases); returns its relative path or None."""
+        now = time.time()
+        with self._transaction() as db:
+            self._expire_leases(db, now)
+            row = db.execute("SELECT path FROM jobs WHERE status = ? ORDER BY enqueued_at, path LIMIT 1",
+                             (JOB_QUEUED,)).fetchone()
+            if row is None:
+                return None
+            db.execute("""UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, lease_expires = ?
+                          WHERE path = ?""", (JOB_LEASED, worker_id, now + lease_seconds, row[0]))
+            db.execute("UPDATE workers SET state = 'busy', current = ?, heartbeat_at = ? WHERE id = ?",
+                       (row[0], now, worker_id))
+        return row[0]
+
+    def heartbeat(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> int:
+        """Extends the leases held by worker_id; returns how many it still holds."""
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("UPDATE workers SET heartbeat_at = ? WHERE id = ?", (now, worker_id))
+            return db.execute("UPDATE jobs SET lease_expires = ? WHERE status = ? AND worker = ?",
+                              (now + lease_seconds, JOB_LEASED, worker_id)).rowcount
+
+    def complete(self, rel_path: str, worker_id: str, entry: dict) -> bool:
+        """
+        Records a per-file summary entry (see pipeline.run_file) for a leased file.
+
+        Returns:
+            bool: False if the lease was lost meanwhile (the file was handed to another worker).
+        """
+        ok = entry["status"] == pipeline.STATUS_OK
+        counter = "done" if ok else "failed"
+        with self._transaction() as db:
+            owned = db.execute(
+                """UPDATE jobs SET status = ?, worker = ?, lease_expires = NULL, finished_at = ?,
+                       elapsed_seconds = ?, outputs = ?, error = ?
+                   WHERE path = ? AND status = ? AND worker = ?""",
+                (JOB_DONE if ok else JOB_FAILED, worker_id, time.time(), entry.get("elapsed_seconds"),
+                 json.dumps(entry["outputs"]), entry["error"], rel_path, JOB_LEASED, worker_id)).rowcount
+            db.execute(f"UPDATE workers SET {counter} = {counter} + 1, state = 'idle', current = NULL, heartbeat_at = ? "
+                       "WHERE id = ?", (time.time(), worker_id))
+        return owned == 1
+
+    def release(self, rel_path: str, worker_id: str):
+        """Puts a leased file back in the queue without counting the attempt (e.g. the worker was stopped)."""
+        with self._transaction() as db:
+            db.execute("""UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), worker = NULL,
+                              lease_expires = NULL
+                          WHERE path = ? AND status = ? AND worker = ?""", (JOB_QUEUED, rel_path, JOB_LEASED, worker_id))
+            db.execute("UPDATE workers SET state = 'idle', current = NULL WHERE id = ?", (worker_id,))
+
+    def pending(self) -> int:
+        """Files queued or leased (by anyone); 0 means the queue is drained."""
+        return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (JOB_QUEUED, JOB_LEASED)).fetchone()[0]
+
+    # --- Status ---
+    def status(self) -> dict:
+        """JSON-serializable overview: job counts, settings, workers (alive = heartbeat within its lease) and failures."""
+        now = time.time()
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        workers = [{"id": worker_id, "host": host, "pid": pid, "state": state, "current": current, "done": done,
+                    "failed": failed, "heartbeat_age_seconds": round(now - heartbeat_at, 1),
+                    "alive": state != "stopped" and now - heartbeat_at < lease_seconds}
+                   for worker_id, host, pid, state, current, done, failed, lease_seconds, heartbeat_at in self._db.execute(
+                       """SELECT id, host, pid, state, current, done, failed, lease_seconds, heartbeat_at FROM workers
+                          ORDER BY host, started_at""")]
+        failures = [{"path": path, "error": error} for path, error in self._db.execute(
+            "SELECT path, error FROM jobs WHERE status = ? ORDER BY finished_at DESC LIMIT 20", (JOB_FAILED,))]
+        return {"queue": str(self.db_path), "jobs": counts, "settings": self.settings(), "workers": workers,
+                "recent_failures": failures}
+
+
+# --- Enqueueing ---
+def _check_model(name: str):
+    """
+    Catches typos now instead of when every worker fails the job.
+
+    Raises:
+        ValueError: Neither a Whisper model name nor the path of an existing checkpoint.
+    """
+    if name not in pipeline.MODEL_NAMES and not Path(name).exists():
+        raise ValueError(f"Unknown model '{name}' (choose from {', '.join(pipeline.MODEL_NAMES)}, "
+                         f"or give the path of a checkpoint)")
+
+
+def enqueue_library(root, queue_path=None, *, model_name: str = "base", language="auto",
+                    formats=subtitles.DEFAULT_FORMATS, backend: str = backends.DEFAULT_BACKEND, vad: bool = False,
+                    chunk_seconds=None, route_languages: bool = False, routes=None,
+                    detect_model: str = routing.DEFAULT_DETECT_MODEL, requeue_failed: bool = False,
+                    scan_threads: int = scanner.DEFAULT_SCAN_THREADS) -> tuple:
+    """
+    Stores the settings and queues every audio file under root that is missing any of its outputs.
+    route_languages, routes and detect_model are as in pipeline.transcribe_folder().
+
+    Returns:
+        tuple: (files queued now, files found without outputs)
+
+    Raises:
+        ValueError: Bad formats, routes, an unknown model or an unknown backend.
+    """
+    root = Path(root)
+    formats = subtitles.parse_formats(formats)
+    routes = routing.parse_routes(routes) if route_languages else None
+    for name in [model_name, *([detect_model, *routes.values()] if route_languages else [])]:
+        _check_model(name)
+    if route_languages and routing.is_english_only(detect_model):
+        raise ValueError(f"'{detect_model}' is English-only and can't detect languages")
+    if backend not in backends.BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}' (choose from {', '.join(backends.BACKENDS)})")
+    suffixes = subtitles.output_suffixes(formats)
+    found = []
+    for listing in scanner.walk(root, pipeline.AUDIO_EXTENSIONS, scan_threads,
+                                skip_dir_names=(manifest.MANIFEST_DIR_NAME,)):
+        for name, _, _ in listing.audio:
+            if not scanner.has_outputs(listing, name, suffixes):
+                found.append(f"{listing.rel_dir}/{name}" if listing.rel_dir else name)
+    with JobQueue(queue_path or default_queue_path(root)) as jobs:
+        jobs.set_settings({"model": model_name, "language": pipeline.normalize_language(language),
+                           "formats": list(formats), "backend": backend, "vad": vad,
+                           "chunk_seconds": chunk_seconds or None, "routes": routes, "detect_model": detect_model})
+        return jobs.enqueue(sorted(found), requeue_failed), len(found)
+
+
+# --- Working ---
+class _Heartbeat:
+    """Extends this worker's leases every lease/4 seconds on its own connection (SQLite connections are per thread)."""
+
+    def __init__(self, queue_path, worker_id: str, lease_seconds: float):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(queue_path, worker_id, lease_seconds),
+                                        name="jobqueue-heartbeat", daemon=True)
+        self._thread.start()
+
+    def _run(self, queue_path, worker_id, lease_seconds):
+        with JobQueue(queue_path) as jobs:
+            while not self._stop.wait(lease_seconds / 4):
+                try:
+                    jobs.heartbeat(worker_id, lease_seconds)
+                except sqlite3.Error:
+                    pass # Shared storage hiccup; the lease has slack for a few missed beats
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+
+def run_worker(root, queue_path=None, *, worker_id=None, threads=None, cache_dir=None, use_cache: bool = True,
+               lease_seconds: float = DEFAULT_LEASE_SECONDS, wait: bool = False, should_stop=None,
+               on_progress=None, on_error=None) -> dict:
+    """
+    Claims and transcribes files from the queue until it is drained (with wait, until
+    should_stop() returns True). A file stopped half-way is put back in the queue.
+
+    Returns:
+        dict: {"worker", "done", "failed", "lost_leases"}
+
+    Raises:
+        pipeline.ModelLoadError: The model could not be loaded.
+        ValueError: The queue has no settings (nothing was enqueued yet).
+    """
+    root = Path(root)
+    queue_path = queue_path or default_queue_path(root)
+    worker_id = worker_id or default_worker_id()
+    on_progress = on_progress or (lambda message: None)
+    on_error = on_error or (lambda message: None)
+    should_stop = should_stop or (lambda: False)
+    stats = {"worker": worker_id, "done": 0, "failed": 0, "lost_leases": 0}
+
+    with JobQueue(queue_path) as jobs:
+        options = jobs.settings()
+        if not options:
+            raise ValueError(f"No settings in {queue_path}; enqueue the library first")
+        settings = pipeline.FileSettings(options["model"], options["language"], tuple(options["formats"]),
+                                         options["vad"], options["chunk_seconds"],
+                                         pipeline.default_checkpoint_dir() if options["chunk_seconds"] else None,
+                                         options["backend"])
+        if options.get("routes") is not None: # Language routing on (None in queues made without it)
+            settings = pipeline.routed_settings(settings, options["routes"], options["detect_model"])
+        cache = result_cache.ResultCache(cache_dir or pipeline.default_result_cache_dir()) if use_cache else None
+        get_model = pipeline.model_loader(settings.backend, threads, on_progress)
+
+        jobs.register_worker(worker_id, lease_seconds)
+        heartbeat = _Heartbeat(queue_path, worker_id, lease_seconds)
+        try:
+            while not should_stop():
+                rel_path = jobs.claim(worker_id, lease_seconds)
+                if rel_path is None:
+                    if not wait and jobs.pending() == 0:
+                        break
+                    time.sleep(POLL_SECONDS) # Others still hold leases that may expire, or more files may come
+                    continue
+                on_progress(f"Processing: {rel_path}")
+                try:
+                    entry, error_message = pipeline.run_file(get_model, root / rel_path, settings, cache,
+                                                             should_stop=should_stop)
+                except BaseException:
+                    jobs.release(rel_path, worker_id) # Model load failed or interrupted: leave it for others
+                    raise
+                if entry["status"] == pipeline.STATUS_CANCELLED:
+                    jobs.release(rel_path, worker_id)
+                    break
+                if error_message:
+                    on_error(error_message)
+                metrics.default.file_done(entry)
+                if not jobs.complete(rel_path, worker_id, entry):
+                    stats["lost_leases"] += 1
+                    on_error(f"Warning: The lease on {rel_path} expired while it was processed; "
+                             f"its outputs were written but another worker may redo it")
+                stats["done" if entry["status"] == pipeline.STATUS_OK else "failed"] += 1
+                on_progress(f"Finished: {rel_path} ({entry['status']})")
+        finally:
+            heartbeat.close()
+            try:
+                jobs.set_worker_state(worker_id, "stopped")
+            except sqlite3.Error:
+                pass
+    return stats
+
+
+def _work_process(root, queue_path, threads, lease_seconds, wait, stop_event, quiet):
+    """Entry point of one local worker process started by `work --processes N`."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # The parent turns Ctrl+C into stop_event
+    try:
+        stats = run_worker(root, queue_path, threads=threads, lease_seconds=lease_seconds, wait=wait,
+                           should_stop=stop_event.is_set, on_progress=None if quiet else _print_progress,
+                           on_error=_print_error)
+    except (pipeline.ModelLoadError, ValueError) as e:
+        _print_error(str(e))
+        sys.exit(2)
+    print(f"[{stats['worker']}] done {stats['done']}, failed {stats['failed']}", file=sys.stderr, flush=True)
+    sys.exit(1 if stats["failed"] else 0)
+
+
+def _print_progress(message):
+    print(f"[{default_worker_id()}] {message}", file=sys.stderr, flush=True)
+
+
+def _print_error(message):
+    print(f"[{default_worker_id()}] [ERROR] {message}", file=sys.stderr, flush=True)
+
+
+def format_status(status: dict) -> str:
+    jobs, settings = status["jobs"], status["settings"]
+    lines = [f"Queue: {status['queue']}"]
+    if settings:
+        lines.append(f"Settings: model {settings['model']} ({settings['backend']}), "
+                     f"language {settings['language'] or 'auto'}, formats {', '.join(settings['formats'])}")
+        if settings.get("routes") is not None:
+            routes = ", ".join(f"{language}={model}" for language, model in settings["routes"].items())
+            lines.append(f"Language routing: detect with {settings['detect_model']}" + (f", {routes}" if routes else ""))
+    lines.append("Jobs: " + ", ".join(f"{name} {jobs[name]}" for name in JOB_STATUSES))
+    lines.append("Workers:")
+    for worker in status["workers"]:
+        state = worker["state"] if worker["alive"] or worker["state"] == "stopped" else "not responding"
+        current = f", on {worker['current']}" if worker["current"] and worker["alive"] else ""
+        lines.append(f"  {worker['id']:<32} {state:<15} done {worker['done']}, failed {worker['failed']}, "
+                     f"seen {worker['heartbeat_age_seconds']:.0f} s ago{current}")
+    if not status["workers"]:
+        lines.append("  (none yet)")
+    for failure in status["recent_failures"]:
+        error = (failure["error"] or "").strip().splitlines()
+        lines.append(f"Failed: {failure['path']}: {error[0] if error else 'unknown error'}")
+    return "\n".join(lines)
+
+
+# --- Command Line Interface ---
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m jobqueue",
+                                     description="Share the transcription of one library between several hosts.")
+    parser.add_argument("--queue", type=Path, default=None,
+                        help="queue database (default: <library>/.auto2lrc/queue.sqlite3)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="queue the files that are missing outputs and set the settings")
+    enqueue.add_argument("library", type=Path)
+    enqueue.add_argument("-m", "--model", default="base", help="Whisper model name or checkpoint path (default: base)")
+    enqueue.add_argument("-b", "--backend", default=backends.DEFAULT_BACKEND, choices=list(backends.BACKENDS))
+    enqueue.add_argument("-l", "--language", default="auto", help="language code, or 'auto' (default)")
+    enqueue.add_argument("-f", "--formats", default=",".join(subtitles.DEFAULT_FORMATS),
+                         help=f"comma-separated output formats: {', '.join(subtitles.WRITERS)} (default: lrc)")
+    enqueue.add_argument("--vad", action="store_true", help="only transcribe detected speech")
+    enqueue.add_argument("--chunk-seconds", type=int, default=None, help="transcribe long files in chunks")
+    enqueue.add_argument("--route-languages", action="store_true",
+                         help="detect each file's language first and route English to the .en model")
+    enqueue.add_argument("--route", default=None, metavar="LANG=MODEL,...",
+                         help="extra routes for --route-languages, e.g. en=small.en,ja=medium")
+    enqueue.add_argument("--detect-model", default=routing.DEFAULT_DETECT_MODEL,
+                         help=f"model for the language pre-pass (default: {routing.DEFAULT_DETECT_MODEL})")
+    enqueue.add_argument("--requeue-failed", action="store_true", help="also retry files that failed before")
+
+    work = commands.add_parser("work", help="claim and transcribe queued files until the queue is drained")
+    work.add_argument("library", type=Path, help="the library as mounted on this host")
+    work.add_argument("-p", "--processes", type=int, default=1, help="worker processes on this host (default: 1)")
+    work.add_argument("-t", "--threads", type=int, default=None, help="torch threads per process")
+    work.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                      help=f"re-queue a file if its worker is silent this long (default: {DEFAULT_LEASE_SECONDS})")
+    work.add_argument("--wait", action="store_true", help="keep waiting for new files instead of exiting when drained")
+    work.add_argument("-q", "--quiet", action="store_true", help="only report errors")
+
+    status = commands.add_parser("status", help="show the queue and every worker")
+    status.add_argument("library", type=Path)
+    status.add_argument("--json", action="store_true", help="print the status as JSON")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    queue_path = args.queue or default_queue_path(args.library)
+
+    if args.command == "enqueue":
+        try:
+            queued, found = enqueue_library(args.library, queue_path, model_name=args.model, language=args.language,
+                                            formats=args.formats, backend=args.backend, vad=args.vad,
+                                            chunk_seconds=args.chunk_seconds, route_languages=args.route_languages,
+                                            routes=args.route, detect_model=args.detect_model,
+                                            requeue_failed=args.requeue_failed)
+        except (ValueError, OSError, sqlite3.Error) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        print(f"Queued {queued} files ({found} without outputs) in {queue_path}.")
+        return 0
+
+    if args.command == "status":
+        if not queue_path.exists():
+            print(f"Error: No queue at {queue_path}", file=sys.stderr)
+            return 2
+        with JobQueue(queue_path) as jobs:
+            status = jobs.status()
+        print(json.dumps(status, indent=2, ensure_ascii=False) if args.json else format_status(status))
+        return 0
+
+    # --- work ---
+    if not pipeline.check_ffmpeg():
+        print("Error: FFmpeg not found. Please install FFmpeg and make sure it is on PATH.", file=sys.stderr)
+        return 2
+    if args.processes < 1:
+        print("Error: --processes must be at least 1.", file=sys.stderr)
+        return 2
+    if args.processes == 1:
+        control = runcontrol.RunControl()
+        previous_handler = signal.signal(signal.SIGINT, lambda signum, frame: control.cancel())
+        try:
+            stats = run_worker(args.library, queue_path, threads=args.threads, lease_seconds=args.lease_seconds,
+                               wait=args.wait, should_stop=control.should_stop,
+                               on_progress=None if args.quiet else _print_progress, on_error=_print_error)
+        except (pipeline.ModelLoadError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
+        print(f"Done {stats['done']}, failed {stats['failed']}.", file=sys.stderr)
+        return 3 if control.cancelled else 1 if stats["failed"] else 0
+
+    ctx = multiprocessing.get_context("spawn") # See worker_pool.process_files
+    stop_event = ctx.Event()
+    processes = [ctx.Process(target=_work_process,
+                             args=(args.library, queue_path, args.threads, args.lease_seconds, args.wait,
+                                   stop_event, args.quiet))
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+
+    # First Ctrl+C stops the workers within seconds (their files go back to the queue), a second one kills them
+    def on_sigint(signum, frame):
+        if stop_event.is_set():
+            raise KeyboardInterrupt
+        stop_event.set()
+        print("Stopping (the files being processed go back to the queue)...", file=sys.stderr, flush=True)
+
+    previous_handler = signal.signal(signal.SIGINT, on_sigint)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate() # Their leases run out and the files are queued again
+        return 3
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+    if stop_event.is_set():
+        return 3
+    exit_codes = [process.exitcode for process in processes]
+    if 2 in exit_codes:
+        return 2
+    return 1 if any(exit_codes) else 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support() # See main.py
+    sys.exit(main())
@@ -1,61 +1,44 @@
+import multiprocessing
 import os
 import sys
-import shutil
-import traceback
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import math  # For ceiling function in time formatting
-import time # For basic timing if needed
 
-# --- Check Core Dependencies ---
-try:
-    import whisper
-except ImportError:
-    # Display error immediately if whisper module is missing
-    # Need a temporary minimal QApplication to show the message box
-    from PyQt5.QtWidgets import QApplication, QMessageBox
-    _app = QApplication([])
-    QMessageBox.critical(None, "Startup Error", "Could not import the 'whisper' library.\nPlease install it using: pip install -U openai-whisper")
-    sys.exit(1)
+import startup # First, so the startup profile counts from here
+
+# Nothing heavy is imported or checked here: the window comes up first, then FFmpeg and the
+# transcription library are checked and the library imported in the background (see startup.py)
+with startup.profile.step("import PyQt5"):
+    from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout,
+                                 QLabel, QProgressBar, QPushButton, QFileDialog,
+                                 QComboBox, QLineEdit, QFormLayout, QMessageBox,
+                                 QListView, QTableView, QTabWidget, QHeaderView,
+                                 QAbstractItemView, QSpinBox, QCheckBox)
+    from PyQt5.QtCore import QAbstractListModel, QAbstractTableModel, QModelIndex, QThread, QTimer, pyqtSignal, Qt
+    from PyQt5.QtGui import QBrush, QColor, QFont, QIcon
 
 try:
-    # Assuming srt_to_lrc.py is in the same directory or importable
-    import srt_to_lrc
+    # Assuming pipeline.py and srt_to_lrc.py are in the same directory or importable
+    with startup.profile.step("import pipeline modules"):
+        import backends
+        import model_cache
+        import pipeline
+        import runcontrol
+        import subtitles
 except ImportError:
-    from PyQt5.QtWidgets import QApplication, QMessageBox
-    _app = QApplication([])
-    QMessageBox.critical(None, "Startup Error", "Could not import srt_to_lrc.py. Make sure it's included with the application.")
-    sys.exit(1)
-
-# --- Check for FFMPEG ---
-if shutil.which("ffmpeg") is None:
-    from PyQt5.QtWidgets import QApplication, QMessageBox
     _app = QApplication([])
-    QMessageBox.critical(None, "Startup Error", "FFmpeg not found.\n\nThe Whisper library requires FFmpeg to process audio.\nPlease install FFmpeg and ensure it's in your system's PATH.\n\nSee: https://ffmpeg.org/download.html")
-    # sys.exit(1) # Allow app to start but warn user? Or exit? Exiting is safer.
+    QMessageBox.critical(None, "Startup Error", "Could not import pipeline.py/srt_to_lrc.py. Make sure they're included with the application.")
     sys.exit(1)
 
-
-from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout,
-                             QLabel, QProgressBar, QPushButton, QFileDialog,
-                             QComboBox, QLineEdit, QFormLayout, QMessageBox,
-                             QTextEdit)
-from PyQt5.QtCore import QThread, pyqtSignal, Qt
-from PyQt5.QtGui import QFont, QIcon
-
 # --- Constants and Path Definitions ---
 
-# Use CWD as the base for the temp dir, as requested previously
+# Use CWD as the base path (default folder for the browse dialog)
 try:
     BASE_PATH = Path(os.getcwdb().decode("utf-8")).resolve()
-except Exception as e:
-    from PyQt5.QtWidgets import QApplication, QMessageBox
-    _app = QApplication([])
-    QMessageBox.critical(None, "Startup Error", f"Could not determine base path using CWD: {e}")
-    sys.exit(1)
-
-TEMP_DIR_NAME = "temp_lrc_processing"
-TEMP_DIR_PATH = BASE_PATH / TEMP_DIR_NAME
-AUDIO_EXTENSIONS = {'.mp3', '.m4a', '.wav', '.flac', '.ogg', '.opus', '.mkv', '.mp4'} # Whisper supports more
+except Exception:
+    BASE_PATH = Path.home() # E.g. the working directory was deleted; only the browse dialog uses it
 
 # Determine Application Base Directory (for assets like icons)
 if getattr(sys, 'frozen', False):
@@ -63,211 +46,253 @@ if getattr(sys, 'frozen', False):
 else:
     APP_BASE_DIR = Path(__file__).resolve().parent
 
-# Global variable to hold the loaded Whisper model (optional optimization)
-# Set to None initially. Will be loaded by the worker.
-# This prevents reloading the model for every run if the app stays open,
-# but means the model stays in memory. Load inside Worker for per-run loading.
-# WHISPER_MODEL_CACHE = {} # Or load inside worker run()
-
-# --- Helper Function for SRT Time Formatting ---
-def format_srt_time(seconds: float) -> str:
-    """Converts seconds to SRT time format HH:MM:SS,ms"""
-    assert seconds >= 0, "non-negative timestamp expected"
-    milliseconds = round(seconds * 1000.0)
-
-    hours = milliseconds // 3_600_000
-    milliseconds %= 3_600_000
-
-    minutes = milliseconds // 60_000
-    milliseconds %= 60_000
-
-    seconds = milliseconds // 1_000
-    milliseconds %= 1_000
-
-    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
-
-# --- Helper Function to Generate SRT Content ---
-def generate_srt_content(transcription_result: dict) -> str:
-    """Generates SRT file content string from Whisper transcription result."""
-    srt_content = ""
-    for i, segment in enumerate(transcription_result["segments"], start=1):
-        start_time_str = format_srt_time(segment['start'])
-        end_time_str = format_srt_time(segment['end'])
-        text = segment['text'].strip()
-        # Handle potential multi-line text within a segment if needed,
-        # though typically whisper provides reasonably short segments.
-        srt_content += f"{i}\n"
-        srt_content += f"{start_time_str} --> {end_time_str}\n"
-        srt_content += f"{text}\n\n"
-    return srt_content
+LOG_MAX_LINES = 5000 # Older log lines are dropped
+UI_REFRESH_MS = 100 # Log, progress and results are applied to the widgets at most this often
+ERROR_BRUSH = QBrush(QColor("red"))
+
+# --- Log and Results Models ---
+# Both are only touched on the GUI thread; the views only lay out the visible rows
+class LogModel(QAbstractListModel):
+    """Ring buffer of (line, is_error) for a QListView, keeping the last max_lines lines."""
+
+    def __init__(self, max_lines: int = LOG_MAX_LINES, parent=None):
+        super().__init__(parent)
+        self.max_lines = max_lines
+        self._lines = deque()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._lines)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        text, is_error = self._lines[index.row()]
+        if role == Qt.DisplayRole:
+            return text
+        if role == Qt.ForegroundRole and is_error:
+            return ERROR_BRUSH
+        return None
+
+    def append_lines(self, lines):
+        """Adds (line, is_error) pairs in one model update, dropping the oldest lines over the cap."""
+        lines = list(lines)[-self.max_lines:]
+        if not lines:
+            return
+        overflow = len(self._lines) + len(lines) - self.max_lines
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._lines.popleft()
+            self.endRemoveRows()
+        self.beginInsertRows(QModelIndex(), len(self._lines), len(self._lines) + len(lines) - 1)
+        self._lines.extend(lines)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._lines.clear()
+        self.endResetModel()
+
+
+class ResultsModel(QAbstractTableModel):
+    """One row per finished file, from the per-file summary entries (see pipeline.run_file)."""
+    COLUMNS = ("File", "Status", "Audio", "Time", "Details")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entries = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self._entries[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return Path(entry["path"]).name
+            if column == 1:
+                return entry["status"]
+            if column == 2:
+                return f"{entry['duration_seconds']:.1f} s" if entry.get("duration_seconds") else ""
+            if column == 3:
+                return f"{entry['elapsed_seconds']:.1f} s" if entry.get("elapsed_seconds") is not None else ""
+            if entry.get("error"):
+                return entry["error"].splitlines()[0]
+            return "from cache" if entry.get("cached") else ", ".join(Path(path).suffix for path in entry["outputs"])
+        if role == Qt.ToolTipRole:
+            return entry.get("error") or entry["path"]
+        if role == Qt.ForegroundRole and entry["status"] == pipeline.STATUS_ERROR:
+            return ERROR_BRUSH
+        return None
+
+    def append_entries(self, entries):
+        if not entries:
+            return
+        self.beginInsertRows(QModelIndex(), len(self._entries), len(self._entries) + len(entries) - 1)
+        self._entries.extend(entries)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._entries = []
+        self.endResetModel()
 
 
 # --- Worker Thread ---
 class Worker(QThread):
-    progress = pyqtSignal(str, int)
-    error_occurred = pyqtSignal(str)
+    """
+    Runs pipeline.transcribe_folder() off the GUI thread. Its callbacks only queue
+    log lines, per-file entries and the latest progress under a lock; the GUI
+    collects them with drain() on a timer instead of getting one signal per event.
+    """
     finished_signal = pyqtSignal()
 
-    def __init__(self, folder_path: Path, model_name: str, language: str):
+    def __init__(self, folder_path: Path, model_name: str, language: str, workers: int = 1, threads=None,
+                 keep_model: bool = True, requeue_weaker: bool = False, formats=subtitles.DEFAULT_FORMATS,
+                 vad: bool = False, chunk_seconds=None, batch_size: int = 1, backend: str = backends.DEFAULT_BACKEND,
+                 route_languages: bool = False, watch: bool = False):
         super().__init__()
         self.folder_path = folder_path
         self.model_name = model_name
-        self.language = language if language and language.lower() != 'auto' else None # Whisper uses None for auto-detect
-        self.temp_dir_path = TEMP_DIR_PATH
-        self._is_running = True
-        self.whisper_model = None # Model will be loaded in run()
+        self.backend = backend
+        self.language = pipeline.normalize_language(language) # Whisper uses None for auto-detect
+        self.workers = workers
+        self.threads = threads # None = torch default
+        self.keep_model = keep_model # Leave the model in model_cache for the next run
+        self.requeue_weaker = requeue_weaker # Redo files made with a weaker model
+        self.formats = formats
+        self.vad = vad # Only transcribe detected speech
+        self.chunk_seconds = chunk_seconds # None = transcribe long files in one call
+        self.batch_size = batch_size # Short files transcribed together (1 = off)
+        self.route_languages = route_languages # Language pre-pass, English files get the .en model
+        self.watch = watch # Keep running and transcribe files as they are added, until Stop
+        self.control = runcontrol.RunControl() # Stop, Pause and Resume from the GUI thread
+        self.summary = None # Run summary dict, available once finished
+        self._lock = threading.Lock()
+        self._lines = [] # (line, is_error) not yet shown
+        self._entries = [] # Finished files not yet shown
+        self._progress = None # Latest (message, percent); earlier ones are never shown
+        self._error = False
+
+    def _on_progress(self, message: str, percent: int):
+        with self._lock:
+            self._progress = (message, percent)
+            self._lines.append((message, False))
+
+    def _on_error(self, message: str):
+        with self._lock:
+            self._error = True
+            self._lines.extend((line, True) for line in f"[ERROR] {message}".splitlines())
+
+    def _on_file(self, entry: dict):
+        with self._lock:
+            self._entries.append(entry)
+
+    def drain(self):
+        """Takes everything queued since the last call: (progress or None, lines, entries, error seen)."""
+        with self._lock:
+            drained = (self._progress, self._lines, self._entries, self._error)
+            self._progress, self._lines, self._entries, self._error = None, [], [], False
+        return drained
 
     def stop(self):
-        self._is_running = False
-        # Note: Stopping doesn't immediately interrupt a running model.transcribe() call
+        # Takes effect within seconds, also while decoding or transcribing; the current file
+        # is dropped (a chunked one keeps its finished chunks and resumes from them next time)
+        self.control.cancel()
 
-    def run(self):
-        try:
-            # --- Load Whisper Model ---
-            # Consider moving model loading outside if you want to cache it
-            # across multiple runs within the same app session.
-            # Loading here ensures it uses the selected model for this run.
-            self.progress.emit(f"Loading Whisper model: {self.model_name}...", 0)
-            QApplication.processEvents() # Allow GUI to update
-            try:
-                # Check cache first (example of simple caching)
-                # if self.model_name in WHISPER_MODEL_CACHE:
-                #     self.whisper_model = WHISPER_MODEL_CACHE[self.model_name]
-                # else:
-                #     self.whisper_model = whisper.load_model(self.model_name)
-                #     WHISPER_MODEL_CACHE[self.model_name] = self.whisper_model
-                # Simpler: Load every time worker runs
-                self.whisper_model = whisper.load_model(self.model_name)
-
-            except Exception as model_load_error:
-                self.error_occurred.emit(f"Failed to load Whisper model '{self.model_name}': {model_load_error}")
-                # Try to unload partially loaded model? Might not be possible/easy.
-                self.whisper_model = None
-                return # Cannot continue without a model
-            self.progress.emit(f"Model '{self.model_name}' loaded.", 0)
-
-
-            # --- Create Temp Directory ---
-            self.temp_dir_path.mkdir(parents=True, exist_ok=True)
-
-            # --- Find Audio Files ---
-            audio_files = [
-                f for f in self.folder_path.rglob('*')
-                if f.suffix.lower() in AUDIO_EXTENSIONS and not f.with_suffix('.lrc').exists()
-            ]
-
-            total_files = len(audio_files)
-            if total_files == 0:
-                self.progress.emit("No new audio files found to process.", 0)
-                try: # Clean up empty temp dir
-                    if not any(self.temp_dir_path.iterdir()): self.temp_dir_path.rmdir()
-                except OSError: pass
-                return
+    def pause(self):
+        self.control.pause() # Decoding and inference wait where they are; the model stays loaded
 
-            self.progress.emit(f"Found {total_files} files to process...", 0)
-
-            # --- Process Files ---
-            for idx, audio_file in enumerate(audio_files):
-                if not self._is_running:
-                    self.progress.emit("Processing cancelled.", int((idx / total_files) * 100))
-                    break
-
-                progress_text = f'Processing: {audio_file.name} ({idx + 1}/{total_files})'
-                self.progress.emit(progress_text, int((idx / total_files) * 100))
-                QApplication.processEvents() # Ensure label updates before potentially long transcribe
-
-                expected_srt_file_path = self.temp_dir_path / (audio_file.stem + '.srt')
-                generated_lrc_path = None # Reset for each file
-
-                try:
-                    # --- Transcribe using Whisper library ---
-                    transcribe_options = {"language": self.language} # Add other options like fp16=False if needed
-                    result = self.whisper_model.transcribe(str(audio_file), **transcribe_options, verbose=False) # verbose=False suppresses console output
-
-                    # --- Generate SRT Content from Result ---
-                    srt_data = generate_srt_content(result)
-                    if not srt_data:
-                         self.error_occurred.emit(f"Whisper produced no output for {audio_file.name}")
-                         continue # Skip to next file
-
-                    # --- Write SRT to Temp File ---
-                    try:
-                        with open(expected_srt_file_path, 'w', encoding='utf-8') as srt_f:
-                            srt_f.write(srt_data)
-                    except IOError as io_err:
-                        self.error_occurred.emit(f"Failed to write temporary SRT file {expected_srt_file_path.name}: {io_err}")
-                        continue # Skip to next file
-
-                    # --- Convert SRT to LRC (using existing function) ---
-                    if expected_srt_file_path.exists():
-                        generated_lrc_path = srt_to_lrc.srt_to_lrc(expected_srt_file_path) # This deletes the SRT file
-
-                        if generated_lrc_path and generated_lrc_path.exists():
-                            target_lrc_path = audio_file.with_suffix('.lrc')
-                            try:
-                                shutil.move(str(generated_lrc_path), str(target_lrc_path))
-                            except Exception as move_err:
-                                self.error_occurred.emit(f"Failed to move {generated_lrc_path.name} to target: {move_err}")
-                        elif expected_srt_file_path.exists(): # Should have been deleted by srt_to_lrc
-                            self.error_occurred.emit(f"LRC conversion failed but SRT still exists for {audio_file.name}")
-                        else:
-                            self.error_occurred.emit(f"LRC file not generated for {audio_file.name} after SRT processing.")
-
-                    else:
-                        # This case should ideally not happen if SRT writing succeeded
-                        self.error_occurred.emit(f"Temporary SRT file disappeared before conversion for {audio_file.name}")
-
-                except Exception as e:
-                    self.error_occurred.emit(f"Error processing {audio_file.name}: {e}\n{traceback.format_exc()}")
-                    # Clean up potentially leftover temp files for this failed audio
-                    if expected_srt_file_path.exists():
-                        try: expected_srt_file_path.unlink()
-                        except OSError: pass
-                    if generated_lrc_path and generated_lrc_path.exists():
-                         try: generated_lrc_path.unlink()
-                         except OSError: pass
-                    continue # Skip to next file
-
-                # Update progress after successful processing or handled error
-                self.progress.emit(progress_text, int(((idx + 1) / total_files) * 100))
+    def resume(self):
+        self.control.resume()
 
-        except Exception as e:
-            # Catch errors during setup (e.g., model load, file scan)
-            self.error_occurred.emit(f"An unexpected error occurred in worker setup: {e}\n{traceback.format_exc()}")
-        finally:
-            # --- Cleanup ---
-            if self.temp_dir_path.exists():
-                try:
-                    shutil.rmtree(self.temp_dir_path)
-                except Exception as clean_err:
-                     self.error_occurred.emit(f"Warning: Failed to delete temp directory {self.temp_dir_path}: {clean_err}")
-            # --- Unload model (optional, frees memory) ---
-            # If you want to free VRAM/RAM after processing:
-            # del self.whisper_model
-            # self.whisper_model = None
-            # import gc; gc.collect() # Try to force garbage collection
-            # Note: CUDA memory might need more specific handling if using GPU
-
-            if self._is_running:
-                self.finished_signal.emit()
+    def run(self):
+        if self.watch:
+            import watcher
+            self.summary = watcher.watch_folder(
+                self.folder_path, self.model_name, self.language,
+                backend=self.backend,
+                formats=self.formats,
+                vad=self.vad,
+                chunk_seconds=self.chunk_seconds,
+                route_languages=self.route_languages,
+                threads=self.threads,
+                keep_model=self.keep_model,
+                requeue_weaker=self.requeue_weaker,
+                on_progress=self._on_progress,
+                on_error=self._on_error,
+                on_file=self._on_file,
+                control=self.control,
+            )
+        else:
+            self.summary = pipeline.transcribe_folder(
+                self.folder_path, self.model_name, self.language,
+                backend=self.backend,
+                formats=self.formats,
+                vad=self.vad,
+                chunk_seconds=self.chunk_seconds,
+                batch_size=self.batch_size,
+                route_languages=self.route_languages,
+                workers=self.workers,
+                threads=self.threads,
+                keep_model=self.keep_model,
+                requeue_weaker=self.requeue_weaker,
+                on_progress=self._on_progress,
+                on_error=self._on_error,
+                on_file=self._on_file,
+                control=self.control,
+            )
+        self.finished_signal.emit()
 
 
 # --- Main Application Window ---
 class App(QWidget):
-    # (Constructor __init__ remains the same)
+    # Emitted from the preload thread; Qt queues it onto the GUI thread
+    model_preload_started = pyqtSignal(str, str) # model name, backend
+    model_preloaded = pyqtSignal(str, str, bool) # model name, error message ('' on success), False if already loaded
+    # Emitted from the startup check thread: check name, passed, message, last check
+    dependency_checked = pyqtSignal(str, bool, str, bool)
+
     def __init__(self):
         super().__init__()
         self.worker = None
+        self._close_when_finished = False # Window close requested while a run was stopping
+        self._pending_log = [] # (line, is_error) from the GUI thread, shown on the next refresh
+        self._dependencies = {"FFmpeg": "checking...", "Library": "checking..."} # Shown in dependency_label
+        self._missing_dependency = None # Message of the first failed check
+        self._library_ready = False # The selected backend's library passed the startup check
+        self._preload_executor = None # One thread, so selection changes load one model at a time
+        self._preloading = None # Future of the model preload in progress
+        self._profile_reported = False
+        self.model_preload_started.connect(self.on_model_preload_started)
+        self.model_preloaded.connect(self.on_model_preloaded)
+        self.dependency_checked.connect(self.on_dependency_checked)
         self.initUI()
+        # Coalesces log, progress and result updates, however many events the run produces
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(UI_REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh_ui)
+        self.refresh_timer.start()
+        # Once the window is up: check FFmpeg and the library, import it, then preload the default model
+        QTimer.singleShot(0, self.start_dependency_checks)
 
     # (initUI remains mostly the same, just remove whisper.exe mentions)
     def initUI(self):
         self.setWindowTitle("Audio to LRC Extractor (using Whisper Library)")
         icon_path = APP_BASE_DIR / "icon.png"
-        if icon_path.exists():
+        if icon_path.exists(): # Without it Qt shows its default icon
             self.setWindowIcon(QIcon(str(icon_path)))
-        else:
-             print(f"Debug: Icon not found at {icon_path}")
 
         initial_width = 750
         initial_height = 550
@@ -292,31 +317,126 @@ class App(QWidget):
 
         self.model_select = QComboBox()
         # Add models supported by the library. .en models are English-only.
-        self.model_select.addItems(["tiny", "tiny.en", "base", "base.en", "small", "small.en", "medium", "medium.en", "large-v1", "large-v2", "large-v3", "turbo"])
+        self.model_select.addItems(pipeline.MODEL_NAMES)
         self.model_select.setCurrentText("base")
-        form_layout.addRow("Whisper Model:", self.model_select)
+        self.model_select.currentTextChanged.connect(self.preload_selected_model)
+        self.keep_model_checkbox = QCheckBox("Keep loaded between runs")
+        self.keep_model_checkbox.setChecked(True)
+        self.keep_model_checkbox.toggled.connect(self.keep_model_toggled)
+        model_layout = QHBoxLayout()
+        model_layout.addWidget(self.model_select)
+        model_layout.addWidget(self.keep_model_checkbox)
+        form_layout.addRow("Whisper Model:", model_layout)
+
+        # Only installed backends are offered; quantized ones trade some accuracy for CPU throughput
+        self.backend_select = QComboBox()
+        for name in backends.available_backends():
+            self.backend_select.addItem(backends.BACKENDS[name].description, name)
+        self.backend_select.currentIndexChanged.connect(self.preload_selected_model)
+        form_layout.addRow("Backend:", self.backend_select)
 
         self.language_input = QLineEdit()
         self.language_input.setPlaceholderText("e.g., 'en', 'ja', 'auto' (leave blank for auto-detect)")
         self.language_input.setText("en")
         form_layout.addRow("Language:", self.language_input)
+
+        # One checkbox per output format; all of them come from the same transcription
+        self.format_checkboxes = {}
+        formats_layout = QHBoxLayout()
+        for name, writer in subtitles.WRITERS.items():
+            checkbox = QCheckBox(writer.description)
+            checkbox.setChecked(name in subtitles.DEFAULT_FORMATS)
+            self.format_checkboxes[name] = checkbox
+            formats_layout.addWidget(checkbox)
+        formats_layout.addStretch()
+        form_layout.addRow("Output Formats:", formats_layout)
+
+        self.vad_checkbox = QCheckBox("Skip silence (voice activity detection)")
+        form_layout.addRow("", self.vad_checkbox)
+
+        self.route_languages_checkbox = QCheckBox("Detect each file's language first (English files use the .en model)")
+        form_layout.addRow("", self.route_languages_checkbox)
+
+        # Long files in chunks: per-chunk progress, quicker Stop and resume after a crash
+        self.chunk_input = QSpinBox()
+        self.chunk_input.setRange(0, 3600)
+        self.chunk_input.setSingleStep(30)
+        self.chunk_input.setSpecialValueText("off")
+        self.chunk_input.setSuffix(" s")
+        self.chunk_input.setValue(0)
+        chunk_layout = QHBoxLayout()
+        chunk_layout.addWidget(self.chunk_input)
+        chunk_layout.addStretch()
+        form_layout.addRow("Chunk Long Files:", chunk_layout)
+
+        # Short files (up to 30 s) decoded several at a time; single worker process only
+        self.batch_input = QSpinBox()
+        self.batch_input.setRange(1, 32)
+        self.batch_input.setSpecialValueText("off")
+        self.batch_input.setValue(1)
+        batch_layout = QHBoxLayout()
+        batch_layout.addWidget(self.batch_input)
+        batch_layout.addStretch()
+        form_layout.addRow("Batch Short Files:", batch_layout)
+
+        # Each worker process loads its own copy of the model
+        self.workers_input = QSpinBox()
+        self.workers_input.setRange(1, max(1, os.cpu_count() or 1))
+        self.workers_input.setValue(1)
+        self.threads_input = QSpinBox()
+        self.threads_input.setRange(0, max(1, os.cpu_count() or 1))
+        self.threads_input.setSpecialValueText("auto")
+        self.threads_input.setValue(0)
+        parallel_layout = QHBoxLayout()
+        parallel_layout.addWidget(self.workers_input)
+        parallel_layout.addWidget(QLabel("Threads per worker:"))
+        parallel_layout.addWidget(self.threads_input)
+        parallel_layout.addStretch()
+        form_layout.addRow("Worker Processes:", parallel_layout)
+
+        self.requeue_weaker_checkbox = QCheckBox("Redo files transcribed with a weaker model")
+        form_layout.addRow("", self.requeue_weaker_checkbox)
+
+        # One process with a warm model; runs until Stop
+        self.watch_checkbox = QCheckBox("Watch the folder: keep running and transcribe new or changed files")
+        form_layout.addRow("", self.watch_checkbox)
         layout.addLayout(form_layout)
 
         # --- Progress Area ---
-        self.progress_label = QLabel("State: Idle. Requires FFmpeg installed.") # Note FFmpeg req.
+        self.progress_label = QLabel("State: Idle.")
         self.progress_label.setFont(QFont("Arial", 10))
         layout.addWidget(self.progress_label)
+        self.dependency_label = QLabel()
+        self.dependency_label.setWordWrap(True)
+        self.update_dependency_label()
+        layout.addWidget(self.dependency_label)
         self.progress_bar = QProgressBar()
         self.progress_bar.setValue(0)
         layout.addWidget(self.progress_bar)
 
-        # --- Log Area ---
-        self.log_output = QTextEdit()
-        self.log_output.setReadOnly(True)
+        # --- Log and Results Area ---
+        # Item views only lay out the visible rows, so thousands of lines stay cheap
+        self.log_model = LogModel(parent=self)
+        self.log_output = QListView()
+        self.log_output.setModel(self.log_model)
+        self.log_output.setUniformItemSizes(True)
         self.log_output.setFont(QFont("Consolas", 9))
-        self.log_output.setMaximumHeight(150)
-        layout.addWidget(QLabel("Log:"))
-        layout.addWidget(self.log_output)
+        self.log_output.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.log_output.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.results_model = ResultsModel(parent=self)
+        self.results_table = QTableView()
+        self.results_table.setModel(self.results_model)
+        self.results_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.results_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.results_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.results_table.verticalHeader().setDefaultSectionSize(self.results_table.fontMetrics().height() + 6)
+        self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.results_table.horizontalHeader().setStretchLastSection(True)
+        self.results_table.setColumnWidth(0, 220)
+        self.output_tabs = QTabWidget()
+        self.output_tabs.addTab(self.log_output, "Log")
+        self.output_tabs.addTab(self.results_table, "Results")
+        layout.addWidget(self.output_tabs)
 
         # --- Buttons ---
         button_layout = QHBoxLayout()
@@ -327,7 +447,12 @@ class App(QWidget):
         self.stop_button.setFont(QFont("Arial", 12))
         self.stop_button.setEnabled(False)
         self.stop_button.clicked.connect(self.stop_processing)
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.setFont(QFont("Arial", 12))
+        self.pause_button.setEnabled(False)
+        self.pause_button.clicked.connect(self.toggle_pause)
         button_layout.addWidget(self.start_button)
+        button_layout.addWidget(self.pause_button)
         button_layout.addWidget(self.stop_button)
         layout.addLayout(button_layout)
 
@@ -342,15 +467,135 @@ class App(QWidget):
         if folder:
             self.folder_path_edit.setText(folder)
 
-    # (log_message remains the same)
-    def log_message(self, message: str):
-        self.log_output.append(message)
-        QApplication.processEvents()
+    # --- Startup Checks and Warmup (off the GUI thread) ---
+    def start_dependency_checks(self):
+        startup.profile.mark("event loop running")
+        backend = self.backend_select.currentData()
+        threading.Thread(target=self._check_dependencies, args=(backend,), name="startup-checks", daemon=True).start()
+
+    def _check_dependencies(self, backend):
+        with startup.profile.step("check FFmpeg"):
+            ffmpeg = startup.check_ffmpeg()
+        self.dependency_checked.emit("FFmpeg", ffmpeg.ok, ffmpeg.message, False)
+        with startup.profile.step("check transcription libraries"):
+            library = startup.check_backends()
+        if library.ok and backend:
+            library = startup.import_backend(backend) # whisper pulls in torch; the first model load is quicker
+        if library.ok and backend:
+            try:
+                with startup.profile.step("find default device"):
+                    model_cache.resolve_device(backend=backend) # Probes CUDA once, here instead of on the GUI thread
+            except Exception as e:
+                library = startup.CheckResult(False, f"Could not find a device for {backend}: {e}")
+        self.dependency_checked.emit("Library", library.ok, library.message, True)
+
+    def on_dependency_checked(self, name: str, ok: bool, message: str, last: bool):
+        self._dependencies[name] = message if ok else f"missing ({message})"
+        self.update_dependency_label()
+        if not ok:
+            self._missing_dependency = self._missing_dependency or message
+            self.log_message(f"[ERROR] {message}", is_error=True)
+        if last:
+            if ok:
+                self._library_ready = True
+                self.preload_selected_model()
+            if self._preloading is None:
+                self.report_startup_profile() # Nothing left to warm up
+
+    def update_dependency_label(self):
+        self.dependency_label.setText(" | ".join(f"{name}: {status}" for name, status in self._dependencies.items()))
+        self.dependency_label.setStyleSheet("color: red;" if self._missing_dependency else "color: gray;")
+
+    def report_startup_profile(self):
+        """With --profile-startup, prints the startup steps once (stderr and the log)."""
+        if not startup.profile.enabled or self._profile_reported:
+            return
+        self._profile_reported = True
+        report = startup.profile.report()
+        print(report, file=sys.stderr, flush=True)
+        for line in report.splitlines():
+            self.log_message(line)
+
+    def preload_selected_model(self):
+        """With 'Keep model loaded', loads the selected model in the background once the library check passed."""
+        if not self.keep_model_checkbox.isChecked() or self.worker is not None or not self._library_ready:
+            return
+        model = self.model_select.currentText()
+        backend = self.backend_select.currentData()
+        if backend is None: # No library installed; the startup check already reported it
+            return
+        try:
+            if self._preload_executor is None:
+                self._preload_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-preload")
+            self._preloading = self._preload_executor.submit(self._preload, model, backend)
+        except Exception as e: # A Qt slot must not raise
+            self.log_message(f"[ERROR] Failed to preload Whisper model '{model}': {e}", is_error=True)
+
+    def _preload(self, model: str, backend: str):
+        # Not on the GUI thread: is_loaded() resolves the device and a new backend's library is imported here
+        try:
+            if model_cache.default_manager.is_loaded(model, backend=backend):
+                self.model_preloaded.emit(model, "", False)
+                return
+            self.model_preload_started.emit(model, backend)
+            with startup.profile.step(f"preload model '{model}'", backend):
+                model_cache.default_manager.get(model, backend=backend)
+        except Exception as e:
+            self.model_preloaded.emit(model, str(e) or type(e).__name__, True)
+        else:
+            self.model_preloaded.emit(model, "", True)
+
+    def on_model_preload_started(self, model: str, backend: str):
+        self.log_message(f"Preloading Whisper model '{model}' ({backend}) in the background...")
+
+    def on_model_preloaded(self, model: str, error: str, loaded: bool):
+        self._preloading = None
+        if error:
+            self.log_message(f"[ERROR] Failed to preload Whisper model '{model}': {error}", is_error=True)
+        elif loaded:
+            self.log_message(f"Model '{model}' loaded.")
+        self.report_startup_profile()
+
+    def keep_model_toggled(self, checked: bool):
+        if checked:
+            self.preload_selected_model()
+        elif self.worker is None and model_cache.default_manager.unload():
+            self.log_message("Unloaded cached Whisper models.")
+
+    def log_message(self, message: str, is_error: bool = False):
+        """Queues a line for the log; it shows up on the next refresh_ui()."""
+        self._pending_log.append((message, is_error))
+
+    def refresh_ui(self):
+        """Applies everything queued since the last refresh in one update per widget."""
+        lines, self._pending_log = self._pending_log, []
+        entries = []
+        if self.worker is not None:
+            progress, worker_lines, entries, error = self.worker.drain()
+            lines += worker_lines
+            if progress:
+                self.progress_label.setText(progress[0])
+                self.progress_bar.setValue(progress[1])
+            if error:
+                self.progress_label.setText("State: Error occurred (see log)")
+                self.progress_label.setStyleSheet("color: red;")
+        if lines:
+            scrollbar = self.log_output.verticalScrollBar()
+            follow = scrollbar.value() >= scrollbar.maximum() # Don't jump while the user reads older lines
+            self.log_model.append_lines(lines)
+            if follow:
+                self.log_output.scrollToBottom()
+        if entries:
+            self.results_model.append_entries(entries)
 
     def start_processing(self):
         folder_str = self.folder_path_edit.text().strip()
         model = self.model_select.currentText()
+        backend = self.backend_select.currentData()
         language = self.language_input.text().strip() or "auto" # Default to auto if empty
+        workers = self.workers_input.value()
+        threads = self.threads_input.value() or None # 0 = auto
+        formats = tuple(name for name, checkbox in self.format_checkboxes.items() if checkbox.isChecked())
 
         if not folder_str:
             QMessageBox.warning(self, "Input Error", "Please select an audio folder.")
@@ -359,52 +604,71 @@ class App(QWidget):
         if not folder_path.is_dir():
             QMessageBox.warning(self, "Input Error", f"Selected path is not a valid folder:\n{folder_str}")
             return
+        if not formats:
+            QMessageBox.warning(self, "Input Error", "Please select at least one output format.")
+            return
 
-        # Double-check ffmpeg before starting (user might have uninstalled it)
-        if shutil.which("ffmpeg") is None:
+        if not backend:
+            QMessageBox.critical(self, "Error", self._missing_dependency or "No transcription library found.")
+            return
+        # Double-check ffmpeg before starting (the background check may not have finished, or it was uninstalled)
+        if not pipeline.check_ffmpeg():
              QMessageBox.critical(self, "Error", "FFmpeg not found in system PATH.\nCannot proceed without FFmpeg.")
              return
 
-        self.log_output.clear()
+        self.refresh_ui() # Flush lines from before this run, then start from empty views
+        self.log_model.clear()
+        self.results_model.clear()
         self.log_message(f"Using Base Path: {BASE_PATH}")
         self.log_message("Starting processing...")
         self.log_message(f"Folder: {folder_path}")
         self.log_message(f"Model: {model}")
+        self.log_message(f"Backend: {backend}")
         self.log_message(f"Language: {language if language else 'auto-detect'}")
+        self.log_message(f"Formats: {', '.join(formats)}")
+        if self.watch_checkbox.isChecked():
+            self.log_message("Watching the folder until Stop (one process" +
+                             (f"; Worker Processes {workers} doesn't apply)" if workers > 1 else ")"))
+        else:
+            self.log_message(f"Workers: {workers}, threads per worker: {threads or 'auto'}")
 
         self.set_controls_enabled(False)
         self.progress_label.setText("State: Initializing...") # Update state
 
-        self.worker = Worker(folder_path, model, language)
-        self.worker.progress.connect(self.update_progress)
-        self.worker.error_occurred.connect(self.handle_error)
+        self.worker = Worker(folder_path, model, language, workers, threads,
+                             keep_model=self.keep_model_checkbox.isChecked(),
+                             requeue_weaker=self.requeue_weaker_checkbox.isChecked(), formats=formats,
+                             vad=self.vad_checkbox.isChecked(), chunk_seconds=self.chunk_input.value() or None,
+                             batch_size=self.batch_input.value(), backend=backend,
+                             route_languages=self.route_languages_checkbox.isChecked(),
+                             watch=self.watch_checkbox.isChecked())
         self.worker.finished_signal.connect(self.worker_finished)
         self.worker.start()
 
-    # (stop_processing remains the same)
     def stop_processing(self):
          if self.worker and self.worker.isRunning():
-            self.log_message("Attempting to stop processing (will finish current file)...")
+            self.log_message("Stopping (the current file is dropped, finished chunks are kept)...")
             self.worker.stop() # Signal the worker loop to stop
             self.stop_button.setEnabled(False)
-            # Note: The actual transcription might continue until finished
-
-    # (update_progress remains the same)
-    def update_progress(self, text, value):
-        self.progress_label.setText(text)
-        self.progress_bar.setValue(value)
-        self.log_message(text)
-
-    # (handle_error remains the same)
-    def handle_error(self, error_message):
-        self.log_message(f"[ERROR] {error_message}")
-        self.progress_label.setText("State: Error occurred (see log)")
-        self.progress_label.setStyleSheet("color: red;")
+            self.pause_button.setEnabled(False)
 
+    def toggle_pause(self):
+        if not (self.worker and self.worker.isRunning()):
+            return
+        if self.worker.control.paused:
+            self.worker.resume()
+            self.pause_button.setText("Pause")
+            self.progress_label.setText("State: Resumed.")
+            self.log_message("Resumed.")
+        else:
+            self.worker.pause()
+            self.pause_button.setText("Resume")
+            self.progress_label.setText("State: Paused (model stays loaded).")
+            self.log_message("Paused.")
 
-    # (worker_finished remains the same)
     def worker_finished(self):
-        if self.worker and not self.worker._is_running:
+        self.refresh_ui() # Everything the worker queued before finishing
+        if self.worker and self.worker.control.cancelled:
              status_message = "State: Stopped by user."
              log_suffix = "Processing stopped."
         else:
@@ -417,6 +681,8 @@ class App(QWidget):
         self.log_message(log_suffix)
         self.set_controls_enabled(True)
         self.worker = None
+        if self._close_when_finished:
+            self.close()
 
     # (set_controls_enabled remains the same)
     def set_controls_enabled(self, enabled: bool):
@@ -424,35 +690,53 @@ class App(QWidget):
         self.select_folder_button.setEnabled(enabled)
         self.folder_path_edit.setEnabled(enabled)
         self.model_select.setEnabled(enabled)
+        self.backend_select.setEnabled(enabled)
+        self.keep_model_checkbox.setEnabled(enabled)
         self.language_input.setEnabled(enabled)
+        self.workers_input.setEnabled(enabled)
+        self.threads_input.setEnabled(enabled)
+        self.requeue_weaker_checkbox.setEnabled(enabled)
+        self.vad_checkbox.setEnabled(enabled)
+        self.route_languages_checkbox.setEnabled(enabled)
+        self.watch_checkbox.setEnabled(enabled)
+        self.chunk_input.setEnabled(enabled)
+        self.batch_input.setEnabled(enabled)
+        for checkbox in self.format_checkboxes.values():
+            checkbox.setEnabled(enabled)
         self.stop_button.setEnabled(not enabled)
+        self.pause_button.setEnabled(not enabled)
+        self.pause_button.setText("Pause")
 
-    # (closeEvent remains the same)
     def closeEvent(self, event):
         if self.worker and self.worker.isRunning():
+            if self._close_when_finished:
+                event.ignore() # Already stopping; worker_finished() closes the window
+                return
             reply = QMessageBox.question(self, 'Confirm Exit',
-                                         "Processing is ongoing. Stop and exit?\n(Current file might finish processing)",
+                                         "Processing is ongoing. Stop and exit?\n(The current file is dropped, finished chunks are kept)",
                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
             if reply == QMessageBox.Yes:
                  self.stop_processing()
-                 # We can't forcefully kill the transcribe call easily
-                 # We just wait briefly for the GUI to acknowledge stop
-                 self.worker.wait(500)
-                 event.accept()
-            else:
-                 event.ignore()
+                 # The run stops within seconds; close once the thread is done instead of abandoning it
+                 self._close_when_finished = True
+                 self.progress_label.setText("State: Stopping, the window closes when done...")
+            event.ignore()
         else:
             event.accept()
 
 
 # --- Entry Point ---
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-
-    # Initial checks already happened before QApplication was fully initialized
-    # We rely on sys.exit() having been called if checks failed
-
-    window = App()
+    multiprocessing.freeze_support() # Needed for worker processes in frozen builds
+    if "--profile-startup" in sys.argv:
+        sys.argv.remove("--profile-startup")
+        startup.profile.enabled = True
+    with startup.profile.step("create QApplication"):
+        app = QApplication(sys.argv)
+
+    with startup.profile.step("build window"):
+        window = App()
     window.show()
+    startup.profile.mark("window shown")
     sys.exit(app.exec_())
 
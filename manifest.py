@@ -0,0 +1,279 @@
+"""
+Persistent processing manifest (SQLite) for incremental library scans.
+
+Each audio file is recorded with its size, mtime (and optionally a content hash)
+plus the model, language and options that produced its outputs. Each directory is
+recorded with its mtime and the names of its audio files, outputs and
+subdirectories, so a rescan (scanner.walk) only lists directories whose mtime
+changed and only stats the audio files in the others. Paths are stored relative to the library
+root, so the library can be mounted at a different path later.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import scanner
+
+SCHEMA_VERSION = 2
+
+# Default location: <library>/.auto2lrc/manifest.sqlite3 (this directory is never scanned)
+MANIFEST_DIR_NAME = ".auto2lrc"
+MANIFEST_FILE_NAME = "manifest.sqlite3"
+
+# Rough quality order of the Whisper models, used to re-queue files that were
+# transcribed with a weaker model than the one now selected. '.en' variants rank
+# like their multilingual counterpart.
+MODEL_RANK = {
+    "tiny": 0, "base": 1, "small": 2, "medium": 3,
+    "large-v1": 4, "turbo": 4, "large-v2": 5, "large-v3": 6, "large": 6,
+}
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_EXTERNAL = "external" # Output already existed when the file was first seen
+
+
+def model_rank(model_name):
+    """Rank of a model name from MODEL_RANK, or None for unknown models (e.g. checkpoint paths)."""
+    if not model_name:
+        return None
+    name = model_name[:-3] if model_name.endswith(".en") else model_name
+    return MODEL_RANK.get(name)
+
+
+def default_manifest_path(root, fallback_dir) -> Path:
+    """Manifest next to the library, or under fallback_dir (a cache dir) if the library is read-only."""
+    root = Path(root).resolve()
+    if os.access(root, os.W_OK):
+        return root / MANIFEST_DIR_NAME / MANIFEST_FILE_NAME
+    name = hashlib.sha1(str(root).encode("utf-8")).hexdigest()[:16]
+    return Path(fallback_dir) / "manifests" / f"{name}.sqlite3"
+
+
+def file_hash(path, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of the file contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    SQLite index of a library folder. Not thread-safe: use it from the thread that created it.
+
+    Args:
+        db_path: SQLite file (created if missing).
+        root: Library root; recorded paths are relative to it.
+        audio_extensions: Lower-case suffixes (with dot) that count as audio.
+        output_suffixes: Suffixes of the outputs (e.g. '.lrc', '.srt') that must all exist
+            for a file to count as done.
+    """
+
+    def __init__(self, db_path, root, audio_extensions, output_suffixes=('.lrc',)):
+        self.db_path = Path(db_path)
+        self.root = Path(root)
+        self.audio_extensions = {ext.lower() for ext in audio_extensions}
+        self.output_suffixes = tuple(output_suffixes)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), timeout=30) # Scan and record use separate connections
+        # The manifest usually lives in the library, which may be a network share: WAL needs shared
+        # memory that those don't provide, so keep the rollback journal (jobqueue.JobQueue does the same)
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    content_hash TEXT,
+                    status TEXT NOT NULL,
+                    model TEXT,
+                    language TEXT,
+                    options TEXT,
+                    outputs TEXT,
+                    error TEXT,
+                    updated_at REAL NOT NULL
+                )""")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS dirs (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    audio TEXT NOT NULL,
+                    outputs TEXT NOT NULL,
+                    subdirs TEXT NOT NULL
+                )""")
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version < 2:
+                # Version 1 listings only kept .lrc names; they are just a cache, so list again
+                self._db.execute("DELETE FROM dirs")
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _relative(self, path) -> str:
+        return Path(path).relative_to(self.root).as_posix()
+
+    # --- Scanning ---
+    def _cached_listings(self) -> dict:
+        """rel_dir -> (mtime_ns, audio names, output names, subdir names) from the last scan."""
+        return {path: (mtime_ns, json.loads(audio), json.loads(outputs), json.loads(subdirs))
+                for path, mtime_ns, audio, outputs, subdirs
+                in self._db.execute("SELECT path, mtime_ns, audio, outputs, subdirs FROM dirs")}
+
+    def iter_scan(self, model_name=None, requeue_weaker: bool = False, hash_files: bool = False,
+                  threads: int = scanner.DEFAULT_SCAN_THREADS, stop_event=None, stats=None):
+        """
+        Walks the library (see scanner.walk) and yields the audio files that need processing.
+
+        A file is skipped when its recorded size/mtime (or, with hash_files, its
+        content hash) still match, it was processed successfully and all its
+        outputs are still there. Files seen for the first time that already have
+        all outputs are recorded as 'external' and skipped, like the old .lrc existence check.
+        With requeue_weaker, files produced by a lower-ranked model than model_name
+        are queued again. stats['skipped'] is incremented for every skipped file.
+        """
+        stats = stats if stats is not None else {}
+        stats.setdefault("skipped", 0)
+        wanted_rank = model_rank(model_name) if requeue_weaker else None
+        previous = self._cached_listings() # Read once: the scan threads must not touch the connection
+
+        def cached_listing(rel_dir, mtime_ns):
+            cached = previous.get(rel_dir)
+            if cached and cached[0] == mtime_ns:
+                return cached[1:]
+            return None
+
+        seen = []
+        completed = False
+        try:
+            for listing in scanner.walk(self.root, self.audio_extensions, threads,
+                                        cached_listing=cached_listing, skip_dir_names=(MANIFEST_DIR_NAME,),
+                                        stop_event=stop_event):
+                pending = []
+                with self._db: # One short transaction per directory, so other connections can write
+                    if not listing.from_cache:
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO dirs (path, mtime_ns, audio, outputs, subdirs) VALUES (?, ?, ?, ?, ?)",
+                            (listing.rel_dir, listing.mtime_ns, json.dumps([name for name, _, _ in listing.audio]),
+                             json.dumps(sorted(listing.outputs)), json.dumps(listing.subdirs)))
+                    abs_dir = os.path.join(self.root, listing.rel_dir) if listing.rel_dir else str(self.root)
+                    for name, size, mtime_ns in listing.audio:
+                        rel_path = f"{listing.rel_dir}/{name}" if listing.rel_dir else name
+                        abs_path = os.path.join(abs_dir, name)
+                        seen.append(rel_path)
+                        has_output = scanner.has_outputs(listing, name, self.output_suffixes)
+                        if self._is_done(rel_path, abs_path, size, mtime_ns, has_output, wanted_rank, hash_files):
+                            stats["skipped"] += 1
+                        else:
+                            pending.append(Path(abs_path))
+                yield from pending
+            completed = stop_event is None or not stop_event.is_set()
+        finally:
+            if completed:
+                with self._db:
+                    self._forget_missing(seen)
+
+    def scan(self, model_name=None, requeue_weaker: bool = False, hash_files: bool = False):
+        """
+        Non-streaming iter_scan().
+
+        Returns:
+            tuple: (list of Paths to process, number of files skipped)
+        """
+        stats = {}
+        pending = list(self.iter_scan(model_name, requeue_weaker, hash_files, stats=stats))
+        return pending, stats["skipped"]
+
+    def _is_done(self, rel_path, abs_path, size, mtime_ns, has_output, wanted_rank, hash_files) -> bool:
+        row = self._db.execute("SELECT size, mtime_ns, content_hash, status, model FROM files WHERE path = ?",
+                               (rel_path,)).fetchone()
+        if row is None:
+            if has_output:
+                # Processed before the manifest existed (or by another tool)
+                self._db.execute(
+                    "INSERT INTO files (path, size, mtime_ns, content_hash, status, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (rel_path, size, mtime_ns, file_hash(abs_path) if hash_files else None,
+                     STATUS_EXTERNAL, time.time()))
+            return has_output
+
+        recorded_size, recorded_mtime_ns, content_hash, status, model = row
+        if status not in (STATUS_OK, STATUS_EXTERNAL) or not has_output:
+            return False
+        if (recorded_size, recorded_mtime_ns) != (size, mtime_ns):
+            # Touched or copied files keep their results if the contents didn't change
+            if not (hash_files and content_hash and file_hash(abs_path) == content_hash):
+                return False
+            self._db.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?",
+                             (size, mtime_ns, rel_path))
+        if wanted_rank is not None:
+            done_rank = model_rank(model)
+            if done_rank is not None and done_rank < wanted_rank:
+                return False
+        return True
+
+    def _forget_missing(self, seen: list):
+        """Drops records of audio files that are no longer in the library."""
+        self._db.execute("CREATE TEMP TABLE IF NOT EXISTS seen (path TEXT PRIMARY KEY)")
+        self._db.execute("DELETE FROM seen")
+        self._db.executemany("INSERT OR IGNORE INTO seen (path) VALUES (?)", ((p,) for p in seen))
+        self._db.execute("DELETE FROM files WHERE path NOT IN (SELECT path FROM seen)")
+        self._db.execute("DELETE FROM seen")
+
+    def needs_processing(self, audio_file, model_name=None, requeue_weaker: bool = False,
+                         hash_files: bool = False) -> bool:
+        """iter_scan()'s check for one file (e.g. reported by a filesystem watcher); False if it is gone."""
+        audio_file = Path(audio_file)
+        try:
+            st = audio_file.stat()
+        except OSError:
+            return False
+        has_output = all(audio_file.with_name(audio_file.stem + suffix).exists() for suffix in self.output_suffixes)
+        wanted_rank = model_rank(model_name) if requeue_weaker else None
+        with self._db:
+            return not self._is_done(self._relative(audio_file), str(audio_file), st.st_size, st.st_mtime_ns,
+                                     has_output, wanted_rank, hash_files)
+
+    # --- Recording results ---
+    def record(self, audio_file, status: str, *, model=None, language=None, options=None,
+               outputs=(), error=None, hash_files: bool = False):
+        """Records the outcome of processing audio_file (stat is taken now)."""
+        audio_file = Path(audio_file)
+        try:
+            st = audio_file.stat()
+        except OSError:
+            return # File vanished while it was being processed
+        rel_path = self._relative(audio_file)
+        content_hash = file_hash(audio_file) if hash_files else None
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, content_hash, status, model, language, "
+                "options, outputs, error, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (rel_path, st.st_size, st.st_mtime_ns, content_hash, status, model, language,
+                 json.dumps(options or {}, sort_keys=True),
+                 json.dumps([self._relative(p) for p in outputs]), error, time.time()))
+
+    def get(self, audio_file):
+        """The manifest record of audio_file as a dict, or None."""
+        cursor = self._db.execute("SELECT * FROM files WHERE path = ?", (self._relative(audio_file),))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        record = dict(zip([column[0] for column in cursor.description], row))
+        record["options"] = json.loads(record["options"]) if record["options"] else {}
+        record["outputs"] = json.loads(record["outputs"]) if record["outputs"] else []
+        return record
@@ -0,0 +1,244 @@
+"""
+Structured run metrics: stage timing spans, counters and gauges.
+
+Every recorded span, counter change and gauge update can be streamed to sinks
+as one JSON object per line (see JsonlSink), and the running totals are
+available in the Prometheus text format, written to a file (PrometheusFile,
+e.g. for node_exporter's textfile collector) or served over HTTP
+(serve_prometheus). With no sinks attached, recording only updates a few
+numbers in memory, so the pipeline always records into `default`.
+
+Stages: scan, decode, model_load, detect (language pre-pass), transcribe, format, write.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import subtitles
+
+PREFIX = "auto2lrc_"
+STAGES = ("scan", "decode", "model_load", "detect", "transcribe", "format", "write")
+DEFAULT_PROMETHEUS_INTERVAL = 15 # Seconds between rewrites of a Prometheus text file
+
+
+def _number(value) -> str:
+    return str(value) if isinstance(value, int) else repr(round(float(value), 6))
+
+
+def rss_bytes():
+    """Current resident set size of this process (peak RSS where the current one isn't available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024 # Bytes on macOS, KiB elsewhere
+
+
+@contextmanager
+def timed(timings: dict, stage: str):
+    """Adds the time spent in the block to timings[stage]."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+
+class Metrics:
+    """Thread-safe counters, gauges and per-stage span totals, with optional event sinks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sinks = []
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.gauges = {}
+            self.stages = {} # stage -> [count, total seconds]
+
+    def add_sink(self, sink):
+        """sink(event: dict) is called for every event (from any thread)."""
+        with self._lock:
+            self._sinks.append(sink)
+
+    def remove_sink(self, sink):
+        with self._lock:
+            if sink in self._sinks:
+                self._sinks.remove(sink)
+
+    def event(self, kind: str, **fields):
+        """Sends {"ts", "event": kind, **fields} to the sinks."""
+        if not self._sinks:
+            return
+        event = {"ts": round(time.time(), 3), "event": kind, **fields}
+        for sink in list(self._sinks):
+            try:
+                sink(event)
+            except Exception:
+                pass # Metrics must never break a run
+
+    def span(self, stage: str, seconds: float, **labels):
+        """Records a finished stage (e.g. span('decode', 0.4, file=...))."""
+        with self._lock:
+            totals = self.stages.setdefault(stage, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+        self.event("span", stage=stage, seconds=round(seconds, 4), **labels)
+
+    @contextmanager
+    def timer(self, stage: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.span(stage, time.perf_counter() - started, **labels)
+
+    def count(self, name: str, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            total = self.counters[name]
+        self.event("counter", name=name, value=value, total=total)
+
+    def gauge(self, name: str, value):
+        if value is None:
+            return
+        with self._lock:
+            self.gauges[name] = value
+        self.event("gauge", name=name, value=value)
+
+    def file_done(self, entry: dict):
+        """Spans, counters and gauges for one per-file summary entry (see pipeline.run_file)."""
+        labels = {"file": entry["path"]}
+        if entry.get("worker") is not None:
+            labels["worker"] = entry["worker"]
+        for stage, seconds in (entry.get("timings") or {}).items():
+            self.span(stage, seconds, **labels)
+        self.count("files_ok" if entry["status"] == "ok" else "files_failed")
+        if entry.get("cached"):
+            self.count("files_cached")
+        duration = entry.get("duration_seconds")
+        transcribe_seconds = (entry.get("timings") or {}).get("transcribe")
+        if entry["status"] == "ok" and duration:
+            self.count("audio_seconds", duration)
+            if transcribe_seconds:
+                self.count("transcribe_seconds", transcribe_seconds)
+                self.count("transcribed_audio_seconds", duration)
+        with self._lock:
+            transcribed = self.counters.get("transcribed_audio_seconds")
+            rtf = self.counters.get("transcribe_seconds", 0.0) / transcribed if transcribed else None
+        self.gauge("realtime_factor", round(rtf, 4) if rtf is not None else None) # Transcribe time per audio second
+        self.gauge("rss_bytes", rss_bytes())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"counters": dict(self.counters), "gauges": dict(self.gauges),
+                    "stages": {stage: {"count": count, "seconds": round(total, 4)}
+                               for stage, (count, total) in self.stages.items()}}
+
+    def prometheus_text(self) -> str:
+        """The current totals in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            lines += [f"# TYPE {PREFIX}{name}_total counter", f"{PREFIX}{name}_total {_number(value)}"]
+        for name, value in sorted(snapshot["gauges"].items()):
+            lines += [f"# TYPE {PREFIX}{name} gauge", f"{PREFIX}{name} {_number(value)}"]
+        if snapshot["stages"]:
+            lines.append(f"# TYPE {PREFIX}stage_seconds summary")
+            for stage, totals in sorted(snapshot["stages"].items()):
+                lines.append(f'{PREFIX}stage_seconds_sum{{stage="{stage}"}} {_number(totals["seconds"])}')
+                lines.append(f'{PREFIX}stage_seconds_count{{stage="{stage}"}} {totals["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+# --- Sinks and Exporters ---
+class JsonlSink:
+    """Appends every event to a file as one JSON object per line."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1) # Line buffered: readable while running
+
+    def __call__(self, event: dict):
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusFile:
+    """Rewrites a Prometheus text file (atomically) every `interval` seconds and on close()."""
+
+    def __init__(self, metrics: Metrics, path, interval: float = DEFAULT_PROMETHEUS_INTERVAL):
+        self.metrics = metrics
+        self.path = path
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="metrics-prometheus", daemon=True)
+        self._thread.start()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            self.write()
+
+    def write(self):
+        try:
+            subtitles.write_atomic(self.path, self.metrics.prometheus_text())
+        except OSError:
+            pass
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self.write()
+
+
+class PrometheusServer(ThreadingHTTPServer):
+    def close(self):
+        """Stops serving and releases the port."""
+        self.shutdown()
+        self.server_close()
+
+
+def serve_prometheus(metrics: Metrics, port: int, host: str = "127.0.0.1") -> PrometheusServer:
+    """
+    Serves metrics.prometheus_text() at http://host:port/metrics on a daemon thread.
+    Call .close() on the returned server to stop it.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass # Keep scrapes out of stderr
+
+    server = PrometheusServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+# Recorded into by the pipeline in this process; the CLI attaches the sinks
+default = Metrics()
@@ -0,0 +1,158 @@
+"""
+Process-wide cache of loaded Whisper models.
+
+Models are kept keyed by (name, device, dtype, backend) and evicted least-recently-used
+first once their combined size goes over the memory budget. A model that is
+being loaded is shared by every caller asking for it, so a background preload
+and a run that starts before it finished don't load the same model twice.
+"""
+import gc
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import backends
+
+# Default budget; override with the AUTO2LRC_MODEL_MEMORY_MB environment variable
+DEFAULT_MEMORY_BUDGET_MB = 4096
+
+
+def _default_budget_bytes() -> int:
+    try:
+        return int(os.environ.get("AUTO2LRC_MODEL_MEMORY_MB", DEFAULT_MEMORY_BUDGET_MB)) * 1024 * 1024
+    except ValueError:
+        return DEFAULT_MEMORY_BUDGET_MB * 1024 * 1024
+
+
+_default_devices = {} # backend name -> its default device (finding it can import torch and probe CUDA)
+
+
+def resolve_device(device=None, backend: str = backends.DEFAULT_BACKEND) -> str:
+    """The backend's default when no device is given (CUDA when available, else CPU); looked up once per backend."""
+    if device:
+        return device
+    if backend not in _default_devices:
+        _default_devices[backend] = backends.get_backend(backend).default_device()
+    return _default_devices[backend]
+
+
+def load_model(name: str, device: str, dtype, backend: str = backends.DEFAULT_BACKEND):
+    """Default loader: the backend's load() (see backends.py)."""
+    return backends.get_backend(backend).load(name, device, dtype)
+
+
+def _free_memory(device: str):
+    gc.collect() # Try to force garbage collection
+    if device.startswith("cuda"):
+        try:
+            import torch
+            torch.cuda.empty_cache() # CUDA memory isn't returned by gc alone
+        except Exception:
+            pass
+
+
+class ModelManager:
+    """LRU cache of loaded models under a memory budget (thread-safe)."""
+
+    def __init__(self, memory_budget_bytes=None, loader=load_model):
+        self.memory_budget_bytes = memory_budget_bytes if memory_budget_bytes is not None else _default_budget_bytes()
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._models = OrderedDict() # key -> (model, size in bytes), least recently used first
+        self._loading = {} # key -> Future of a load in progress
+        self._preload_executor = None
+
+    def _key(self, name, device, dtype, backend) -> tuple:
+        return (name, resolve_device(device, backend), dtype, backend) # dtype None = the backend's default
+
+    def get(self, name: str, device=None, dtype=None, backend: str = backends.DEFAULT_BACKEND):
+        """Returns the model, loading it (or waiting for a load already in progress) if needed."""
+        key = self._key(name, device, dtype, backend)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                future = self._loading[key] = Future()
+        if not owner:
+            return future.result() # Re-raises the loader's exception
+
+        try:
+            model = self._loader(*key)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._loading[key]
+            self._models[key] = (model, backends.model_size_bytes(model, *key))
+            evicted = self._evict_over_budget(keep=key)
+        future.set_result(model)
+        for evicted_key in evicted:
+            _free_memory(evicted_key[1])
+        return model
+
+    def preload(self, name: str, device=None, dtype=None, backend: str = backends.DEFAULT_BACKEND) -> Future:
+        """Loads the model on a background thread; the returned Future resolves to the model."""
+        with self._lock:
+            if self._preload_executor is None:
+                self._preload_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-preload")
+        return self._preload_executor.submit(self.get, name, device, dtype, backend)
+
+    def is_loaded(self, name: str, device=None, dtype=None, backend: str = backends.DEFAULT_BACKEND) -> bool:
+        key = self._key(name, device, dtype, backend)
+        with self._lock:
+            return key in self._models
+
+    def loaded(self) -> list:
+        """(key, size in bytes) of the loaded models, least recently used first."""
+        with self._lock:
+            return [(key, size) for key, (_, size) in self._models.items()]
+
+    def unload(self, name=None, device=None, dtype=None, backend: str = backends.DEFAULT_BACKEND) -> int:
+        """
+        Drops cached models so their memory can be reclaimed.
+        With no name every model is unloaded; otherwise only the matching key.
+
+        Returns:
+            int: Number of models unloaded.
+        """
+        with self._lock:
+            if name is None:
+                keys = list(self._models)
+            else:
+                key = self._key(name, device, dtype, backend)
+                keys = [key] if key in self._models else []
+            for key in keys:
+                del self._models[key]
+        for key in keys:
+            _free_memory(key[1])
+        return len(keys)
+
+    def set_memory_budget(self, memory_budget_bytes: int):
+        with self._lock:
+            self.memory_budget_bytes = memory_budget_bytes
+            evicted = self._evict_over_budget()
+        for key in evicted:
+            _free_memory(key[1])
+
+    def _evict_over_budget(self, keep=None) -> list:
+        """Evicts LRU models (never `keep`) until under budget. Caller holds the lock."""
+        evicted = []
+        total = sum(size for _, size in self._models.values())
+        for key in list(self._models):
+            if total <= self.memory_budget_bytes:
+                break
+            if key == keep:
+                continue # A model bigger than the whole budget still has to stay usable
+            total -= self._models.pop(key)[1]
+            evicted.append(key)
+        return evicted
+
+
+# Shared by the GUI, the CLI and each worker process
+default_manager = ModelManager()
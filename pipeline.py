@@ -0,0 +1,738 @@
+"""
+Qt-free transcription pipeline shared by the GUI (main.py) and the CLI (cli.py).
+
+Nothing in this module imports PyQt5, numpy is only imported once a file is decoded
+(decoder.py, vad.py) and Whisper only when a model is actually loaded, so importing
+it is cheap. Progress is reported through
+plain callbacks instead of Qt signals.
+"""
+import os
+import shutil
+import time
+import traceback
+from pathlib import Path
+from typing import NamedTuple
+
+import backends
+import batching
+import chunking
+import decoder
+import manifest
+import metrics
+import model_cache
+import result_cache
+import routing
+import runcontrol
+import scanner
+import subtitles
+from subtitles import format_srt_time # Kept importable from here
+
+# --- Constants ---
+AUDIO_EXTENSIONS = {'.mp3', '.m4a', '.wav', '.flac', '.ogg', '.opus', '.mkv', '.mp4'} # Whisper supports more
+# Models supported by the library. .en models are English-only.
+MODEL_NAMES = ["tiny", "tiny.en", "base", "base.en", "small", "small.en", "medium", "medium.en",
+               "large-v1", "large-v2", "large-v3", "turbo"]
+
+# Per-file statuses used in the run summary
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_CANCELLED = "cancelled" # Stopped half-way through a chunked file; not counted or recorded
+
+# Overall run statuses used in the run summary
+RUN_FINISHED = "finished"
+RUN_CANCELLED = "cancelled"
+RUN_FAILED = "failed" # Setup failed (model load, scan...), no file was processed
+
+
+class PipelineError(Exception):
+    """A handled per-file failure; the message is reported and the run continues."""
+
+
+class ModelLoadError(Exception):
+    """The model could not be loaded, so the run cannot continue."""
+
+
+def user_cache_dir() -> Path:
+    """Per-user cache directory; AUTO2LRC_CACHE_DIR overrides it."""
+    if os.environ.get("AUTO2LRC_CACHE_DIR"):
+        return Path(os.environ["AUTO2LRC_CACHE_DIR"])
+    if os.name == 'nt':
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "whisper_auto2lrc"
+
+
+def default_result_cache_dir() -> Path:
+    return user_cache_dir() / "results"
+
+
+def default_checkpoint_dir() -> Path:
+    return user_cache_dir() / "chunks"
+
+
+def normalize_language(language):
+    """Whisper uses None for auto-detect; accept '', None and 'auto' for it."""
+    if not language or language.strip().lower() == 'auto':
+        return None
+    return language.strip()
+
+
+def check_ffmpeg() -> bool:
+    """Whisper shells out to ffmpeg to decode audio."""
+    return shutil.which("ffmpeg") is not None
+
+
+def load_whisper_model(model_name: str, device=None):
+    """Imports whisper lazily (it pulls in torch) and loads the requested model."""
+    return backends.BACKENDS["whisper"].load(model_name, device)
+
+
+def set_torch_threads(threads):
+    """Caps torch intra-op threads for this process (None leaves torch's default; no-op without torch)."""
+    if threads:
+        try:
+            import torch
+        except ImportError:
+            return
+        torch.set_num_threads(int(threads))
+
+
+def model_loader(backend: str = backends.DEFAULT_BACKEND, threads=None, on_progress=None, models=None):
+    """
+    get_model(model_name) for a run: each model is taken from model_cache.default_manager
+    (loaded there if needed, timed as a model_load span) and kept in `models` (name -> model)
+    for the rest of the run. on_progress(message) reports the loads.
+
+    get_model raises ModelLoadError if a model can't be loaded.
+    """
+    models = {} if models is None else models
+    on_progress = on_progress or (lambda message: None)
+
+    def get_model(model_name):
+        if model_name not in models:
+            label = model_name if backend == backends.DEFAULT_BACKEND else f"{model_name} ({backend})"
+            if model_cache.default_manager.is_loaded(model_name, backend=backend):
+                on_progress(f"Using already loaded Whisper model: {label}")
+            else:
+                on_progress(f"Loading Whisper model: {label}...")
+            try:
+                set_torch_threads(threads)
+                with metrics.default.timer("model_load", model=model_name, backend=backend):
+                    models[model_name] = model_cache.default_manager.get(model_name, backend=backend)
+            except Exception as e:
+                raise ModelLoadError(f"Failed to load Whisper model '{model_name}': {e}") from e
+            on_progress(f"Model '{model_name}' loaded.")
+        return models[model_name]
+
+    return get_model
+
+
+# --- Helper Function to Generate SRT Content ---
+def generate_srt_content(transcription_result: dict) -> str:
+    """Generates SRT file content string from Whisper transcription result."""
+    return subtitles.format_srt(subtitles.cues_from_segments(transcription_result["segments"]))
+
+
+# --- File Discovery ---
+def find_audio_files(folder_path: Path) -> list:
+    """Recursively lists audio files under folder_path that don't have an .lrc yet (no manifest)."""
+    return list(scanner.iter_audio_files(folder_path, AUDIO_EXTENSIONS))
+
+
+def scan_counter(done: int, candidates) -> tuple:
+    """('done/found' text, percent) for a BackgroundScan; 'found' gets a '+' while scanning."""
+    found = max(candidates.found, done)
+    text = f"{done}/{found}" + ("" if candidates.done else "+")
+    return text, int((done / found) * 100) if found else 0
+
+
+# --- Single File Processing ---
+class FileSettings(NamedTuple):
+    """How each file of a run is transcribed (picklable, so worker processes get the same settings)."""
+    model_name: str
+    language: object = None # None = auto-detect
+    formats: tuple = subtitles.DEFAULT_FORMATS
+    vad: bool = False
+    chunk_seconds: object = None # Split files longer than this into overlapping chunks (None = off)
+    checkpoint_dir: object = None # Where finished chunks are kept until the file is done
+    backend: str = backends.DEFAULT_BACKEND # Inference library (see backends.py)
+    detect_model: object = None # With auto-detect: detect each file's language with this model first (see routing.py)
+    routes: tuple = () # (language, model name) pairs used after detection; others get model_name
+    language_tags: bool = False # Write the language into LRC ([la:xx]) and WebVTT headers (on with routing)
+
+    def first_model(self) -> str:
+        """The model every file needs first: the detection model with the language pre-pass, else model_name."""
+        return self.detect_model or self.model_name
+
+    def decode_options(self) -> dict:
+        """Options that change Whisper's result, part of the result cache key."""
+        options = {"word_timestamps": True} if subtitles.needs_word_timestamps(self.formats) else {}
+        if self.backend != backends.DEFAULT_BACKEND:
+            options["backend"] = self.backend
+        if self.vad:
+            import vad as vad_module # Imports numpy; 'vad' is also an option name
+            options["vad"] = vad_module.VadOptions()._asdict()
+        if self.chunk_seconds:
+            options["chunk"] = [self.chunk_seconds, chunking.DEFAULT_OVERLAP_SECONDS]
+        return options
+
+
+def lookup_result(decoded, settings: FileSettings, cache=None) -> tuple:
+    """
+    Result cache lookup for a decoded file.
+
+    Returns:
+        tuple: (cache key for this file and settings, cached result or None)
+    """
+    options = settings.decode_options()
+    key = result_cache.cache_key(decoded.pcm_hash, settings.model_name, settings.language, options)
+    if cache is not None:
+        keys = [key]
+        if "word_timestamps" not in options:
+            # A result with word timings serves segment-level outputs just as well
+            keys.append(result_cache.cache_key(decoded.pcm_hash, settings.model_name, settings.language,
+                                               {"word_timestamps": True, **options}))
+        for cache_key in keys:
+            result = cache.get(cache_key)
+            if result is not None:
+                return key, result
+    return key, None
+
+
+def routed_settings(settings: FileSettings, routes=None, detect_model: str = routing.DEFAULT_DETECT_MODEL) -> FileSettings:
+    """
+    settings with language routing on: with auto-detect, every file gets the pre-pass
+    (see route_file); with a fixed language, the model is routed once here.
+    routes ('en=small.en,ja=medium' or a dict) add to or replace routing.default_routes().
+
+    Raises:
+        ValueError: Malformed routes (see routing.parse_routes) or an English-only detect_model.
+    """
+    if routing.is_english_only(detect_model):
+        raise ValueError(f"'{detect_model}' is English-only and can't detect languages")
+    route_map = dict(routing.default_routes(settings.model_name), **routing.parse_routes(routes))
+    if settings.language is not None:
+        return settings._replace(model_name=routing.route_model(settings.language, route_map, settings.model_name),
+                                 language_tags=True)
+    return settings._replace(model_name=routing.multilingual(settings.model_name), detect_model=detect_model,
+                             routes=tuple(sorted(route_map.items())), language_tags=True)
+
+
+def build_settings(model_name: str, language=None, *, backend: str = backends.DEFAULT_BACKEND,
+                   formats=subtitles.DEFAULT_FORMATS, vad: bool = False, chunk_seconds=None,
+                   route_languages: bool = False, routes=None,
+                   detect_model: str = routing.DEFAULT_DETECT_MODEL) -> FileSettings:
+    """
+    FileSettings for transcribe_folder()'s (or watcher.watch_folder()'s) arguments; language is already normalized.
+
+    Raises:
+        PipelineError: Unknown format, a backend that is unknown or not installed, or bad routes.
+    """
+    try:
+        formats = subtitles.parse_formats(formats)
+        backends.get_backend(backend)
+        settings = FileSettings(model_name, language, formats, vad, chunk_seconds or None,
+                                default_checkpoint_dir() if chunk_seconds else None, backend)
+        return routed_settings(settings, routes, detect_model) if route_languages else settings
+    except ValueError as e:
+        raise PipelineError(str(e)) from e
+
+
+def route_file(get_model, decoded, settings: FileSettings, cache=None, timings=None) -> FileSettings:
+    """
+    The settings for one file after the language pre-pass: with settings.detect_model and
+    auto-detect, the language found in the file's first 30 seconds is fixed and the model
+    is the one settings.routes gives for it (see routing.py). Detections are kept in the
+    result cache. Settings without detect_model (or a file that didn't decode) are returned as-is.
+
+    Raises:
+        ModelLoadError: get_model() failed for the detection model.
+    """
+    if not settings.detect_model or settings.language is not None or decoded.audio is None:
+        return settings
+    key = result_cache.cache_key(decoded.pcm_hash, settings.detect_model, None,
+                                 {"detect_language": routing.DETECT_SECONDS, "backend": settings.backend})
+    detected = cache.get(key) if cache is not None else None
+    if detected is None:
+        model = get_model(settings.detect_model)
+        with metrics.timed({} if timings is None else timings, "detect"):
+            language, _ = routing.detect_language(model, decoded.audio)
+        detected = {"language": language, "segments": []} # Stored like a (empty) Whisper result
+        if cache is not None:
+            try:
+                cache.put(key, detected)
+            except OSError:
+                pass
+    language = detected["language"]
+    return settings._replace(language=language, detect_model=None,
+                             model_name=routing.route_model(language, dict(settings.routes), settings.model_name))
+
+
+def transcribe_audio(get_model, decoded, settings: FileSettings, cache=None, on_chunk=None, should_stop=None,
+                     timings=None) -> tuple:
+    """
+    Whisper result for a decoded file (decoder.DecodedAudio), from the result cache
+    if possible. The cache key uses the hash of the decoded samples, so retagged
+    copies of a track hit it too. get_model(model_name) is only called on a cache miss, so
+    cached files need no model at all.
+    With settings.vad, only the speech regions found by vad.py are transcribed (in one call)
+    and the timestamps are mapped back to the original timeline; if the regions cover
+    too little of the file (vad.use_regions), the whole file is transcribed. Files longer than
+    settings.chunk_seconds are transcribed chunk by chunk (see chunking.py).
+    Time spent in the backend (not loading the model) is added to timings['transcribe'].
+
+    Returns:
+        tuple: (result dict, True if it came from the cache)
+
+    Raises:
+        runcontrol.Cancelled: should_stop() returned True (chunking.Cancelled between two chunks).
+    """
+    language = settings.language
+    key, result = lookup_result(decoded, settings, cache)
+    if result is not None:
+        return result, True
+
+    # --- Transcribe with the selected backend ---
+    backend = backends.BACKENDS[settings.backend]
+    word_timestamps = subtitles.needs_word_timestamps(settings.formats)
+
+    timings = {} if timings is None else timings
+
+    def transcribe(samples, language):
+        model = get_model(settings.model_name)
+        with backends.interruptible(model, should_stop), metrics.timed(timings, "transcribe"):
+            return backend.transcribe(model, samples, language, word_timestamps)
+
+    audio, time_map, checkpoints = decoded.audio, None, None
+    if settings.vad:
+        import vad as vad_module
+        regions = vad_module.speech_regions(audio)
+        if vad_module.use_regions(regions, len(audio)): # Otherwise the whole file is transcribed
+            audio, time_map = vad_module.compact(audio, regions)
+    if settings.chunk_seconds and len(audio) > (settings.chunk_seconds + chunking.DEFAULT_OVERLAP_SECONDS) * decoder.SAMPLE_RATE:
+        if settings.checkpoint_dir:
+            checkpoints = chunking.Checkpoints(Path(settings.checkpoint_dir) / key)
+        result = chunking.transcribe_chunked(transcribe, audio, language, checkpoints, settings.chunk_seconds,
+                                             on_chunk=on_chunk, should_stop=should_stop)
+    else:
+        result = transcribe(audio, language)
+    if time_map:
+        time_map.remap_result(result)
+
+    if cache is not None:
+        try:
+            cache.put(key, result)
+        except OSError:
+            pass # The outputs matter, the cache is only an optimization
+    if checkpoints:
+        checkpoints.clear()
+    return result, False
+
+
+def process_audio_file(get_model, audio_file: Path, settings: FileSettings, *, cache=None, decoded=None,
+                       result=None, on_chunk=None, should_stop=None, timings=None) -> tuple:
+    """
+    Transcribes one audio file (see transcribe_audio) and writes every selected
+    output format next to it. The outputs are built in memory from Whisper's
+    segments and written atomically. decoded is the file's decoder.DecodedAudio
+    if it was already decoded (e.g. prefetched); otherwise it is decoded here.
+    result is the file's Whisper result if it was already transcribed (e.g. in a batch).
+    Seconds spent per stage (transcribe, format, write) are added to the timings dict.
+
+    Returns:
+        tuple: (Paths of the written files in the order of formats, True if the result was cached,
+            language of the result (also written into the outputs' metadata))
+
+    Raises:
+        PipelineError: For handled failures (message is meant for the user).
+        ModelLoadError: get_model() failed.
+        runcontrol.Cancelled: Stopped in the middle of the file (nothing is written; a chunked
+            file keeps its finished chunks, see chunking.Cancelled).
+        Exception: Anything unexpected from Whisper or the filesystem.
+    """
+    if decoded is None:
+        decoded = decoder.decode(audio_file, should_stop)
+    timings = {} if timings is None else timings
+    if decoded.error:
+        raise PipelineError(decoded.error)
+    if result is not None:
+        cached = False
+    else:
+        result, cached = transcribe_audio(get_model, decoded, settings, cache, on_chunk, should_stop, timings)
+
+    # --- Render Every Selected Format from the Same Cues ---
+    with metrics.timed(timings, "format"):
+        cues = subtitles.cues_from_segments(result["segments"])
+        if not any(cue.text for cue in cues):
+            raise PipelineError(f"Whisper produced no output for {audio_file.name}")
+        info = {"language": result.get("language") or settings.language, "language_tags": settings.language_tags}
+        outputs = subtitles.render_outputs(audio_file, cues, settings.formats, info)
+
+    try:
+        with metrics.timed(timings, "write"):
+            for path, content in outputs:
+                subtitles.write_atomic(path, content)
+    except OSError as io_err:
+        raise PipelineError(f"Failed to write output for {audio_file.name}: {io_err}")
+    return [path for path, _ in outputs], cached, info["language"]
+
+
+def run_file(get_model, audio_file: Path, settings: FileSettings, cache=None, decoded=None,
+             on_chunk=None, should_stop=None, result=None, timings=None):
+    """
+    Processes one file and never raises for per-file failures (only ModelLoadError).
+    A file stopped half-way gets status STATUS_CANCELLED and isn't an error.
+    entry['timings'] has the seconds spent per stage (see metrics.STAGES), starting from `timings`.
+    Settings that still need the language pre-pass are routed here (see route_file); entry['model']
+    and entry['language'] say which model transcribed the file in which language.
+
+    Returns:
+        tuple: (summary entry dict, error message for on_error or None)
+    """
+    entry = {"path": str(audio_file), "status": STATUS_OK, "lrc": None, "outputs": [], "cached": False, "error": None,
+             "duration_seconds": None, "model": settings.model_name, "language": settings.language}
+    timings = dict(timings or {})
+    error_message = None
+    file_started = time.monotonic()
+    try:
+        if decoded is None:
+            decoded = decoder.decode(audio_file, should_stop)
+        timings["decode"] = decoded.decode_seconds
+        entry["duration_seconds"] = decoded.duration
+        settings = route_file(get_model, decoded, settings, cache, timings)
+        entry["model"], entry["language"] = settings.model_name, settings.language
+        outputs, entry["cached"], entry["language"] = process_audio_file(
+            get_model, audio_file, settings, cache=cache, decoded=decoded, result=result, on_chunk=on_chunk,
+            should_stop=should_stop, timings=timings)
+        entry["outputs"] = [str(path) for path in outputs]
+        if "lrc" in settings.formats:
+            entry["lrc"] = entry["outputs"][settings.formats.index("lrc")]
+    except ModelLoadError:
+        raise
+    except runcontrol.Cancelled as e:
+        entry["status"], entry["error"] = STATUS_CANCELLED, str(e)
+    except PipelineError as e:
+        entry["status"], entry["error"] = STATUS_ERROR, str(e)
+        error_message = str(e)
+    except Exception as e:
+        entry["status"], entry["error"] = STATUS_ERROR, str(e)
+        error_message = f"Error processing {audio_file.name}: {e}\n{traceback.format_exc()}"
+    entry["elapsed_seconds"] = round(time.monotonic() - file_started, 3)
+    entry["timings"] = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+    return entry, error_message
+
+
+def _batchable(decoded, settings: FileSettings) -> bool:
+    """Short files that need nothing but a plain transcribe() can share a batched decode (see batching.py)."""
+    if decoded.error or not batching.fits(decoded.duration) or not backends.BACKENDS[settings.backend].batching:
+        return False
+    if settings.vad or subtitles.needs_word_timestamps(settings.formats):
+        return False
+    return not settings.chunk_seconds or decoded.duration <= settings.chunk_seconds + chunking.DEFAULT_OVERLAP_SECONDS
+
+
+def _process_sequential(candidates, settings: FileSettings, cache, prefetch, threads,
+                        on_progress, on_error, should_stop, batch_size=1, group_by_language=False):
+    """
+    Yields a summary entry per file, using one model in this process. The model is
+    loaded on the first cache miss, so a run served from the cache never loads it.
+    The next `prefetch` files are decoded in the background (see decoder.Prefetcher).
+    With batch_size > 1, uncached short files are collected per (model, language) and
+    transcribed batch_size at a time (see batching.py); entries come out in scan order,
+    except that a batch's files come out together once it is full (or at the end).
+    With language routing, each file's language is detected as it is decoded (see route_file).
+    """
+    # The detection model and each routed model are loaded on first use
+    get_model = model_loader(settings.backend, threads, lambda message: on_progress(message, 0))
+
+    def run(idx, decoded, file_settings, result=None, timings=None):
+        counter, percent = scan_counter(idx, candidates)
+        on_progress(f'Processing: {decoded.path.name} ({counter})', percent)
+
+        def on_chunk(done, total):
+            counter, _ = scan_counter(idx, candidates)
+            found = max(candidates.found, idx + 1)
+            on_progress(f'Processing: {decoded.path.name}, chunk {done}/{total} ({counter})',
+                        int((idx + done / total) / found * 100))
+
+        entry, error_message = run_file(get_model, decoded.path, file_settings, cache, decoded,
+                                        on_chunk=on_chunk, should_stop=should_stop, result=result, timings=timings)
+        if error_message:
+            on_error(error_message)
+        return entry
+
+    # --- Batched Transcription of Short Files ---
+    pending = {} # (model name, language) -> [(idx, decoded, cache key, timings)] waiting for a batch
+
+    def flush(group):
+        batch = pending.pop(group)
+        batch_settings = settings._replace(model_name=group[0], language=group[1], detect_model=None)
+        counter, percent = scan_counter(batch[0][0], candidates)
+        on_progress(f'Processing: batch of {len(batch)} files from {batch[0][1].path.name} ({counter})', percent)
+        try:
+            model = get_model(batch_settings.model_name)
+            started = time.perf_counter()
+            with backends.interruptible(model, should_stop):
+                results = batching.transcribe_batch(model, [decoded.audio for _, decoded, _, _ in batch],
+                                                    batch_settings.language, group_by_language)
+            share = {"transcribe": (time.perf_counter() - started) / len(batch)} # Per file
+        except (ModelLoadError, runcontrol.Cancelled):
+            raise
+        except Exception as e:
+            on_error(f"Warning: Batched transcription failed, transcribing the files one by one: {e}")
+            results, share = [None] * len(batch), None
+        for (idx, decoded, key, timings), result in zip(batch, results):
+            if result is not None and cache is not None:
+                try:
+                    cache.put(key, result)
+                except OSError:
+                    pass
+            if result is not None:
+                timings = dict(timings, **share)
+            yield run(idx, decoded, batch_settings, result, timings) # No result: transcribed the normal way
+
+    prefetcher = decoder.Prefetcher(candidates.iterate(should_stop), depth=prefetch, should_stop=should_stop)
+    try:
+        for idx, decoded in enumerate(prefetcher):
+            if should_stop():
+                break
+            timings = {}
+            try:
+                file_settings = route_file(get_model, decoded, settings, cache, timings)
+            except ModelLoadError:
+                raise
+            except Exception as e:
+                on_error(f"Warning: Language detection failed for {decoded.path.name}, using '{settings.model_name}' "
+                         f"with auto-detect: {e}")
+                file_settings = settings._replace(detect_model=None)
+            if batch_size > 1 and _batchable(decoded, file_settings):
+                key, result = lookup_result(decoded, file_settings, cache)
+                if result is None:
+                    group = (file_settings.model_name, file_settings.language)
+                    pending.setdefault(group, []).append((idx, decoded, key, timings))
+                    if len(pending[group]) >= batch_size:
+                        yield from flush(group)
+                    continue
+            yield run(idx, decoded, file_settings, timings=timings)
+        for group in list(pending):
+            if should_stop():
+                break
+            yield from flush(group)
+    except runcontrol.Cancelled:
+        pass # Stopped while decoding the next file or transcribing a batch; none of them was written
+    finally:
+        prefetcher.close()
+
+
+def record_entry(index, entry: dict, settings: FileSettings, model_name: str, hash_files: bool = False):
+    """
+    Records a finished file's summary entry in the manifest (see manifest.Manifest.record).
+    model_name is the model the run was asked for, used when the entry doesn't say which one ran.
+    """
+    language = settings.language
+    index.record(entry["path"], entry["status"], model=entry.get("model") or model_name,
+                 language=entry.get("language") or language or "auto",
+                 options={"language": entry.get("language", language), "formats": list(settings.formats),
+                          **settings.decode_options()},
+                 outputs=entry["outputs"], error=entry["error"], hash_files=hash_files)
+
+
+# --- Folder Processing ---
+def transcribe_folder(folder_path, model_name: str = "base", language="auto", *, backend: str = backends.DEFAULT_BACKEND,
+                      formats=subtitles.DEFAULT_FORMATS, use_cache: bool = True, cache_dir=None, vad: bool = False,
+                      chunk_seconds=None, prefetch: int = decoder.DEFAULT_PREFETCH, batch_size: int = 1,
+                      group_by_language: bool = False, route_languages: bool = False, routes=None,
+                      detect_model: str = routing.DEFAULT_DETECT_MODEL, workers: int = 1, threads=None, keep_model: bool = True,
+                      use_manifest: bool = True, manifest_path=None, requeue_weaker: bool = False,
+                      hash_files: bool = False, scan_threads: int = scanner.DEFAULT_SCAN_THREADS, on_progress=None, on_error=None, on_file=None, should_stop=None,
+                      control=None) -> dict:
+    """
+    Transcribes every audio file under folder_path that is missing any of the selected outputs.
+
+    Args:
+        folder_path: Folder that is searched recursively.
+        model_name (str): Whisper model name (e.g. 'base', 'small.en').
+        language: Language code, or None/''/'auto' for auto-detect.
+        backend (str): Inference library from backends.BACKENDS (e.g. 'faster-whisper' for
+            int8 CTranslate2 on the CPU); it has to be installed.
+        formats: Output formats from subtitles.WRITERS (e.g. ('lrc', 'srt')), or a
+            comma-separated string. All of them come from one transcription.
+        use_cache (bool): Reuse and store raw Whisper results (see result_cache.py), so
+            re-exporting or duplicate files need no transcription.
+        cache_dir: Result cache location (default: <user cache dir>/results).
+        vad (bool): Only transcribe the parts vad.py detects as speech (skips silence).
+        chunk_seconds: Transcribe files longer than this in overlapping chunks of this length,
+            with per-chunk progress, Stop after the current chunk and resume from checkpoints
+            (see chunking.py). None or 0 transcribes every file in one call.
+        prefetch (int): Files decoded ahead of the one being transcribed (single process only;
+            with workers each process decodes its own file).
+        batch_size (int): Transcribe up to this many short files (<= 30 s, no VAD or word
+            timings) in one batched decode (see batching.py). Single process only; 1 = off.
+        group_by_language (bool): With auto-detect and batching, detect the language of each
+            file of a batch first and decode each language separately.
+        route_languages (bool): Detect each file's language first with detect_model and transcribe
+            it with that language fixed and the model routed to it: English to the '.en' variant
+            of model_name's size, other languages to the multilingual model (see routing.py).
+            With a fixed language, only the model is routed.
+        routes: Extra or replacement routes for route_languages, e.g. 'en=small.en,ja=medium'
+            or {'ja': 'medium'}.
+        detect_model (str): Model for the language pre-pass (default 'tiny').
+        workers (int): Number of processes, each with its own model (see worker_pool.py).
+        threads: torch intra-op threads per process (None = torch default).
+        keep_model (bool): Leave the model in model_cache.default_manager for the next run.
+        use_manifest (bool): Track processed files in a manifest (see manifest.py) instead of
+            checking for existing outputs next to every file.
+        manifest_path: Manifest location (default: <folder>/.auto2lrc/manifest.sqlite3).
+        requeue_weaker (bool): Redo files whose .lrc came from a weaker model than model_name.
+        hash_files (bool): Also compare content hashes, so touched/copied files aren't redone.
+        scan_threads (int): Threads listing directories in parallel. Files are processed
+            as soon as the scan finds them, so 'total' is only final at the end.
+        on_progress: Called as on_progress(message: str, percent: int).
+        on_error: Called as on_error(message: str).
+        on_file: Called with each per-file summary entry once that file is done.
+        should_stop: Polled between files and chunks, while decoding and before every model
+            forward pass; return True to cancel the run (the current file is dropped, or keeps
+            its finished chunks). It may block to pause the run.
+        control: A runcontrol.RunControl to cancel, pause and resume the run with (instead of
+            should_stop). With workers, each process pauses inside its current file too.
+
+    Returns:
+        dict: JSON-serializable run summary (see README for the fields).
+    """
+    folder_path = Path(folder_path)
+    language = normalize_language(language)
+    on_progress = on_progress or (lambda message, percent: None)
+    on_error = on_error or (lambda message: None)
+    on_file = on_file or (lambda entry: None)
+    if control is not None:
+        should_stop = control.should_stop
+    should_stop = should_stop or (lambda: False)
+
+    started = time.monotonic()
+    summary = {
+        "status": RUN_FINISHED,
+        "folder": str(folder_path),
+        "model": model_name,
+        "backend": backend,
+        "language": language or "auto",
+        "formats": [],
+        "workers": workers,
+        "total": 0,
+        "skipped": 0,
+        "succeeded": 0,
+        "cached": 0,
+        "failed": 0,
+        "elapsed_seconds": 0.0,
+        "error": None,
+        "files": [],
+    }
+
+    def fail_setup(message):
+        summary["status"] = RUN_FAILED
+        summary["error"] = message
+        on_error(message)
+
+    index = None
+    candidates = None
+    settings = None
+    try:
+        settings = build_settings(model_name, language, backend=backend, formats=formats, vad=vad,
+                                  chunk_seconds=chunk_seconds, route_languages=route_languages, routes=routes,
+                                  detect_model=detect_model)
+        formats = settings.formats
+        summary["formats"] = list(formats)
+        suffixes = subtitles.output_suffixes(formats)
+        cache = result_cache.ResultCache(cache_dir or default_result_cache_dir()) if use_cache else None
+        if route_languages:
+            summary["languages"] = {}
+
+        # --- Find Audio Files (in the background, processing starts with the first one found) ---
+        if use_manifest:
+            try:
+                index = manifest.Manifest(manifest_path or manifest.default_manifest_path(folder_path, user_cache_dir()),
+                                          folder_path, AUDIO_EXTENSIONS, suffixes)
+            except Exception as e:
+                on_error(f"Warning: Could not open the manifest, checking for existing output files instead: {e}")
+        scan_stats = {"skipped": 0}
+        if index:
+            def make_candidates(stop_event):
+                # The scan thread needs its own SQLite connection
+                with manifest.Manifest(index.db_path, folder_path, AUDIO_EXTENSIONS, suffixes) as scan_index:
+                    yield from scan_index.iter_scan(model_name, requeue_weaker=requeue_weaker, hash_files=hash_files,
+                                                    threads=scan_threads, stop_event=stop_event, stats=scan_stats)
+        else:
+            def make_candidates(stop_event):
+                return scanner.iter_audio_files(folder_path, AUDIO_EXTENSIONS, suffixes, threads=scan_threads,
+                                                stop_event=stop_event)
+        on_progress("Scanning for audio files...", 0)
+        metrics.default.event("run_started", folder=str(folder_path), model=model_name, backend=backend,
+                              formats=list(formats), workers=workers)
+        candidates = scanner.BackgroundScan(make_candidates)
+
+        # --- Process Files ---
+        if workers > 1:
+            import worker_pool
+            results = worker_pool.process_files(candidates, settings, cache_dir=cache.cache_dir if cache else None,
+                                                workers=workers, threads=threads, on_progress=on_progress,
+                                                on_error=on_error, should_stop=should_stop, control=control)
+        else:
+            results = _process_sequential(candidates, settings, cache, prefetch, threads,
+                                          on_progress, on_error, should_stop, batch_size, group_by_language)
+
+        for entry in results:
+            if entry["status"] == STATUS_CANCELLED:
+                on_progress(f'Stopped: {Path(entry["path"]).name} ({entry["error"]})',
+                            scan_counter(len(summary["files"]), candidates)[1])
+                continue
+            summary["files"].append(entry)
+            summary["succeeded" if entry["status"] == STATUS_OK else "failed"] += 1
+            summary["cached"] += entry.get("cached", False)
+            if "languages" in summary and entry["status"] == STATUS_OK:
+                file_language = entry.get("language") or "unknown"
+                summary["languages"][file_language] = summary["languages"].get(file_language, 0) + 1
+            if index:
+                record_entry(index, entry, settings, model_name, hash_files)
+            metrics.default.file_done(entry)
+            metrics.default.gauge("queue_depth", candidates.found - len(summary["files"]))
+            on_file(entry)
+
+            # Update progress after successful processing or handled error
+            counter, percent = scan_counter(len(summary["files"]), candidates)
+            on_progress(f'Finished: {Path(entry["path"]).name} ({counter})', percent)
+
+        summary["total"] = candidates.found
+        summary["skipped"] = scan_stats["skipped"]
+        if candidates.elapsed_seconds is not None:
+            metrics.default.span("scan", candidates.elapsed_seconds, files=candidates.found)
+        metrics.default.count("files_skipped", summary["skipped"])
+        if should_stop() and (len(summary["files"]) < candidates.found or not candidates.done):
+            summary["status"] = RUN_CANCELLED
+            on_progress("Processing cancelled.", scan_counter(len(summary["files"]), candidates)[1])
+        elif candidates.found == 0:
+            on_progress("No new audio files found to process.", 0)
+
+    except (ModelLoadError, PipelineError) as e:
+        fail_setup(str(e)) # Cannot continue without a model / valid settings
+    except Exception as e:
+        # Catch errors during setup (e.g., manifest, file scan)
+        fail_setup(f"An unexpected error occurred in worker setup: {e}\n{traceback.format_exc()}")
+    finally:
+        # --- Cleanup ---
+        if candidates:
+            candidates.close()
+        if index:
+            index.close()
+        # --- Unload model (optional, frees memory) ---
+        if not keep_model and backends.is_installed(backend):
+            used = {model_name} # With language routing, every model the run may have loaded
+            if settings:
+                used.update((settings.model_name, settings.detect_model, *dict(settings.routes).values()))
+            for name in used - {None}:
+                model_cache.default_manager.unload(name, backend=backend)
+        summary["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        metrics.default.event("run_finished", status=summary["status"], total=summary["total"],
+                              succeeded=summary["succeeded"], failed=summary["failed"], cached=summary["cached"],
+                              elapsed_seconds=summary["elapsed_seconds"])
+
+    return summary
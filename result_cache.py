@@ -0,0 +1,143 @@
+"""
+On-disk cache of raw Whisper transcription results.
+
+Results are stored as gzip-compressed JSON under a key made from the hash of
+the decoded audio (see decoder.pcm_hash), the model name, the language and the decode options, so
+re-exporting to other formats or processing a duplicate of a file (the same
+track in several albums) needs no transcription and no model at all. Entries
+are evicted least-recently-used first (by file mtime, refreshed on every hit)
+once the cache grows over its size cap.
+"""
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import subtitles
+
+# Default size cap; override with the AUTO2LRC_RESULT_CACHE_MB environment variable
+DEFAULT_MAX_SIZE_MB = 1024
+
+# Bump when the stored format changes, so old entries are never read back
+CACHE_FORMAT_VERSION = 2 # 2: keyed by the hash of the decoded samples instead of the file
+
+CACHE_SUFFIX = ".json.gz"
+
+
+def _default_max_bytes() -> int:
+    try:
+        return int(os.environ.get("AUTO2LRC_RESULT_CACHE_MB", DEFAULT_MAX_SIZE_MB)) * 1024 * 1024
+    except ValueError:
+        return DEFAULT_MAX_SIZE_MB * 1024 * 1024
+
+
+def cache_key(audio_hash: str, model_name: str, language, options=None) -> str:
+    """Key for a transcription of the given audio with the given settings."""
+    key_data = [CACHE_FORMAT_VERSION, audio_hash, model_name, language or "auto", options or {}]
+    return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def compact_result(result: dict) -> dict:
+    """The parts of a Whisper result the writers need (drops tokens, logprobs...)."""
+    return {
+        "language": result.get("language"),
+        "segments": [{k: segment[k] for k in ("start", "end", "text", "words") if k in segment}
+                     for segment in result["segments"]],
+    }
+
+
+class ResultCache:
+    """
+    Content-addressed cache directory. Safe to share between processes: entries
+    are written atomically and a missing or unreadable entry is just a miss.
+
+    Args:
+        cache_dir: Directory of the cache (created on first write).
+        max_bytes: Size cap (default: AUTO2LRC_RESULT_CACHE_MB or 1 GB).
+    """
+
+    def __init__(self, cache_dir, max_bytes=None):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes if max_bytes is not None else _default_max_bytes()
+        self._total_bytes = None # Measured on the first put()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / (key + CACHE_SUFFIX)
+
+    def get(self, key: str):
+        """The cached result for key, or None."""
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                result = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError):
+            try: path.unlink() # Corrupt entry
+            except OSError: pass
+            return None
+        try:
+            os.utime(path) # Mark as recently used
+        except OSError:
+            pass
+        return result
+
+    def put(self, key: str, result: dict):
+        """Stores a Whisper result (see compact_result) and evicts old entries if over the cap."""
+        data = json.dumps(compact_result(result), ensure_ascii=False, default=float).encode("utf-8")
+        data = gzip.compress(data)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        subtitles.write_atomic(path, data)
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._entries())
+        else:
+            self._total_bytes += len(data)
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def _entries(self) -> list:
+        """(mtime, size, path) of every entry."""
+        entries = []
+        if not self.cache_dir.is_dir():
+            return entries
+        for subdir in os.scandir(self.cache_dir):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                if entry.name.endswith(CACHE_SUFFIX):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def evict(self, max_bytes=None) -> int:
+        """
+        Removes least recently used entries until the cache is under max_bytes
+        (default: the cap). Other processes may share the directory, so sizes are re-read.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._total_bytes = total
+        return removed
+
+    def clear(self) -> int:
+        """Removes every entry."""
+        return self.evict(max_bytes=0)
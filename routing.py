@@ -0,0 +1,79 @@
+"""
+Language detection pre-pass and per-language model routing.
+
+With auto-detect, a small multilingual model (DEFAULT_DETECT_MODEL) looks at the
+first 30 seconds of each file, and the file is then transcribed with its
+language fixed and with the model routed to that language: English goes to the
+English-only variant of the selected size (e.g. 'base.en', which is more
+accurate than 'base' for English), anything else to the multilingual model.
+Routes can be given explicitly, e.g. 'en=small.en,ja=medium'.
+"""
+from decoder import SAMPLE_RATE
+
+DETECT_SECONDS = 30 # One Whisper window
+DEFAULT_DETECT_MODEL = "tiny"
+ENGLISH_ONLY_SIZES = ("tiny", "base", "small", "medium") # Sizes that have a '.en' variant
+
+
+def is_english_only(model_name: str) -> bool:
+    return model_name.endswith(".en")
+
+
+def multilingual(model_name: str) -> str:
+    """The multilingual model of the same size ('base.en' -> 'base')."""
+    return model_name[:-3] if is_english_only(model_name) else model_name
+
+
+def default_routes(model_name: str) -> dict:
+    """English to the '.en' variant of model_name's size, if there is one."""
+    size = multilingual(model_name)
+    return {"en": f"{size}.en"} if size in ENGLISH_ONLY_SIZES else {}
+
+
+def parse_routes(routes) -> dict:
+    """
+    'en=small.en,ja=medium' (or a dict) -> {language: model name}.
+
+    Raises:
+        ValueError: Malformed, or an English-only model routed to another language.
+    """
+    if isinstance(routes, str):
+        parsed = {}
+        for item in filter(None, (part.strip() for part in routes.split(","))):
+            language, sep, model_name = item.partition("=")
+            if not sep or not language.strip() or not model_name.strip():
+                raise ValueError(f"Invalid route '{item}' (expected language=model, e.g. en=base.en)")
+            parsed[language.strip().lower()] = model_name.strip()
+        routes = parsed
+    routes = dict(routes or {})
+    for language, model_name in routes.items():
+        if is_english_only(model_name) and language != "en":
+            raise ValueError(f"'{model_name}' is English-only and can't transcribe '{language}'")
+    return routes
+
+
+def route_model(language, routes: dict, model_name: str) -> str:
+    """Model for a file in `language`: its route, else the multilingual model_name."""
+    return routes.get(language) or multilingual(model_name)
+
+
+def detect_language(model, audio) -> tuple:
+    """
+    Language of the first DETECT_SECONDS of 16 kHz float32 audio.
+
+    Returns:
+        tuple: (language code, probability)
+    """
+    clip = audio[:DETECT_SECONDS * SAMPLE_RATE]
+    if hasattr(model, "dims"): # openai-whisper: one encoder pass on the padded window
+        import torch
+        import whisper
+        dtype = torch.float16 if model.device.type == "cuda" else torch.float32 # Same default as whisper.transcribe()
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(clip)), model.dims.n_mels)
+        with torch.no_grad():
+            _, probs = model.detect_language(mel.to(model.device, dtype))
+        language = max(probs, key=probs.get)
+        return language, float(probs[language])
+    # faster-whisper detects the language before its lazy segment generator runs
+    _, info = model.transcribe(clip, language=None)
+    return info.language, float(info.language_probability)
@@ -0,0 +1,56 @@
+"""
+Cooperative cancel, pause and resume for a transcription run.
+
+The pipeline polls should_stop() between files and chunks, while ffmpeg is
+decoding (decoder.load_audio) and before every forward pass of the model
+(backends.interruptible), so a Stop takes effect within seconds even in the
+middle of a long file. While the run is paused should_stop() blocks wherever it
+is called, so decoding and inference simply wait and the loaded model and the
+queue of files stay as they are.
+"""
+import threading
+
+
+class Cancelled(Exception):
+    """The run was stopped; raised from the middle of a file (decode or inference)."""
+
+
+class RunControl:
+    """Shared between the thread controlling a run (e.g. the GUI) and the threads doing the work."""
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event() # Cleared while paused
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set() # A paused run has to wake up to stop
+
+    def pause(self):
+        if not self._cancelled.is_set():
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def should_stop(self) -> bool:
+        """Blocks while paused, then returns True once the run is cancelled (pass as should_stop=)."""
+        self._running.wait()
+        return self._cancelled.is_set()
+
+    def check(self):
+        """
+        Raises:
+            Cancelled: The run was cancelled (waits first while paused).
+        """
+        if self.should_stop():
+            raise Cancelled("stopped")
@@ -0,0 +1,213 @@
+"""
+Streaming, parallel directory scanner.
+
+walk() lists directories with os.scandir on a thread pool, so subdirectories are
+listed in parallel (which is what matters on network shares), and yields each
+listing as soon as it is ready. BackgroundScan runs a candidate generator on its
+own thread and hands the files over through a queue, so transcription can start
+long before a large library has been fully scanned.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import NamedTuple
+
+DEFAULT_SCAN_THREADS = 8
+
+
+class DirListing(NamedTuple):
+    """Audio files and outputs found in one directory."""
+    rel_dir: str # Relative to the scan root, '/'-separated ('' for the root)
+    mtime_ns: int
+    audio: list # (name, size, mtime_ns) tuples, sorted by name
+    outputs: set # Names of other files sharing an audio file's stem (song.lrc, song.words.lrc...)
+    subdirs: list
+    from_cache: bool # True if the names came from cached_listing instead of os.scandir
+
+
+def _is_output_of(name: str, stems) -> bool:
+    """True if name is <stem>.<anything> for one of the audio stems."""
+    dot = name.find('.', 1)
+    while dot != -1:
+        if name[:dot] in stems:
+            return True
+        dot = name.find('.', dot + 1)
+    return False
+
+
+def list_directory(root: str, rel_dir: str, audio_extensions, cached_listing=None,
+                   skip_dir_names=()) -> DirListing:
+    """
+    Lists one directory. Only audio names and the names of possible outputs
+    (other files starting with an audio file's stem, whatever the output format)
+    are kept; the extension is checked on the name string, so no Path is built
+    for other entries.
+
+    cached_listing(rel_dir, mtime_ns) may return (audio names, output names, subdir
+    names) from an earlier scan if the directory is unchanged; then the directory
+    isn't read and only its audio files are stat'ed.
+    """
+    abs_dir = os.path.join(root, rel_dir) if rel_dir else root
+    mtime_ns = os.stat(abs_dir).st_mtime_ns
+
+    cached = cached_listing(rel_dir, mtime_ns) if cached_listing else None
+    if cached is not None:
+        audio_names, outputs, subdirs = cached
+        audio = []
+        for name in audio_names:
+            try:
+                st = os.stat(os.path.join(abs_dir, name))
+            except OSError:
+                continue
+            audio.append((name, st.st_size, st.st_mtime_ns))
+        return DirListing(rel_dir, mtime_ns, audio, set(outputs), list(subdirs), True)
+
+    audio, others, subdirs = [], [], []
+    with os.scandir(abs_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if name not in skip_dir_names:
+                        subdirs.append(name)
+                    continue
+                suffix = os.path.splitext(name)[1].lower()
+                if suffix in audio_extensions:
+                    st = entry.stat() # Comes with the directory listing on Windows
+                    audio.append((name, st.st_size, st.st_mtime_ns))
+                else:
+                    others.append(name)
+            except OSError:
+                continue # Entry vanished or is unreadable
+    audio.sort()
+    subdirs.sort()
+    stems = {os.path.splitext(name)[0] for name, _, _ in audio}
+    outputs = {name for name in others if _is_output_of(name, stems)}
+    return DirListing(rel_dir, mtime_ns, audio, outputs, subdirs, False)
+
+
+def walk(root, audio_extensions, threads: int = DEFAULT_SCAN_THREADS, cached_listing=None,
+         skip_dir_names=(), stop_event=None):
+    """
+    Yields a DirListing for root and every directory below it, in completion order.
+    Unreadable directories are skipped. Closing the generator cancels the rest of the scan.
+    """
+    root = str(root)
+    audio_extensions = {ext.lower() for ext in audio_extensions}
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="scan") as executor:
+        def submit(rel_dir):
+            return executor.submit(list_directory, root, rel_dir, audio_extensions, cached_listing,
+                                   skip_dir_names)
+
+        futures = {submit("")}
+        try:
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        listing = future.result()
+                    except OSError:
+                        continue
+                    if stop_event is not None and stop_event.is_set():
+                        return
+                    for name in listing.subdirs:
+                        futures.add(submit(f"{listing.rel_dir}/{name}" if listing.rel_dir else name))
+                    yield listing
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def has_outputs(listing: DirListing, audio_name: str, output_suffixes) -> bool:
+    """True if every <stem><suffix> output of audio_name is in the listing."""
+    stem = os.path.splitext(audio_name)[0]
+    return all(stem + suffix in listing.outputs for suffix in output_suffixes)
+
+
+def iter_audio_files(root, audio_extensions, output_suffixes=('.lrc',), threads: int = DEFAULT_SCAN_THREADS,
+                     stop_event=None):
+    """Yields Paths of audio files under root that are missing any of the output files next to them."""
+    for listing in walk(root, audio_extensions, threads, stop_event=stop_event):
+        abs_dir = os.path.join(root, listing.rel_dir) if listing.rel_dir else str(root)
+        for name, _, _ in listing.audio:
+            if not has_outputs(listing, name, output_suffixes):
+                yield Path(abs_dir, name)
+
+
+class BackgroundScan:
+    """
+    Runs make_candidates(stop_event) on a thread and makes its items available
+    as they are produced. `found` counts the items so far and `done` is set once
+    the generator is exhausted (`elapsed_seconds` then says how long the scan took). An exception from the generator is re-raised to
+    the consumer after the items produced before it.
+    """
+    _END = object()
+
+    def __init__(self, make_candidates):
+        self.found = 0
+        self.done = False
+        self.error = None
+        self.elapsed_seconds = None
+        self._started = time.perf_counter()
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(make_candidates,), name="scan-feeder", daemon=True)
+        self._thread.start()
+
+    def _run(self, make_candidates):
+        try:
+            candidates = make_candidates(self._stop)
+            try:
+                for item in candidates:
+                    if self._stop.is_set():
+                        break
+                    self.found += 1
+                    self._queue.put(item)
+            finally:
+                if hasattr(candidates, "close"):
+                    candidates.close()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.elapsed_seconds = time.perf_counter() - self._started
+            self.done = True
+            self._queue.put(self._END)
+
+    def get(self, timeout=None):
+        """
+        Next item, waiting up to timeout seconds (None waits forever).
+
+        Raises:
+            queue.Empty: Nothing arrived within the timeout.
+            StopIteration: The scan is over.
+        """
+        item = self._queue.get(timeout=timeout)
+        if item is self._END:
+            self._queue.put(self._END) # Keep answering StopIteration
+            if self.error is not None:
+                raise self.error
+            raise StopIteration
+        return item
+
+    def __iter__(self):
+        return self.iterate()
+
+    def iterate(self, should_stop=None, poll_interval: float = 0.25):
+        """Yields items as they arrive; stops early once should_stop() returns True."""
+        while True:
+            if should_stop is not None and should_stop():
+                return
+            try:
+                yield self.get(timeout=poll_interval)
+            except queue.Empty:
+                continue
+            except StopIteration:
+                return
+
+    def close(self):
+        """Stops scanning; items already queued are dropped."""
+        self._stop.set()
+        self._thread.join(timeout=5)
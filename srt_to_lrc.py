@@ -1,30 +1,71 @@
-import sys
+import argparse
+import multiprocessing
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import re
 
-# Regex to parse SRT time: HH:MM:SS,ms
-SRT_TIME_REGEX = re.compile(r'(\d{2}):(\d{2}):(\d{2}),(\d{3})')
+import subtitles
+from subtitles import SRT_TIME_REGEX # Kept importable from here
+
+BULK_CHUNKSIZE = 64 # Files per task sent to a bulk worker process (keeps IPC overhead low)
+MAX_REPORTED_ISSUES = 3 # Malformed blocks printed per file
 
 def convert_srt_time_to_lrc(time_string):
-    """Converts SRT time format (HH:MM:SS,ms) to LRC time format [MM:SS.xx]."""
-    match = SRT_TIME_REGEX.match(time_string)
-    if not match:
-        # Handle potential variations or errors if necessary
-        # For simplicity, assume valid format for now
-        return "00:00.00" # Default or raise error
+    """
+    Converts SRT time format (HH:MM:SS,ms) to LRC time format [MM:SS.xx].
 
-    h, m, s, ms = map(int, match.groups())
+    Raises:
+        ValueError: time_string is not an SRT time.
+    """
+    milliseconds = subtitles.parse_srt_ms(time_string)
+    if milliseconds is None:
+        raise ValueError(f"Not an SRT time: {time_string!r}")
+    return subtitles.format_lrc_ms(milliseconds)
 
-    total_seconds = h * 3600 + m * 60 + s + ms / 1000.0
+def convert_file(srt_file_path: Path, lrc_file_path: Path, errors=None) -> int:
+    """
+    Streams one SRT file into an LRC file (written atomically). Malformed blocks
+    are skipped and appended to errors as subtitles.SrtIssue. A file that isn't
+    UTF-8 is not converted; the first undecodable line is reported in errors.
 
-    lrc_minutes = int(total_seconds // 60)
-    lrc_seconds = total_seconds % 60
+    Returns:
+        int: Number of LRC lines written.
 
-    # Format seconds to MM:SS.xx (centiseconds)
-    # {:05.2f} ensures leading zero for seconds < 10 and two decimal places
-    lrc_time_str = f"{lrc_minutes:02d}:{lrc_seconds:05.2f}"
-    return lrc_time_str
+    Raises:
+        OSError: Reading or writing failed.
+        ValueError: The file has malformed blocks and nothing usable, or isn't UTF-8.
+    """
+    issues = [] if errors is None else errors
+    # utf-8-sig strips a BOM; text mode turns \r\n and \r into \n while streaming
+    try:
+        with open(srt_file_path, 'r', encoding='utf-8-sig') as infile:
+            lrc_content = subtitles.format_lrc(subtitles.iter_srt(infile, issues))
+    except UnicodeDecodeError as e:
+        line = _undecodable_line(srt_file_path)
+        issues.append(subtitles.SrtIssue(line, f"not valid UTF-8: {e.reason}"))
+        raise ValueError(f"not valid UTF-8 (line {line}); convert the file to UTF-8 first") from None
+    if not lrc_content and issues:
+        raise ValueError(f"no valid subtitle blocks ({len(issues)} malformed)")
+    subtitles.write_atomic(lrc_file_path, lrc_content) # Write standard utf-8
+    return lrc_content.count("\n")
+
+def _undecodable_line(srt_file_path: Path) -> int:
+    """1-based number of the first line that isn't valid UTF-8."""
+    with open(srt_file_path, 'rb') as infile:
+        for number, line in enumerate(infile, start=1):
+            try:
+                line.decode('utf-8')
+            except UnicodeDecodeError:
+                return number
+    return 1
+
+def _report_issues(srt_file_path: Path, issues):
+    for issue in issues[:MAX_REPORTED_ISSUES]:
+        print(f"Warning: {srt_file_path.name}:{issue.line}: skipped malformed block, {issue.message}", file=sys.stderr)
+    if len(issues) > MAX_REPORTED_ISSUES:
+        print(f"Warning: {srt_file_path.name}: {len(issues) - MAX_REPORTED_ISSUES} more malformed blocks skipped",
+              file=sys.stderr)
 
 def srt_to_lrc(srt_file_path: Path):
     """
@@ -32,6 +73,10 @@ def srt_to_lrc(srt_file_path: Path):
     Only uses the start time of each subtitle line.
     Deletes the source SRT file upon successful conversion.
 
+    This is a thin wrapper around subtitles.iter_srt() / subtitles.format_lrc();
+    the transcription pipeline goes from Whisper's segments to LRC in memory.
+    Malformed blocks are skipped with a warning instead of being timed at 00:00.00.
+
     Args:
         srt_file_path (Path): Path object for the input SRT file.
 
@@ -42,74 +87,131 @@ def srt_to_lrc(srt_file_path: Path):
         print(f"Error: SRT file not found at {srt_file_path}", file=sys.stderr)
         return None
 
-    # Output LRC file will be in the same directory as the SRT (temp dir)
+    # Output LRC file will be in the same directory as the SRT
     lrc_file_path = srt_file_path.with_suffix('.lrc')
 
+    issues = []
     try:
-        # Use utf-8, try utf-8-sig if BOM is present
-        encoding_to_try = 'utf-8'
-        try:
-            with open(srt_file_path, 'r', encoding=encoding_to_try) as infile:
-                srt_content = infile.read()
-        except UnicodeDecodeError:
-            encoding_to_try = 'utf-8-sig' # Try again with BOM handling
-            with open(srt_file_path, 'r', encoding=encoding_to_try) as infile:
-                 srt_content = infile.read()
-
-        # Split into blocks (index, time, text, blank line)
-        # Handle potential \r\n or \n line endings
-        blocks = srt_content.strip().split('\n\n')
-        if len(blocks) == 1 and '\r\n\r\n' in srt_content:
-            blocks = srt_content.strip().split('\r\n\r\n')
-
-
-        with open(lrc_file_path, 'w', encoding='utf-8') as lrc_file: # Write standard utf-8
-            for block in blocks:
-                lines = block.strip().splitlines()
-                if len(lines) >= 3: # Need at least index, time, text
-                    # Line 1 is index (ignore)
-                    # Line 2 contains timecodes
-                    time_line = lines[1]
-                    # Text can span multiple lines (lines[2:])
-                    text_content = " ".join(lines[2:]).strip()
-
-                    if '-->' in time_line:
-                        time_start_str = time_line.split('-->')[0].strip()
-                        lrc_time = convert_srt_time_to_lrc(time_start_str)
-                        # Write LRC line: [MM:SS.xx]Text
-                        lrc_file.write(f"[{lrc_time}]{text_content}\n")
-
-        # Conversion successful, delete original SRT
-        try:
-            srt_file_path.unlink()
-        except OSError as e:
-            print(f"Warning: Could not delete source SRT file {srt_file_path}: {e}", file=sys.stderr)
-
-        # print(f'Successfully converted {srt_file_path.name} to {lrc_file_path.name}')
-        return lrc_file_path
-
-    except Exception as e:
+        convert_file(srt_file_path, lrc_file_path, issues)
+    except (OSError, ValueError) as e:
+        _report_issues(srt_file_path, issues)
         print(f"Error converting {srt_file_path.name} to LRC: {e}", file=sys.stderr)
-        # Attempt to clean up partially written LRC file if error occurred
-        if lrc_file_path.exists():
-            try:
-                lrc_file_path.unlink()
-            except OSError:
-                 pass # Ignore cleanup error
         return None
+    _report_issues(srt_file_path, issues)
 
+    # Conversion successful, delete original SRT
+    try:
+        srt_file_path.unlink()
+    except OSError as e:
+        print(f"Warning: Could not delete source SRT file {srt_file_path}: {e}", file=sys.stderr)
+
+    # print(f'Successfully converted {srt_file_path.name} to {lrc_file_path.name}')
+    return lrc_file_path
+
+
+# --- Bulk Conversion (directory in, directory out) ---
+def iter_srt_files(source_dir: Path):
+    """Every .srt file under source_dir (any letter case), as paths relative to it."""
+    for dir_path, dir_names, file_names in os.walk(source_dir):
+        dir_names.sort()
+        for name in sorted(file_names):
+            if name.lower().endswith('.srt'):
+                yield Path(dir_path, name).relative_to(source_dir)
+
+def _convert_task(task):
+    """Worker process side of convert_directory: (relative path, error or None, lines, issues)."""
+    source, target, relative = task
+    issues = []
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        lines = convert_file(source, target, issues)
+    except (OSError, ValueError) as e:
+        return relative, str(e), 0, issues
+    return relative, None, lines, issues
 
-# --- Command Line Interface (for testing srt_to_lrc.py directly) ---
-if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print('Usage: python srt_to_lrc.py <path_to_srt_file>')
-        sys.exit(1)
+def convert_directory(source_dir, target_dir, workers=None, overwrite: bool = False, on_file=None) -> dict:
+    """
+    Converts every SRT under source_dir to an LRC at the same relative path under
+    target_dir, in parallel worker processes. Sources are kept.
+
+    Args:
+        workers: Number of processes (default: all cores); 1 converts in this process.
+        overwrite (bool): Also convert files whose LRC already exists.
+        on_file: Called as on_file(relative path, error or None, lines, issues) per converted file.
+
+    Returns:
+        dict: Counts: total, converted, skipped (LRC exists), failed, lines, malformed_blocks.
+    """
+    source_dir, target_dir = Path(source_dir), Path(target_dir)
+    summary = {"total": 0, "converted": 0, "skipped": 0, "failed": 0, "lines": 0, "malformed_blocks": 0}
+    tasks = []
+    for relative in iter_srt_files(source_dir):
+        summary["total"] += 1
+        target = (target_dir / relative).with_suffix('.lrc')
+        if not overwrite and target.exists():
+            summary["skipped"] += 1
+            continue
+        tasks.append((source_dir / relative, target, relative))
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > BULK_CHUNKSIZE:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(_convert_task, tasks, chunksize=BULK_CHUNKSIZE)
     else:
-        input_path = Path(sys.argv[1])
-        result_path = srt_to_lrc(input_path)
-        if result_path:
-             print(f"Conversion successful. LRC file saved to: {result_path}")
-             sys.exit(0)
-        else:
-             print("Conversion failed.")
-             sys.exit(1)
\ No newline at end of file
+        executor = None
+        results = map(_convert_task, tasks)
+    try:
+        for relative, error, lines, issues in results:
+            summary["failed" if error else "converted"] += 1
+            summary["lines"] += lines
+            summary["malformed_blocks"] += len(issues)
+            if on_file:
+                on_file(relative, error, lines, issues)
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+    return summary
+
+
+# --- Command Line Interface ---
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Convert an SRT file to LRC (the SRT is deleted), or every SRT under a folder into another folder.")
+    parser.add_argument("source", type=Path, help="SRT file, or folder searched recursively")
+    parser.add_argument("target", type=Path, nargs="?", help="output folder (bulk mode, required with a source folder)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="processes for bulk mode (default: all cores)")
+    parser.add_argument("--overwrite", action="store_true", help="bulk mode: redo files whose LRC already exists")
+    parser.add_argument("-q", "--quiet", action="store_true", help="bulk mode: only print failures and the summary")
+    args = parser.parse_args(argv)
+
+    if args.source.is_dir():
+        if args.target is None:
+            parser.error("an output folder is required when the source is a folder")
+        if args.jobs is not None and args.jobs < 1:
+            parser.error("--jobs must be at least 1")
+
+        def on_file(relative, error, lines, issues):
+            if error:
+                print(f"Failed: {relative}: {error}", file=sys.stderr)
+            elif issues and not args.quiet:
+                print(f"{relative}: {lines} lines, {len(issues)} malformed blocks skipped "
+                      f"(first at line {issues[0].line}: {issues[0].message})", file=sys.stderr)
+
+        summary = convert_directory(args.source, args.target, args.jobs, args.overwrite, on_file)
+        print(f"Converted {summary['converted']}/{summary['total']} files ({summary['skipped']} already converted, "
+              f"{summary['failed']} failed, {summary['malformed_blocks']} malformed blocks skipped).")
+        return 1 if summary["failed"] else 0
+
+    if args.target is not None:
+        parser.error("an output folder only applies when the source is a folder")
+    result_path = srt_to_lrc(args.source)
+    if result_path:
+        print(f"Conversion successful. LRC file saved to: {result_path}")
+        return 0
+    print("Conversion failed.")
+    return 1
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support() # See main.py
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Startup profiling and the dependency checks the GUI (main.py) runs after its window is shown.
+
+main.py only imports what the window needs (PyQt5 and the Qt-free pipeline
+modules, which import their libraries lazily). Looking for FFmpeg and the
+inference libraries, and importing the selected one (whisper pulls in torch,
+numba and tiktoken), happen on a background thread while the window is
+already up; the model is then preloaded (see model_cache.preload).
+`python main.py --profile-startup` (or AUTO2LRC_PROFILE_STARTUP=1) prints how
+long each step took, counted from when main.py started importing.
+"""
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import backends
+
+FFMPEG_TIMEOUT_SECONDS = 10
+
+
+class Step(NamedTuple):
+    """A timed startup step; started and seconds are relative to the profile's start."""
+    label: str
+    started: float
+    seconds: float
+    detail: str = ""
+
+
+class StartupProfile:
+    """Steps of this process's startup, recorded from any thread."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.enabled = os.environ.get("AUTO2LRC_PROFILE_STARTUP", "") not in ("", "0")
+        self.steps = []
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def mark(self, label: str, detail: str = ""):
+        """Records a point in time (a step of zero length), e.g. 'window shown'."""
+        self.record(label, self.elapsed(), detail)
+
+    def record(self, label: str, started: float, detail: str = ""):
+        """Records a step that started at `started` (from elapsed()) and ends now."""
+        with self._lock:
+            self.steps.append(Step(label, started, self.elapsed() - started, detail))
+
+    @contextmanager
+    def step(self, label: str, detail: str = ""):
+        """Times the block as one step (recorded even if it raises)."""
+        started = self.elapsed()
+        try:
+            yield
+        finally:
+            self.record(label, started, detail)
+
+    def report(self) -> str:
+        """One line per step, in the order they started."""
+        with self._lock:
+            steps = sorted(self.steps, key=lambda step: step.started)
+        lines = ["Startup profile (seconds since main.py started importing):"]
+        for step in steps:
+            took = f"took {step.seconds:6.3f}" if step.seconds else " " * 11
+            lines.append(f"  at {step.started:6.3f}  {took}  {step.label}" + (f" ({step.detail})" if step.detail else ""))
+        return "\n".join(lines)
+
+
+# Process-wide profile; created when main.py imports this module first thing
+profile = StartupProfile()
+
+
+# --- Dependency Checks (run in the background) ---
+class CheckResult(NamedTuple):
+    ok: bool
+    message: str
+
+
+def check_ffmpeg() -> CheckResult:
+    """FFmpeg is on PATH and runs (its version line is the message)."""
+    path = shutil.which("ffmpeg")
+    if path is None:
+        return CheckResult(False, "FFmpeg not found. Whisper needs FFmpeg to decode audio; install it and make sure "
+                                  "it is on PATH (see https://ffmpeg.org/download.html).")
+    try:
+        completed = subprocess.run([path, "-hide_banner", "-version"], capture_output=True, text=True,
+                                   errors="replace", timeout=FFMPEG_TIMEOUT_SECONDS)
+    except (OSError, subprocess.SubprocessError) as e:
+        return CheckResult(False, f"FFmpeg at {path} could not be run: {e}")
+    if completed.returncode != 0:
+        return CheckResult(False, f"FFmpeg at {path} exited with code {completed.returncode}")
+    version = completed.stdout.split("\n", 1)[0].split(" Copyright")[0]
+    return CheckResult(True, version or f"FFmpeg at {path}")
+
+
+def check_backends() -> CheckResult:
+    """At least one inference library is installed (checked without importing it)."""
+    available = backends.available_backends()
+    if not available:
+        hints = sorted({backend.install_hint for backend in backends.BACKENDS.values()})
+        return CheckResult(False, "No transcription library found. Install one using: " + " or ".join(hints))
+    return CheckResult(True, "installed: " + ", ".join(available))
+
+
+def import_backend(name: str) -> CheckResult:
+    """Imports the backend's library now, so the first model load doesn't pay for it."""
+    module = backends.BACKENDS[name].module
+    before = len(sys.modules)
+    try:
+        with profile.step(f"import {module}"):
+            importlib.import_module(module)
+    except Exception as e:
+        return CheckResult(False, f"Could not import {module}: {e}")
+    return CheckResult(True, f"{module} ready ({len(sys.modules) - before} modules imported)")
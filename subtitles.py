@@ -0,0 +1,331 @@
+"""
+In-memory subtitle model shared by the pipeline and srt_to_lrc.py.
+
+Whisper's segments become a list of Cue objects, which are formatted straight to
+LRC/SRT/VTT/JSON text and written next to the audio file with an atomic temp-file +
+rename, so no intermediate files are needed. Every output format is a Writer in
+WRITERS, so one transcription produces all selected formats.
+"""
+import json
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import NamedTuple
+
+# Regex to parse SRT time: HH:MM:SS,ms
+SRT_TIME_REGEX = re.compile(r'(\d{2}):(\d{2}):(\d{2}),(\d{3})')
+# Time line of an SRT block; also accepts '.' before the milliseconds, 1-3 digit ms and longer hours
+SRT_TIMING_REGEX = re.compile(r'\s*(\d+):(\d{2}):(\d{2})[,.](\d{1,3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{1,3})')
+
+
+class Word(NamedTuple):
+    """One word with its own timing (text keeps Whisper's leading space, if any)."""
+    start: float
+    end: float
+    text: str
+
+
+class Cue(NamedTuple):
+    """One subtitle line: start/end in seconds and its text (may contain newlines)."""
+    start: float
+    end: float
+    text: str
+    words: tuple = () # Word timings, only when transcribed with word_timestamps
+
+
+# --- Whisper Result -> Cues ---
+def cues_from_segments(segments) -> list:
+    """Converts Whisper's result["segments"] to cues (text is stripped)."""
+    return [Cue(segment['start'], segment['end'], segment['text'].strip(),
+                tuple(Word(word['start'], word['end'], word['word']) for word in segment.get('words') or ()))
+            for segment in segments]
+
+
+# --- Time Formatting ---
+# Every format goes through whole milliseconds, so SRT, LRC and VTT times of a cue always agree
+def to_milliseconds(seconds: float) -> int:
+    assert seconds >= 0, "non-negative timestamp expected"
+    return round(seconds * 1000.0)
+
+
+def format_srt_ms(milliseconds: int, separator: str = ',') -> str:
+    """HH:MM:SS,mmm for a time in milliseconds."""
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+
+
+def format_lrc_ms(milliseconds: int) -> str:
+    """MM:SS.xx for a time in milliseconds (hundredths rounded half up)."""
+    minutes, centiseconds = divmod((milliseconds + 5) // 10, 6000)
+    seconds, centiseconds = divmod(centiseconds, 100)
+    return f"{minutes:02d}:{seconds:02d}.{centiseconds:02d}"
+
+
+def format_srt_time(seconds: float) -> str:
+    """Converts seconds to SRT time format HH:MM:SS,ms"""
+    return format_srt_ms(to_milliseconds(seconds))
+
+
+def format_lrc_time(seconds: float) -> str:
+    """Converts seconds to LRC time format MM:SS.xx (same rounding as going through SRT first)."""
+    return format_lrc_ms(to_milliseconds(seconds))
+
+
+def format_vtt_time(seconds: float) -> str:
+    """Converts seconds to WebVTT time format HH:MM:SS.mmm"""
+    return format_srt_ms(to_milliseconds(seconds), '.')
+
+
+def _milliseconds(h: str, m: str, s: str, ms: str) -> int:
+    return ((int(h) * 60 + int(m)) * 60 + int(s)) * 1000 + int(ms.ljust(3, '0'))
+
+
+def parse_srt_ms(time_string: str):
+    """Parses SRT time (HH:MM:SS,ms) to whole milliseconds, or None if it doesn't match."""
+    match = SRT_TIME_REGEX.match(time_string.strip())
+    return _milliseconds(*match.groups()) if match else None
+
+
+def parse_srt_time(time_string: str):
+    """Parses SRT time (HH:MM:SS,ms) to seconds, or None if it doesn't match."""
+    milliseconds = parse_srt_ms(time_string)
+    return milliseconds / 1000.0 if milliseconds is not None else None
+
+
+# --- Formatting ---
+def format_srt(cues) -> str:
+    """SRT file content for cues."""
+    return "".join(
+        f"{i}\n{format_srt_time(cue.start)} --> {format_srt_time(cue.end)}\n{cue.text}\n\n"
+        for i, cue in enumerate(cues, start=1)
+    )
+
+
+def format_lrc(cues) -> str:
+    """
+    Standard LRC content: [MM:SS.xx]Text per cue, using only the start time.
+    Multi-line cue text is joined with spaces and empty cues are dropped.
+    """
+    lines = []
+    for cue in cues:
+        text = " ".join(cue.text.splitlines()).strip()
+        if text:
+            lines.append(f"[{format_lrc_time(cue.start)}]{text}\n")
+    return "".join(lines)
+
+
+def tagged_language(info):
+    """The language to write into LRC/WebVTT headers: only with info['language_tags'] (language routing)."""
+    info = info or {}
+    return info.get("language") if info.get("language_tags") else None
+
+
+def lrc_tags(info) -> str:
+    """LRC ID tags for info, e.g. '[la:en]' (see tagged_language; '' otherwise)."""
+    language = tagged_language(info)
+    return f"[la:{language}]\n" if language else ""
+
+
+def format_enhanced_lrc(cues) -> str:
+    """
+    Enhanced (word-level) LRC: [MM:SS.xx]<MM:SS.xx>Word <MM:SS.xx>word ...<MM:SS.xx>
+    The last tag is the end of the line. Cues without word timings fall back to standard LRC lines.
+    """
+    lines = []
+    for cue in cues:
+        if not cue.words:
+            lines.append(format_lrc([cue]))
+            continue
+        parts = []
+        for word in cue.words:
+            text = word.text.strip()
+            if not text:
+                continue
+            # Whitespace goes before the tag, so languages without spaces stay unspaced
+            space = " " if word.text[:1].isspace() else ""
+            parts.append(f"{space}<{format_lrc_time(word.start)}>{text}")
+        if parts:
+            lines.append(f"[{format_lrc_time(cue.start)}]{''.join(parts).strip()}<{format_lrc_time(cue.words[-1].end)}>\n")
+    return "".join(lines)
+
+
+def format_vtt(cues, info=None) -> str:
+    """WebVTT file content for cues, with a 'Language:' header for tagged_language(info)."""
+    language = tagged_language(info)
+    header = f"WEBVTT\nLanguage: {language}\n\n" if language else "WEBVTT\n\n"
+    return header + "".join(
+        f"{format_vtt_time(cue.start)} --> {format_vtt_time(cue.end)}\n{cue.text}\n\n"
+        for cue in cues if cue.text
+    )
+
+
+def format_json(cues, info=None) -> str:
+    """JSON with the cues (and their word timings) plus info such as the detected language."""
+    data = {key: value for key, value in (info or {}).items() if key != "language_tags"}
+    data["segments"] = [
+        {"start": cue.start, "end": cue.end, "text": cue.text,
+         **({"words": [{"start": w.start, "end": w.end, "text": w.text.strip()} for w in cue.words]}
+            if cue.words else {})}
+        for cue in cues
+    ]
+    return json.dumps(data, ensure_ascii=False, indent=2) + "\n"
+
+
+# --- Parsing ---
+class SrtIssue(NamedTuple):
+    """A malformed SRT block that was skipped."""
+    line: int # 1-based line number where the block starts
+    message: str
+
+
+def _parse_block(block: list, first_line: int, errors):
+    """Cue for one block of non-blank lines, or None (malformed blocks are added to errors)."""
+    timing = 1 if len(block) > 1 and block[0].strip().isdigit() else 0 # The index line is optional
+    match = SRT_TIMING_REGEX.match(block[timing])
+    if not match:
+        if errors is not None:
+            errors.append(SrtIssue(first_line, f"no valid time line: {block[timing].strip()[:60]!r}"))
+        return None
+    start, end = _milliseconds(*match.group(1, 2, 3, 4)), _milliseconds(*match.group(5, 6, 7, 8))
+    if end < start:
+        if errors is not None:
+            errors.append(SrtIssue(first_line, f"end before start: {block[timing].strip()!r}"))
+        return None
+    return Cue(start / 1000.0, end / 1000.0, "\n".join(line.strip() for line in block[timing + 1:]).strip())
+
+
+def iter_srt(lines, errors=None):
+    """
+    Streams cues from SRT lines (e.g. a file opened in text mode, whose universal
+    newlines handle \\n, \\r\\n and \\r) in one pass. A leading BOM is ignored.
+    Malformed blocks are skipped and, if errors is a list, reported in it as
+    SrtIssue; blocks with a time line but no text are skipped silently.
+    """
+    block, first_line = [], 0
+    for number, line in enumerate(lines, start=1):
+        line = line.rstrip('\r\n')
+        if number == 1:
+            line = line.lstrip('\ufeff')
+        if line.strip():
+            if not block:
+                first_line = number
+            block.append(line)
+            continue
+        if block:
+            cue = _parse_block(block, first_line, errors)
+            if cue is not None and cue.text:
+                yield cue
+            block = []
+    if block:
+        cue = _parse_block(block, first_line, errors)
+        if cue is not None and cue.text:
+            yield cue
+
+
+def parse_srt(srt_content: str, errors=None) -> list:
+    """Parses SRT content into cues (see iter_srt; malformed blocks are skipped, never timed at 0)."""
+    return list(iter_srt(srt_content.splitlines(), errors))
+
+
+# --- Writing ---
+def write_atomic(path, text, encoding: str = 'utf-8'):
+    """
+    Writes text (str, or bytes written as-is) to path via a temp file in the same
+    directory and os.replace(), so readers (and other instances) never see a half-written file.
+    """
+    path = Path(path)
+    # Hidden, unique name next to the target; created with open() so the usual umask applies
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:12]}.tmp")
+    try:
+        binary = isinstance(text, bytes)
+        with open(tmp_path, 'xb' if binary else 'x', encoding=None if binary else encoding) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+
+
+# --- Writers ---
+class Writer(NamedTuple):
+    """An output format: render(cues, info) -> text, written to <audio stem><suffix>."""
+    name: str
+    suffix: str
+    render: object
+    description: str
+    needs_words: bool = False # Ask Whisper for word_timestamps when this format is selected
+
+
+WRITERS = {}
+DEFAULT_FORMATS = ("lrc",)
+
+
+def register_writer(writer: Writer):
+    """Adds (or replaces) an output format."""
+    WRITERS[writer.name] = writer
+
+
+register_writer(Writer("lrc", ".lrc", lambda cues, info: lrc_tags(info) + format_lrc(cues), "LRC"))
+register_writer(Writer("elrc", ".words.lrc", lambda cues, info: lrc_tags(info) + format_enhanced_lrc(cues),
+                       "Enhanced LRC (word timing)", needs_words=True))
+register_writer(Writer("srt", ".srt", lambda cues, info: format_srt(cues), "SRT"))
+register_writer(Writer("vtt", ".vtt", format_vtt, "WebVTT"))
+register_writer(Writer("json", ".json", format_json, "JSON"))
+
+
+def parse_formats(formats) -> tuple:
+    """
+    Validates a list of format names (or a comma-separated string) and returns them as a
+    tuple without duplicates, in the given order.
+
+    Raises:
+        ValueError: For an unknown format or an empty selection.
+    """
+    if isinstance(formats, str):
+        formats = formats.split(',')
+    names = []
+    for name in formats:
+        name = name.strip().lower()
+        if not name or name in names:
+            continue
+        if name not in WRITERS:
+            raise ValueError(f"Unknown output format '{name}' (choose from {', '.join(WRITERS)})")
+        names.append(name)
+    if not names:
+        raise ValueError("No output format selected.")
+    return tuple(names)
+
+
+def output_suffixes(formats) -> tuple:
+    return tuple(WRITERS[name].suffix for name in formats)
+
+
+def needs_word_timestamps(formats) -> bool:
+    return any(WRITERS[name].needs_words for name in formats)
+
+
+def output_path(audio_file, name: str) -> Path:
+    audio_file = Path(audio_file)
+    return audio_file.with_name(audio_file.stem + WRITERS[name].suffix)
+
+
+def render_outputs(audio_file, cues, formats=DEFAULT_FORMATS, info=None) -> list:
+    """(output path, content) of every selected format for audio_file, without writing anything."""
+    return [(output_path(audio_file, name), WRITERS[name].render(cues, info or {})) for name in formats]
+
+
+def write_outputs(audio_file, cues, formats=DEFAULT_FORMATS, info=None) -> list:
+    """Writes every selected format for audio_file (atomically) and returns the written paths."""
+    written = []
+    for path, content in render_outputs(audio_file, cues, formats, info):
+        write_atomic(path, content)
+        written.append(path)
+    return written
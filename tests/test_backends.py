@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+
+import backends
+import runcontrol
+
+
+class StopAfter:
+    """should_stop() that turns True after `calls` checks."""
+
+    def __init__(self, calls):
+        self.calls = calls
+        self.checks = 0
+
+    def __call__(self):
+        self.checks += 1
+        return self.checks > self.calls
+
+
+def test_interruptible_checks_before_every_forward_pass():
+    torch = pytest.importorskip("torch")
+    model = SimpleNamespace(encoder=torch.nn.Linear(2, 2), decoder=torch.nn.Linear(2, 2))
+    x = torch.zeros(1, 2)
+    should_stop = StopAfter(2)
+    with pytest.raises(runcontrol.Cancelled):
+        with backends.interruptible(model, should_stop):
+            model.decoder(model.encoder(x))
+            model.encoder(x)
+    assert should_stop.checks == 3
+    model.decoder(model.encoder(x)) # Hooks are removed on the way out
+    assert should_stop.checks == 3
+
+
+class FasterWhisperModel:
+    def transcribe(self, audio, language=None, word_timestamps=False):
+        segments = (SimpleNamespace(start=float(i), end=i + 1.0, text=f" line {i}", words=None) for i in range(5))
+        return segments, SimpleNamespace(language="en")
+
+
+def test_interruptible_stops_between_yielded_segments():
+    model = FasterWhisperModel()
+    with backends.interruptible(model, None):
+        assert len(backends._transcribe_faster_whisper(model, None, None, False)["segments"]) == 5
+    with pytest.raises(runcontrol.Cancelled):
+        with backends.interruptible(model, StopAfter(2)):
+            backends._transcribe_faster_whisper(model, None, None, False)
+    backends._transcribe_faster_whisper(model, None, None, False) # No check left behind
+
+
+def test_model_size_from_the_backend_or_an_estimate():
+    torch = pytest.importorskip("torch")
+    linear = torch.nn.Linear(100, 200)
+    assert backends.model_size_bytes(linear, "tiny", "cpu", None, "whisper") == (100 * 200 + 200) * 4
+    quantized = torch.ao.quantization.quantize_dynamic(torch.nn.Sequential(linear), {torch.nn.Linear}, dtype=torch.qint8)
+    assert backends.model_size_bytes(quantized, "tiny", "cpu", None, "whisper-int8") == 100 * 200 + 200 * 4 # Packed weights
+    assert backends.model_size_bytes(object(), "large-v3", "cpu", None, "faster-whisper") == 1550e6 # int8 on the CPU
+    assert backends.model_size_bytes(object(), "Systran/faster-whisper-medium", "cuda", None, "faster-whisper") == 769e6 * 2
+    assert backends.model_size_bytes(object(), "large-v3-turbo", "cpu", "float32", "faster-whisper") == 809e6 * 4
+    assert backends.model_size_bytes(object(), "my-model.pt", "cpu", None, "whisper") > 0 # Never 0
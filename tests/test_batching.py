@@ -0,0 +1,86 @@
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import batching
+import model_cache
+import pipeline
+import scanner
+
+
+class Tokenizer:
+    """Timestamp tokens from 100 up, text tokens below; decode() spells the text tokens out."""
+    eot = 50
+    timestamp_begin = 100
+
+    def decode(self, tokens):
+        return "".join(f" w{token}" for token in tokens)
+
+
+def test_segments_from_tokens():
+    # <|0.00|> w1 w2 <|1.00|><|1.00|> w3 <|2.40|> w4 (no closing timestamp) <eot>
+    tokens = [100, 1, 2, 150, 150, 3, 220, 4, 50]
+    assert batching.segments_from_tokens(tokens, Tokenizer(), duration=3.0) == [
+        {"start": 0.0, "end": 1.0, "text": " w1 w2"},
+        {"start": 1.0, "end": 2.4, "text": " w3"},
+        {"start": 2.4, "end": 3.0, "text": " w4"},
+    ]
+
+
+def decoding(**overrides):
+    values = dict(tokens=[100, 1, 150], language="en", no_speech_prob=0.1, avg_logprob=-0.3, compression_ratio=1.2)
+    return SimpleNamespace(**dict(values, **overrides))
+
+
+def test_results_whisper_would_retry_are_left_to_the_caller():
+    assert batching._to_result(decoding(), Tokenizer(), 5.0)["segments"] == [{"start": 0.0, "end": 1.0, "text": " w1"}]
+    assert batching._to_result(decoding(compression_ratio=3.0), Tokenizer(), 5.0) is None # Repetitive
+    assert batching._to_result(decoding(avg_logprob=-1.5), Tokenizer(), 5.0) is None # Low confidence
+    silence = batching._to_result(decoding(no_speech_prob=0.9, avg_logprob=-1.5), Tokenizer(), 5.0)
+    assert silence["segments"] == []
+
+
+@pytest.mark.parametrize("duration, fits", [(None, False), (0, False), (12.5, True), (30, True), (30.1, False)])
+def test_fits(duration, fits):
+    assert batching.fits(duration) == fits
+
+
+def write_wav(path, seconds):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes((np.sin(np.arange(int(seconds * 16000)) * 0.05) * 8000).astype(np.int16).tobytes())
+
+
+def test_batch_falls_back_to_transcribing_files_one_by_one(tmp_path, monkeypatch):
+    files = []
+    for i in range(3):
+        files.append(tmp_path / f"{i}.wav")
+        write_wav(files[-1], 1 + i)
+    batches, runs, errors = [], {}, []
+
+    def transcribe_batch(model, audios, language, group_by_language):
+        batches.append(len(audios))
+        if len(batches) == 2:
+            raise RuntimeError("out of memory")
+        return [{"language": "en", "segments": []}, None] # The second file needs the temperature fallback
+
+    def run_file(get_model, audio_file, settings, cache=None, decoded=None, result=None, **kwargs):
+        runs[audio_file.name] = result is not None
+        return {"path": str(audio_file), "status": pipeline.STATUS_OK}, None
+
+    monkeypatch.setattr(pipeline.batching, "transcribe_batch", transcribe_batch)
+    monkeypatch.setattr(pipeline, "run_file", run_file)
+    monkeypatch.setattr(model_cache, "default_manager", model_cache.ModelManager(loader=lambda *key: object()))
+    candidates = scanner.BackgroundScan(lambda stop_event: iter(files))
+    entries = list(pipeline._process_sequential(
+        candidates, pipeline.FileSettings("tiny", "en"), None, prefetch=1, threads=None,
+        on_progress=lambda message, percent: None, on_error=errors.append, should_stop=lambda: False, batch_size=2))
+
+    assert [entry["path"] for entry in entries] == [str(path) for path in files]
+    assert batches == [2, 1]
+    assert runs == {"0.wav": True, "1.wav": False, "2.wav": False} # Only the first came from the batch
+    assert len(errors) == 1 and "one by one" in errors[0]
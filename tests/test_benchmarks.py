@@ -0,0 +1,29 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BENCHMARKS = Path(__file__).resolve().parent.parent / "benchmarks"
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs FFmpeg")
+def test_pipeline_benchmark_smoke(tmp_path):
+    report_path = tmp_path / "report.json"
+    completed = subprocess.run(
+        [sys.executable, str(BENCHMARKS / "bench_pipeline.py"), "--files", "4", "--seconds", "2", "--dirs", "2",
+         "--srt-files", "2", "--srt-cues", "50", "--workers", "1,2", "--output", str(report_path)],
+        capture_output=True, text=True, timeout=300, env=dict(os.environ, AUTO2LRC_CACHE_DIR=str(tmp_path / "cache")))
+    assert completed.returncode == 0, completed.stderr
+    assert "srt_to_lrc" in completed.stdout # The table was printed
+
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    stages = report["stages"]
+    assert stages["scan"]["files"] == stages["decode"]["files"] == 4 and stages["decode"]["errors"] == 0
+    assert stages["transcribe"]["stub"]["files"] == 4
+    assert stages["srt_to_lrc"]["files"] == 2 and stages["srt_to_lrc"]["failed"] == 0
+    assert [(run["workers"], run["status"], run["succeeded"]) for run in report["runs"]] == [
+        (1, "finished", 4), (2, "finished", 4)]
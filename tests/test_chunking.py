@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+import chunking
+
+SR = chunking.SAMPLE_RATE
+
+
+def segment(start, end, text, words=()):
+    return {"start": start, "end": end, "text": text,
+            "words": [{"start": s, "end": e, "word": w} for s, e, w in words]}
+
+
+def grid_transcriber(segment_seconds):
+    """
+    Stub transcribe() for audio whose samples are their own time in seconds: continuous
+    speech cut into segment_seconds-long lines (text = line number), clipped to the window.
+    """
+    def transcribe(samples, language):
+        first, last = float(samples[0]), float(samples[-1]) + 1 / SR
+        segments = []
+        index = int(first // segment_seconds)
+        while index * segment_seconds < last - 1e-6:
+            start, end = max(first, index * segment_seconds), min(last, (index + 1) * segment_seconds)
+            segments.append(segment(start - first, end - first, str(index)))
+            index += 1
+        return {"language": "en", "segments": segments}
+    return transcribe
+
+
+def test_chunk_windows_overlap_and_cover():
+    windows = chunking.chunk_windows(150 * SR, 60 * SR, 4 * SR)
+    assert windows == [(0, 60 * SR), (56 * SR, 116 * SR), (112 * SR, 150 * SR)]
+    assert chunking.chunk_windows(10 * SR, 60 * SR, 4 * SR) == [(0, 10 * SR)]
+
+
+def test_chunk_windows_overlap_is_capped_at_half_a_chunk():
+    assert chunking.chunk_windows(30, 10, 8) == [(0, 10), (5, 15), (10, 20), (15, 25), (20, 30)]
+
+
+@pytest.mark.parametrize("segment_seconds", [6.4, 2.0, 5.0, 11.0])
+def test_continuous_speech_survives_chunk_boundaries(segment_seconds):
+    audio = np.arange(90 * SR) / SR # float64, so every sample is its time exactly
+    result = chunking.transcribe_chunked(grid_transcriber(segment_seconds), audio, chunk_seconds=30)
+    segments = result["segments"]
+
+    # Every line once, at its own time, without gaps or overlaps (the default overlap is 4 s)
+    count = int(np.ceil(90 / segment_seconds))
+    assert [s["text"] for s in segments] == [str(i) for i in range(count)]
+    for i, s in enumerate(segments):
+        assert s["start"] == pytest.approx(i * segment_seconds)
+        assert s["end"] == pytest.approx(min(90.0, (i + 1) * segment_seconds))
+
+
+def test_stitch_keeps_segments_ending_by_the_cut():
+    windows = [(0, 60 * SR), (56 * SR, 116 * SR)] # Overlap 56-60 s, cut at 58 s
+    first = {"language": "en", "segments": [segment(10.0, 12.0, "a"), segment(56.5, 57.5, "b"),
+                                            segment(57.5, 60.0, "c (cut off)")]}
+    # The second chunk starts at 56 s; its times are relative to that
+    second = {"language": None, "segments": [segment(0.0, 1.5, "b"), segment(1.5, 5.0, "c"),
+                                             segment(10.0, 11.0, "d", [(10.0, 10.5, " d")])]}
+    result = chunking.stitch([first, second], windows)
+
+    assert result["language"] == "en"
+    assert [(s["start"], s["end"], s["text"]) for s in result["segments"]] == [
+        (10.0, 12.0, "a"), (56.5, 57.5, "b"), (57.5, 61.0, "c"), (66.0, 67.0, "d")]
+    assert result["segments"][-1]["words"] == [{"start": 66.0, "end": 66.5, "word": " d"}]
+    assert second["segments"][2]["start"] == 10.0 # Inputs are not modified
+
+
+def test_stitch_keeps_a_long_segment_the_next_chunk_cant_hear():
+    windows = [(0, 30 * SR), (26 * SR, 56 * SR)]
+    first = {"segments": [segment(10.0, 29.5, "long line")]} # Mostly before the next chunk starts
+    second = {"segments": [segment(0.0, 3.0, "tail of the long line"), segment(3.8, 6.0, "next")]}
+    result = chunking.stitch([first, second], windows)
+    assert [(s["start"], s["end"], s["text"]) for s in result["segments"]] == [
+        (10.0, 29.5, "long line"), (29.8, 32.0, "next")]
+
+
+def test_stitch_clamps_overlapping_starts():
+    windows = [(0, 30 * SR), (26 * SR, 56 * SR)]
+    first = {"segments": [segment(24.0, 27.9, "a", [(24.0, 27.9, " a")])]}
+    second = {"segments": [segment(1.8, 4.0, "b", [(1.8, 2.5, " b")])]} # Starts at 27.8 s, 0.1 s early
+    segments = chunking.stitch([first, second], windows)["segments"]
+    assert segments[1]["start"] == segments[0]["end"] == 27.9
+    assert segments[1]["words"][0]["start"] == 27.9
+
+
+def test_stitch_single_chunk_keeps_everything():
+    result = {"language": "de", "segments": [segment(0.0, 1.0, "x"), segment(100.0, 101.0, "y")]}
+    assert chunking.stitch([result], [(0, 200 * SR)])["segments"] == result["segments"]
@@ -0,0 +1,95 @@
+import threading
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import decoder
+import runcontrol
+
+
+def write_wav(path, seconds, sample_rate=44100):
+    samples = (np.sin(np.arange(int(seconds * sample_rate)) * 0.05) * 10000).astype(np.int16)
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+
+
+def test_decode_resamples_to_16k_and_hashes_the_samples(tmp_path):
+    write_wav(tmp_path / "tone.wav", 1.5)
+    decoded = decoder.decode(tmp_path / "tone.wav")
+    assert decoded.error is None and decoded.audio.dtype == np.float32
+    assert decoded.duration == pytest.approx(1.5, abs=0.01)
+    assert decoded.pcm_hash == decoder.pcm_hash(decoded.audio)
+
+    broken = tmp_path / "broken.mp3"
+    broken.write_bytes(b"not audio")
+    failed = decoder.decode(broken)
+    assert failed.audio is None and "broken.mp3" in failed.error
+
+
+class FakeDecode:
+    """Stands in for decoder.decode: later files finish first, and concurrent decodes are counted."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = self.most_running = 0
+        self.started = []
+
+    def __call__(self, path, should_stop=None):
+        with self.lock:
+            self.started.append(path.name)
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(0.05 if path.name.endswith("0") else 0.01)
+        with self.lock:
+            self.running -= 1
+        if should_stop is not None and should_stop():
+            raise runcontrol.Cancelled("stopped")
+        return decoder.DecodedAudio(path, None, None, None, None)
+
+
+def test_prefetcher_yields_in_order_and_bounds_the_read_ahead(monkeypatch):
+    fake = FakeDecode()
+    monkeypatch.setattr(decoder, "decode", fake)
+    files = [Path(f"{i}0") if i % 2 else Path(f"{i}1") for i in range(8)]
+    prefetcher = decoder.Prefetcher(files, depth=2, threads=4)
+    try:
+        consumed = []
+        for decoded in prefetcher:
+            consumed.append(decoded.path)
+            time.sleep(0.02)
+            assert len(fake.started) <= len(consumed) + 2 # At most `depth` files beyond the one held
+    finally:
+        prefetcher.close()
+    assert consumed == files
+    assert fake.most_running <= 2
+
+
+def test_prefetcher_raises_cancelled_when_stopped(monkeypatch):
+    monkeypatch.setattr(decoder, "decode", FakeDecode())
+    control = runcontrol.RunControl()
+    prefetcher = decoder.Prefetcher([Path(f"{i}1") for i in range(5)], should_stop=control.should_stop)
+    try:
+        iterator = iter(prefetcher)
+        assert next(iterator).path == Path("01")
+        control.cancel()
+        with pytest.raises(runcontrol.Cancelled):
+            for _ in iterator:
+                pass
+    finally:
+        prefetcher.close()
+
+
+def test_prefetcher_close_stops_decoding_ahead(monkeypatch):
+    fake = FakeDecode()
+    monkeypatch.setattr(decoder, "decode", fake)
+    prefetcher = decoder.Prefetcher((Path(f"{i}1") for i in range(100)), depth=1, threads=1)
+    next(iter(prefetcher))
+    prefetcher.close()
+    time.sleep(0.1)
+    assert len(fake.started) <= 3
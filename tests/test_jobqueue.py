@@ -0,0 +1,166 @@
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import jobqueue
+
+REPO = Path(__file__).resolve().parent.parent
+
+# A local worker process: jobqueue.run_worker with run_file replaced, so no model or FFmpeg is needed
+WORKER = """
+import json, sys, time
+sys.path.insert(0, {repo!r})
+import jobqueue, pipeline
+
+def run_file(get_model, audio_file, settings, cache=None, decoded=None, should_stop=None):
+    time.sleep(0.02)
+    return {{"path": str(audio_file), "status": pipeline.STATUS_OK, "outputs": [], "error": None,
+             "elapsed_seconds": 0.02}}, None
+
+pipeline.run_file = run_file
+jobqueue.POLL_SECONDS = 0.1
+stats = jobqueue.run_worker(sys.argv[1], worker_id=sys.argv[2], use_cache=False, lease_seconds=float(sys.argv[3]))
+print(json.dumps(stats))
+"""
+
+# Claims one file and dies without completing or releasing it
+CRASHING_CLAIMER = """
+import os, sys
+sys.path.insert(0, {repo!r})
+import jobqueue
+with jobqueue.JobQueue(jobqueue.default_queue_path(sys.argv[1])) as jobs:
+    jobs.register_worker(sys.argv[2], 0.3)
+    print(jobs.claim(sys.argv[2], 0.3), flush=True)
+os._exit(1)
+"""
+
+
+def make_library(root: Path, count: int) -> list:
+    for i in range(count):
+        folder = root / f"album{i % 3}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"track{i:02d}.mp3").write_bytes(b"")
+    queued, found = jobqueue.enqueue_library(root, model_name="tiny", language="en")
+    assert queued == found == count
+    return sorted(path.relative_to(root).as_posix() for path in root.rglob("*.mp3"))
+
+
+def start_worker(root, worker_id, lease_seconds=5.0):
+    return subprocess.Popen([sys.executable, "-c", WORKER.format(repo=str(REPO)), str(root), worker_id,
+                             str(lease_seconds)], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def finish(process) -> dict:
+    stdout, stderr = process.communicate(timeout=60)
+    assert process.returncode == 0, stderr
+    return json.loads(stdout.strip().splitlines()[-1])
+
+
+def jobs_by_status(root) -> dict:
+    with jobqueue.JobQueue(jobqueue.default_queue_path(root)) as jobs:
+        return dict(jobs._db.execute("SELECT path, status FROM jobs"))
+
+
+def test_workers_share_the_queue_without_duplicates(tmp_path):
+    paths = make_library(tmp_path, 30)
+    workers = [start_worker(tmp_path, f"host:{i}") for i in range(3)]
+    stats = [finish(worker) for worker in workers]
+
+    assert sum(s["done"] for s in stats) == 30 # Every file processed exactly once
+    assert all(s["failed"] == 0 and s["lost_leases"] == 0 for s in stats)
+    assert jobs_by_status(tmp_path) == dict.fromkeys(paths, jobqueue.JOB_DONE)
+    with jobqueue.JobQueue(jobqueue.default_queue_path(tmp_path)) as jobs:
+        status = jobs.status()
+    assert {w["id"]: w["state"] for w in status["workers"]} == dict.fromkeys(("host:0", "host:1", "host:2"), "stopped")
+
+
+def test_expired_lease_of_a_dead_worker_is_requeued(tmp_path):
+    make_library(tmp_path, 4)
+    claimer = subprocess.run([sys.executable, "-c", CRASHING_CLAIMER.format(repo=str(REPO)), str(tmp_path), "dead:1"],
+                             capture_output=True, text=True, timeout=60)
+    abandoned = claimer.stdout.strip()
+    assert abandoned and jobs_by_status(tmp_path)[abandoned] == jobqueue.JOB_LEASED
+
+    time.sleep(0.5) # Past the dead worker's lease
+    stats = [finish(worker) for worker in [start_worker(tmp_path, f"host:{i}") for i in range(2)]]
+    assert sum(s["done"] for s in stats) == 4
+    assert set(jobs_by_status(tmp_path).values()) == {jobqueue.JOB_DONE}
+
+
+def test_lease_expiry_and_attempt_limit(tmp_path):
+    with jobqueue.JobQueue(tmp_path / "queue.sqlite3") as jobs:
+        jobs.enqueue(["a.mp3"])
+        assert jobs.claim("w1", lease_seconds=0.05) == "a.mp3"
+        assert jobs.claim("w2", lease_seconds=0.05) is None # Still leased
+        time.sleep(0.1)
+        assert jobs.claim("w2", lease_seconds=60) == "a.mp3" # Expired: handed to w2
+
+        entry = {"status": "ok", "outputs": [], "error": None, "elapsed_seconds": 1.0}
+        assert not jobs.complete("a.mp3", "w1", entry) # w1 lost its lease
+        assert jobs.heartbeat("w2", 60) == 1
+        assert jobs.complete("a.mp3", "w2", entry)
+        assert jobs.pending() == 0
+
+        jobs.enqueue(["b.mp3"])
+        for attempt in range(jobqueue.MAX_ATTEMPTS):
+            assert jobs.claim(f"w{attempt}", lease_seconds=0.01) == "b.mp3"
+            time.sleep(0.05)
+        assert jobs.claim("w9", lease_seconds=60) is None # Leases kept expiring: failed
+        status = jobs.status()
+        assert status["jobs"][jobqueue.JOB_FAILED] == 1
+        assert "stopped responding" in status["recent_failures"][0]["error"]
+
+
+def test_release_and_requeue(tmp_path):
+    with jobqueue.JobQueue(tmp_path / "queue.sqlite3") as jobs:
+        assert jobs.enqueue(["a.mp3", "b.mp3"]) == 2
+        assert jobs.enqueue(["a.mp3"]) == 0 # Already queued
+
+        path = jobs.claim("w1")
+        jobs.release(path, "w1")
+        row = jobs._db.execute("SELECT status, attempts FROM jobs WHERE path = ?", (path,)).fetchone()
+        assert row == (jobqueue.JOB_QUEUED, 0) # Released claims don't count as attempts
+
+        assert jobs.claim("w1") == path
+        assert jobs.enqueue([path]) == 0 # Leased files are left alone
+        jobs.complete(path, "w1", {"status": "error", "outputs": [], "error": "boom"})
+        assert jobs.enqueue([path]) == 0 # Failed files only with requeue_failed
+        assert jobs.enqueue([path], requeue_failed=True) == 1
+
+
+def test_heartbeat_keeps_a_slow_file_leased(tmp_path):
+    lease_seconds = 0.4
+    make_library(tmp_path, 1)
+    slow = WORKER.replace("time.sleep(0.02)", "time.sleep(2.0)")
+    process = subprocess.Popen([sys.executable, "-c", slow.format(repo=str(REPO)), str(tmp_path), "slow:1",
+                                str(lease_seconds)], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    deadline = time.monotonic() + 30
+    while jobqueue.JOB_LEASED not in jobs_by_status(tmp_path).values():
+        assert time.monotonic() < deadline and process.poll() is None
+        time.sleep(0.05)
+    time.sleep(1.0) # Longer than the lease, shorter than the file
+    with jobqueue.JobQueue(jobqueue.default_queue_path(tmp_path)) as jobs:
+        assert jobs.claim("thief:1", lease_seconds) is None
+    stats = finish(process)
+    assert stats["done"] == 1 and stats["lost_leases"] == 0
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"model_name": "tinny"},
+    {"route_languages": True, "routes": "ja=mediun"},
+    {"route_languages": True, "detect_model": "tiny.en"},
+])
+def test_enqueue_rejects_unknown_models(tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        jobqueue.enqueue_library(tmp_path, **kwargs)
+    assert not jobqueue.default_queue_path(tmp_path).exists() # Nothing queued
+
+
+def test_enqueue_accepts_checkpoint_paths(tmp_path):
+    checkpoint = tmp_path / "model.pt"
+    checkpoint.write_bytes(b"")
+    assert jobqueue.enqueue_library(tmp_path, model_name=str(checkpoint)) == (0, 0)
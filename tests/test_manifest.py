@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+import manifest
+
+AUDIO = {".mp3", ".wav"}
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / "library"
+    (root / "album").mkdir(parents=True)
+    (root / "album" / "a.mp3").write_bytes(b"a" * 100)
+    (root / "album" / "b.mp3").write_bytes(b"b" * 100)
+    (root / "album" / "b.lrc").write_text("[00:00.00]b", encoding="utf-8") # Done before the manifest existed
+    return root
+
+
+def open_manifest(root, **kwargs):
+    return manifest.Manifest(root / manifest.MANIFEST_DIR_NAME / manifest.MANIFEST_FILE_NAME, root, AUDIO, **kwargs)
+
+
+def done(index, audio_file, model="base"):
+    audio_file.with_suffix(".lrc").write_text("[00:00.00]x", encoding="utf-8")
+    index.record(audio_file, manifest.STATUS_OK, model=model)
+
+
+def bump_mtime(path, seconds=10):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 10 ** 9))
+
+
+def names(pending):
+    return sorted(path.name for path in pending)
+
+
+def test_new_files_are_pending_and_existing_outputs_skipped(library):
+    with open_manifest(library) as index:
+        pending, skipped = index.scan()
+        assert names(pending) == ["a.mp3"] and skipped == 1
+        assert index.get(library / "album" / "b.mp3")["status"] == manifest.STATUS_EXTERNAL
+
+        done(index, library / "album" / "a.mp3")
+        assert index.scan() == ([], 2)
+
+
+def test_changed_audio_is_redone(library):
+    audio = library / "album" / "a.mp3"
+    with open_manifest(library) as index:
+        index.scan()
+        done(index, audio)
+        audio.write_bytes(b"changed" * 20) # Size and mtime change
+        assert names(index.scan()[0]) == ["a.mp3"]
+
+
+def test_touched_audio_is_redone_unless_its_hash_matches(library):
+    audio = library / "album" / "a.mp3"
+    with open_manifest(library) as index:
+        index.scan(hash_files=True)
+        audio.with_suffix(".lrc").write_text("x", encoding="utf-8")
+        index.record(audio, manifest.STATUS_OK, model="base", hash_files=True)
+        bump_mtime(audio)
+        assert index.scan(hash_files=True) == ([], 2) # Same contents: kept (and the new mtime recorded)
+        bump_mtime(audio)
+        assert names(index.scan()[0]) == ["a.mp3"] # Without hashing, a new mtime means changed
+
+
+def test_missing_output_or_error_is_redone(library):
+    audio = library / "album" / "a.mp3"
+    with open_manifest(library, output_suffixes=(".lrc", ".srt")) as index:
+        done(index, audio)
+        assert names(index.scan()[0]) == ["a.mp3", "b.mp3"] # No .srt yet for either
+        audio.with_suffix(".srt").write_text("", encoding="utf-8")
+        assert names(index.scan()[0]) == ["b.mp3"]
+        index.record(audio, manifest.STATUS_ERROR, error="boom")
+        assert names(index.scan()[0]) == ["a.mp3", "b.mp3"]
+
+
+def test_requeue_weaker(library):
+    audio = library / "album" / "a.mp3"
+    with open_manifest(library) as index:
+        done(index, audio, model="tiny.en")
+        assert index.scan("small", requeue_weaker=True)[0] == [audio]
+        assert index.scan("tiny", requeue_weaker=True) == ([], 2) # Same size
+        assert index.scan("small") == ([], 2) # Only when asked for
+
+
+def test_changed_directory_is_listed_again(library):
+    with open_manifest(library) as index:
+        index.scan()
+        (library / "album" / "a.mp3").unlink()
+        (library / "album" / "c.mp3").write_bytes(b"c")
+        # The directory's mtime changed, so it is listed again and the new file shows up
+        assert names(index.scan()[0]) == ["c.mp3"]
+        assert index.get(library / "album" / "a.mp3") is None # Deleted files are forgotten
+
+
+def test_needs_processing(library):
+    audio = library / "album" / "a.mp3"
+    with open_manifest(library) as index:
+        assert index.needs_processing(audio)
+        done(index, audio)
+        assert not index.needs_processing(audio)
+        audio.write_bytes(b"new")
+        assert index.needs_processing(audio)
+        assert not index.needs_processing(library / "album" / "gone.mp3")
+
+
+def test_rollback_journal(library):
+    with open_manifest(library) as index:
+        assert index._db.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
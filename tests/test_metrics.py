@@ -0,0 +1,87 @@
+import json
+import socket
+import urllib.request
+
+import metrics
+
+
+def test_spans_counters_and_gauges_stream_to_jsonl(tmp_path):
+    recorder = metrics.Metrics()
+    sink = metrics.JsonlSink(tmp_path / "events.jsonl")
+    recorder.add_sink(sink)
+    with recorder.timer("decode", file="a.mp3"):
+        pass
+    recorder.count("files_ok")
+    recorder.gauge("rss_bytes", 1024)
+    recorder.gauge("ignored", None)
+    recorder.remove_sink(sink)
+    recorder.count("files_ok") # Not streamed any more
+    sink.close()
+
+    events = [json.loads(line) for line in (tmp_path / "events.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [event["event"] for event in events] == ["span", "counter", "gauge"]
+    assert events[0]["stage"] == "decode" and events[0]["file"] == "a.mp3"
+    assert events[1] == dict(events[1], name="files_ok", value=1, total=1)
+    assert recorder.snapshot()["counters"] == {"files_ok": 2}
+
+
+def test_a_failing_sink_never_breaks_recording():
+    recorder = metrics.Metrics()
+    recorder.add_sink(lambda event: 1 / 0)
+    recorder.count("files_ok")
+    assert recorder.counters == {"files_ok": 1}
+
+
+def test_file_done_records_timings_and_realtime_factor():
+    recorder = metrics.Metrics()
+    recorder.file_done({"path": "a.mp3", "status": "ok", "duration_seconds": 100.0, "cached": False,
+                        "timings": {"decode": 0.5, "transcribe": 20.0}})
+    recorder.file_done({"path": "b.mp3", "status": "ok", "duration_seconds": 50.0, "cached": True, "timings": {}})
+    recorder.file_done({"path": "c.mp3", "status": "error", "timings": {"decode": 0.1}})
+    snapshot = recorder.snapshot()
+    assert snapshot["counters"] == {"files_ok": 2, "files_failed": 1, "files_cached": 1, "audio_seconds": 150.0,
+                                    "transcribe_seconds": 20.0, "transcribed_audio_seconds": 100.0}
+    assert snapshot["gauges"]["realtime_factor"] == 0.2 # Cached files don't dilute it
+    assert snapshot["stages"]["decode"] == {"count": 2, "seconds": 0.6}
+
+
+def prometheus_sample():
+    recorder = metrics.Metrics()
+    recorder.count("files_ok", 3)
+    recorder.gauge("realtime_factor", 0.25)
+    recorder.span("transcribe", 1.5)
+    return recorder
+
+
+def test_prometheus_text():
+    assert prometheus_sample().prometheus_text().splitlines() == [
+        "# TYPE auto2lrc_files_ok_total counter", "auto2lrc_files_ok_total 3",
+        "# TYPE auto2lrc_realtime_factor gauge", "auto2lrc_realtime_factor 0.25",
+        "# TYPE auto2lrc_stage_seconds summary",
+        'auto2lrc_stage_seconds_sum{stage="transcribe"} 1.5',
+        'auto2lrc_stage_seconds_count{stage="transcribe"} 1',
+    ]
+
+
+def test_prometheus_file_is_written_on_close(tmp_path):
+    exporter = metrics.PrometheusFile(prometheus_sample(), tmp_path / "auto2lrc.prom", interval=60)
+    exporter.close()
+    assert "auto2lrc_files_ok_total 3" in (tmp_path / "auto2lrc.prom").read_text(encoding="utf-8")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_prometheus_server_serves_and_releases_its_port():
+    port = free_port()
+    server = metrics.serve_prometheus(prometheus_sample(), port)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert b"auto2lrc_files_ok_total 3" in response.read()
+    finally:
+        server.close()
+    assert server.socket.fileno() == -1 # Closed, not only stopped
+    metrics.serve_prometheus(prometheus_sample(), port).close() # The port can be served again
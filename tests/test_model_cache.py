@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+
+import model_cache
+
+MB = 1024 * 1024
+
+
+class Tensor:
+    def __init__(self, size):
+        self.size = size
+
+    def numel(self):
+        return self.size
+
+    def element_size(self):
+        return 1
+
+
+class FakeModel:
+    """Looks like a torch module holding `size` bytes."""
+
+    def __init__(self, name, size):
+        self.name = name
+        self._tensors = [Tensor(size)]
+
+    def parameters(self):
+        return self._tensors
+
+    def buffers(self):
+        return []
+
+
+SIZES = {"tiny": 1 * MB, "base": 2 * MB, "small": 3 * MB, "huge": 10 * MB}
+
+
+def manager(budget_mb, loads=None):
+    def loader(name, device, dtype, backend):
+        if loads is not None:
+            loads.append(name)
+        return FakeModel(name, SIZES[name])
+    return model_cache.ModelManager(budget_mb * MB, loader=loader)
+
+
+def names(models) -> list:
+    return [key[0] for key, _ in models.loaded()]
+
+
+def test_models_are_loaded_once_and_evicted_least_recently_used_first():
+    loads = []
+    models = manager(5, loads)
+    assert models.get("tiny", "cpu") is models.get("tiny", "cpu")
+    models.get("base", "cpu")
+    models.get("tiny", "cpu") # Now base is the least recently used
+    models.get("small", "cpu") # 6 MB: over the budget
+    assert names(models) == ["tiny", "small"]
+    assert loads == ["tiny", "base", "small"]
+    assert not models.is_loaded("base", "cpu") and models.is_loaded("small", "cpu")
+
+
+def test_a_model_bigger_than_the_budget_stays_usable():
+    models = manager(5)
+    models.get("tiny", "cpu")
+    models.get("huge", "cpu")
+    assert names(models) == ["huge"]
+    models.set_memory_budget(0)
+    assert names(models) == [] # Nothing to keep once no get() needs it
+
+
+def test_keys_include_device_and_backend():
+    loads = []
+    models = manager(100, loads)
+    models.get("tiny", "cpu")
+    models.get("tiny", "cuda")
+    models.get("tiny", "cpu", backend="faster-whisper")
+    assert loads == ["tiny"] * 3
+    assert models.unload("tiny", "cuda") == 1 and models.unload("tiny", "cuda") == 0
+    assert models.unload() == 2
+
+
+def test_concurrent_gets_share_one_load():
+    loads, started, release = [], threading.Event(), threading.Event()
+
+    def slow_loader(name, device, dtype, backend):
+        loads.append(name)
+        started.set()
+        release.wait(5)
+        return FakeModel(name, SIZES[name])
+
+    models = model_cache.ModelManager(100 * MB, loader=slow_loader)
+    preloaded = models.preload("base", "cpu")
+    assert started.wait(5)
+    results = []
+    getter = threading.Thread(target=lambda: results.append(models.get("base", "cpu")))
+    getter.start()
+    release.set()
+    getter.join(5)
+    assert results == [preloaded.result(5)] and loads == ["base"]
+
+
+def test_failed_load_is_raised_to_every_waiter_and_retried():
+    attempts = []
+
+    def failing_loader(name, device, dtype, backend):
+        attempts.append(name)
+        raise RuntimeError("no such model")
+
+    models = model_cache.ModelManager(100 * MB, loader=failing_loader)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            models.get("tiny", "cpu")
+    assert attempts == ["tiny", "tiny"] and models.loaded() == []
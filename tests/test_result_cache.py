@@ -0,0 +1,61 @@
+import os
+
+import pipeline
+import result_cache
+from decoder import DecodedAudio
+
+RESULT = {"language": "en", "text": "hi", "segments": [
+    {"id": 0, "start": 0.0, "end": 1.0, "text": " hi", "tokens": [1, 2], "avg_logprob": -0.1}]}
+
+
+def test_put_and_get_keep_only_what_the_writers_need(tmp_path):
+    cache = result_cache.ResultCache(tmp_path)
+    key = result_cache.cache_key("hash", "base", "en")
+    assert cache.get(key) is None
+    cache.put(key, RESULT)
+    assert cache.get(key) == {"language": "en", "segments": [{"start": 0.0, "end": 1.0, "text": " hi"}]}
+
+
+def test_key_depends_on_audio_model_language_and_options():
+    key = result_cache.cache_key("hash", "base", None, {"vad": True})
+    assert key == result_cache.cache_key("hash", "base", "auto", {"vad": True}) # None means auto-detect
+    assert len({key, result_cache.cache_key("other", "base", None, {"vad": True}),
+                result_cache.cache_key("hash", "small", None, {"vad": True}),
+                result_cache.cache_key("hash", "base", "en", {"vad": True}),
+                result_cache.cache_key("hash", "base", None)}) == 5
+
+
+def test_corrupt_entries_are_misses(tmp_path):
+    cache = result_cache.ResultCache(tmp_path)
+    key = result_cache.cache_key("hash", "base", "en")
+    cache.put(key, RESULT)
+    path = cache._path(key)
+    path.write_bytes(b"not gzip")
+    assert cache.get(key) is None and not path.exists()
+
+
+def test_least_recently_used_entries_are_evicted_over_the_cap(tmp_path):
+    cache = result_cache.ResultCache(tmp_path)
+    keys = [result_cache.cache_key(f"hash{i}", "base", "en") for i in range(4)]
+    for age, key in enumerate(keys):
+        cache.put(key, RESULT)
+        os.utime(cache._path(key), (1000 + age, 1000 + age)) # Deterministic order: keys[0] oldest
+    cache.get(keys[0]) # A hit makes it the most recently used
+    entry_size = cache._path(keys[1]).stat().st_size
+
+    cache.max_bytes = 2 * entry_size
+    cache.put(keys[1], RESULT) # Rewritten: now newer than keys[2] and keys[3]
+    assert [cache.get(key) is not None for key in keys] == [True, True, False, False]
+    assert cache.clear() == 2 and cache.get(keys[0]) is None
+
+
+def test_lookup_uses_a_result_with_word_timings_for_plain_outputs(tmp_path):
+    cache = result_cache.ResultCache(tmp_path)
+    decoded = DecodedAudio("song.mp3", None, 1.0, "hash", None)
+    words = pipeline.FileSettings("base", "en", formats=("elrc",))
+    key, cached = pipeline.lookup_result(decoded, words, cache)
+    assert cached is None
+    cache.put(key, RESULT)
+
+    assert pipeline.lookup_result(decoded, words._replace(formats=("lrc",)), cache)[1] is not None
+    assert pipeline.lookup_result(decoded, words._replace(model_name="small"), cache)[1] is None
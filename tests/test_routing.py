@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import pytest
+
+import pipeline
+import result_cache
+import routing
+import subtitles
+from decoder import DecodedAudio
+from subtitles import Cue
+
+
+def test_default_routes_send_english_to_the_en_variant():
+    assert routing.default_routes("base") == {"en": "base.en"}
+    assert routing.default_routes("small.en") == {"en": "small.en"}
+    assert routing.default_routes("large-v3") == {} # No English-only large model
+    assert routing.route_model("en", {"en": "base.en"}, "base.en") == "base.en"
+    assert routing.route_model("de", {"en": "base.en"}, "base.en") == "base" # Others get the multilingual size
+
+
+def test_parse_routes():
+    assert routing.parse_routes(" EN=small.en, ja = medium ,") == {"en": "small.en", "ja": "medium"}
+    assert routing.parse_routes(None) == {}
+    for bad in ("en", "=base", "de=base.en"):
+        with pytest.raises(ValueError):
+            routing.parse_routes(bad)
+
+
+def test_routed_settings():
+    settings = pipeline.FileSettings("base.en")
+    auto = pipeline.routed_settings(settings, "ja=medium")
+    assert auto.model_name == "base" and auto.detect_model == routing.DEFAULT_DETECT_MODEL
+    assert dict(auto.routes) == {"en": "base.en", "ja": "medium"} and auto.language_tags
+    assert auto.first_model() == routing.DEFAULT_DETECT_MODEL # What workers load up front
+
+    fixed = pipeline.routed_settings(settings._replace(language="ja"), "ja=medium")
+    assert fixed.model_name == "medium" and fixed.detect_model is None # Routed once, no pre-pass
+    assert fixed.first_model() == "medium"
+    with pytest.raises(ValueError):
+        pipeline.routed_settings(settings, detect_model="tiny.en")
+
+
+def test_route_file_detects_once_and_caches_the_language(tmp_path, monkeypatch):
+    detections = []
+
+    def detect_language(model, audio):
+        detections.append(model)
+        return "ja", 0.9
+
+    monkeypatch.setattr(routing, "detect_language", detect_language)
+    settings = pipeline.routed_settings(pipeline.FileSettings("base"), "ja=medium")
+    decoded = DecodedAudio(Path("song.mp3"), [0.0], 1.0, "hash", None)
+    cache = result_cache.ResultCache(tmp_path)
+
+    for _ in range(2):
+        routed = pipeline.route_file(lambda name: f"model:{name}", decoded, settings, cache)
+        assert (routed.language, routed.model_name, routed.detect_model) == ("ja", "medium", None)
+    assert detections == ["model:tiny"] # The second file was answered from the cache
+    assert pipeline.route_file(None, decoded._replace(audio=None), settings) is settings # Failed decode: untouched
+
+
+def test_language_tags_only_with_routing():
+    cues = [Cue(1.0, 2.0, "hello")]
+    plain = {"language": "en", "language_tags": False}
+    routed = {"language": "en", "language_tags": True}
+    assert subtitles.WRITERS["lrc"].render(cues, plain) == "[00:01.00]hello\n"
+    assert subtitles.WRITERS["lrc"].render(cues, routed) == "[la:en]\n[00:01.00]hello\n"
+    assert subtitles.WRITERS["vtt"].render(cues, plain).startswith("WEBVTT\n\n00:00:01.000")
+    assert subtitles.WRITERS["vtt"].render(cues, routed).startswith("WEBVTT\nLanguage: en\n\n")
+    assert '"language_tags"' not in subtitles.WRITERS["json"].render(cues, routed)
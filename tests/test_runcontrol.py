@@ -0,0 +1,104 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import backends
+import pipeline
+import runcontrol
+from decoder import DecodedAudio
+
+
+def test_cancel_is_seen_by_should_stop_and_check():
+    control = runcontrol.RunControl()
+    assert not control.should_stop() and not control.cancelled
+    control.check()
+    control.cancel()
+    assert control.should_stop() and control.cancelled
+    with pytest.raises(runcontrol.Cancelled):
+        control.check()
+
+
+def test_pause_blocks_workers_until_resumed():
+    control = runcontrol.RunControl()
+    control.pause()
+    assert control.paused
+    answers = []
+    worker = threading.Thread(target=lambda: answers.append(control.should_stop()))
+    worker.start()
+    worker.join(0.2)
+    assert worker.is_alive() and answers == [] # Waiting while paused
+    control.resume()
+    worker.join(5)
+    assert answers == [False] and not control.paused
+
+
+def test_cancel_wakes_a_paused_run():
+    control = runcontrol.RunControl()
+    control.pause()
+    outcome = []
+
+    def work():
+        try:
+            control.check()
+        except runcontrol.Cancelled:
+            outcome.append("cancelled")
+
+    worker = threading.Thread(target=work)
+    worker.start()
+    time.sleep(0.05)
+    control.cancel()
+    worker.join(5)
+    assert outcome == ["cancelled"] and not control.paused
+    control.pause() # A cancelled run can't be paused again
+    assert not control.paused
+
+
+# --- Inside a file ---
+class SegmentBackend:
+    """A backend that yields ten segments, checking for a stop before each (like faster-whisper)."""
+
+    def __init__(self, on_segment=None):
+        self.segments = 0
+        self.on_segment = on_segment or (lambda i: None)
+
+    def transcribe(self, model, audio, language, word_timestamps):
+        segments = []
+        for i in range(10):
+            backends._check_stop()
+            self.on_segment(i)
+            self.segments += 1
+            segments.append({"start": float(i), "end": i + 1.0, "text": f" line {i}"})
+        return {"language": language, "segments": segments}
+
+
+def run(tmp_path, monkeypatch, fake, control):
+    monkeypatch.setitem(backends.BACKENDS, "segments", backends.Backend(
+        "segments", "numpy", None, fake.transcribe, lambda: "cpu", "test", "-"))
+    decoded = DecodedAudio(tmp_path / "song.wav", np.zeros(16000 * 10, np.float32), 10.0, "hash", None)
+    settings = pipeline.FileSettings("fake", "en", backend="segments")
+    entry, error_message = pipeline.run_file(lambda name: object(), decoded.path, settings, decoded=decoded,
+                                             should_stop=control.should_stop)
+    return entry, error_message
+
+
+def test_cancel_stops_in_the_middle_of_a_file(tmp_path, monkeypatch):
+    control = runcontrol.RunControl()
+    fake = SegmentBackend(lambda i: control.cancel() if i == 3 else None)
+    entry, error_message = run(tmp_path, monkeypatch, fake, control)
+    assert entry["status"] == pipeline.STATUS_CANCELLED and error_message is None
+    assert fake.segments == 4
+    assert not (tmp_path / "song.lrc").exists() # Nothing half-written
+
+
+def test_pause_waits_in_the_middle_of_a_file(tmp_path, monkeypatch):
+    control = runcontrol.RunControl()
+    fake = SegmentBackend(lambda i: control.pause() if i == 3 else None)
+    resumer = threading.Timer(0.3, control.resume)
+    resumer.start()
+    started = time.monotonic()
+    entry, _ = run(tmp_path, monkeypatch, fake, control)
+    assert entry["status"] == pipeline.STATUS_OK and fake.segments == 10
+    assert time.monotonic() - started >= 0.25 # Waited for the resume
+    assert (tmp_path / "song.lrc").read_text(encoding="utf-8").count("\n") == 10
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+import scanner
+
+AUDIO = {".mp3", ".flac"}
+
+
+@pytest.fixture
+def library(tmp_path):
+    for rel in ("a.mp3", "a.lrc", "one/b.FLAC", "one/b.words.lrc", "one/two/c.mp3", "one/two/c.srt",
+                "one/two/notes.txt", "three/d.mp3"):
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x")
+    return tmp_path
+
+
+def relative(root, paths):
+    return sorted(path.relative_to(root).as_posix() for path in paths)
+
+
+def test_iter_audio_files_yields_files_missing_outputs(library):
+    assert relative(library, scanner.iter_audio_files(library, AUDIO)) == ["one/b.FLAC", "one/two/c.mp3", "three/d.mp3"]
+    assert relative(library, scanner.iter_audio_files(library, AUDIO, (".lrc", ".srt"))) == [
+        "a.mp3", "one/b.FLAC", "one/two/c.mp3", "three/d.mp3"]
+    assert relative(library, scanner.iter_audio_files(library, AUDIO, (".words.lrc",))) == [
+        "a.mp3", "one/two/c.mp3", "three/d.mp3"]
+
+
+def test_walk_lists_every_directory_once(library):
+    listings = list(scanner.walk(library, AUDIO, threads=3, skip_dir_names={"three"}))
+    assert sorted(listing.rel_dir for listing in listings) == ["", "one", "one/two"]
+    two = next(listing for listing in listings if listing.rel_dir == "one/two")
+    assert [name for name, _, _ in two.audio] == ["c.mp3"]
+    assert two.outputs == {"c.srt"} # notes.txt belongs to no audio file
+
+
+def test_walk_uses_cached_listings(library):
+    calls = []
+
+    def cached_listing(rel_dir, mtime_ns):
+        calls.append(rel_dir)
+        return (["a.mp3", "gone.mp3"], ["a.lrc"], []) if rel_dir == "" else None
+
+    (listing,) = scanner.walk(library, AUDIO, cached_listing=cached_listing)
+    assert calls == [""] and listing.from_cache
+    assert [name for name, _, _ in listing.audio] == ["a.mp3"] # Deleted files are dropped
+
+
+def test_background_scan_hands_items_over_as_they_are_produced():
+    release = threading.Event()
+
+    def candidates(stop_event):
+        yield 1
+        release.wait(5)
+        yield 2
+
+    scan = scanner.BackgroundScan(candidates)
+    assert scan.get(timeout=5) == 1 # Before the generator has finished
+    assert not scan.done
+    release.set()
+    assert list(scan) == [2]
+    assert scan.done and scan.found == 2 and scan.elapsed_seconds is not None
+    with pytest.raises(StopIteration):
+        scan.get(timeout=1)
+
+
+def test_background_scan_reraises_after_the_items_before_the_error():
+    def candidates(stop_event):
+        yield "a"
+        raise OSError("share went away")
+
+    scan = scanner.BackgroundScan(candidates)
+    assert scan.get(timeout=5) == "a"
+    with pytest.raises(OSError):
+        scan.get(timeout=5)
+
+
+def test_background_scan_close_stops_the_generator():
+    closed = threading.Event()
+
+    def candidates(stop_event):
+        try:
+            while not stop_event.is_set():
+                yield 0
+                stop_event.wait(0.01)
+        finally:
+            closed.set()
+
+    scan = scanner.BackgroundScan(candidates)
+    scan.get(timeout=5)
+    scan.close()
+    assert closed.wait(5) and scan.done
@@ -0,0 +1,120 @@
+import pytest
+
+import srt_to_lrc
+import subtitles
+from subtitles import Cue
+
+SRT = (
+    "\ufeff1\r\n00:00:01,000 --> 00:00:02,500\r\nFirst line\r\nsecond line\r\n\r\n"
+    "2\r\n00:01:02,345 --> 00:01:03,000\r\nNo blank line after this block\r\n"
+    "3\r\nnot a time line\r\nskipped\r\n\r\n"
+    "4\r\n00:00:05,000 --> 00:00:04,000\r\nends before it starts\r\n\r\n"
+    "5\r\n00:00:06,000 --> 00:00:07,000\r\n\r\n"
+    "00:00:08.5 --> 00:00:09,000\r\nno index, dot and short milliseconds\r\n"
+)
+
+
+def test_iter_srt_skips_and_reports_malformed_blocks():
+    errors = []
+    cues = list(subtitles.iter_srt(SRT.splitlines(keepends=True), errors))
+    assert cues == [
+        Cue(1.0, 2.5, "First line\nsecond line"),
+        Cue(62.345, 63.0, "No blank line after this block\n3\nnot a time line\nskipped"),
+        Cue(8.5, 9.0, "no index, dot and short milliseconds"),
+    ]
+    assert [issue.message.split(":")[0] for issue in errors] == ["end before start"]
+    assert errors[0].line == 13
+
+
+def test_malformed_first_block_is_reported_with_its_line():
+    errors = []
+    assert subtitles.parse_srt("1\ngarbage\ntext\n\n2\n00:00:01,000 --> 00:00:02,000\nok\n", errors) == [
+        Cue(1.0, 2.0, "ok")]
+    assert errors[0].line == 1 and errors[0].message.startswith("no valid time line")
+
+
+@pytest.mark.parametrize("srt_time, lrc_time", [
+    ("00:00:00,000", "00:00.00"),
+    ("00:00:01,004", "00:01.00"),
+    ("00:00:01,005", "00:01.01"), # Hundredths round half up
+    ("00:00:59,995", "01:00.00"), # ... carrying into the minutes
+    ("01:02:03,456", "62:03.46"), # Hours fold into the minutes
+])
+def test_srt_to_lrc_time_rounding(srt_time, lrc_time):
+    assert srt_to_lrc.convert_srt_time_to_lrc(srt_time) == lrc_time
+
+
+def test_srt_to_lrc_time_rejects_garbage():
+    with pytest.raises(ValueError):
+        srt_to_lrc.convert_srt_time_to_lrc("1:2:3")
+
+
+def test_lrc_and_srt_times_agree():
+    for seconds in (0.0049, 0.005, 1.2345, 59.9951, 3599.999):
+        lrc = subtitles.format_lrc_time(seconds)
+        via_srt = srt_to_lrc.convert_srt_time_to_lrc(subtitles.format_srt_time(seconds))
+        assert lrc == via_srt
+
+
+def test_convert_file_round_trip(tmp_path):
+    srt = tmp_path / "song.srt"
+    srt.write_bytes(SRT.encode("utf-8"))
+    issues = []
+    assert srt_to_lrc.convert_file(srt, tmp_path / "song.lrc", issues) == 3
+    assert (tmp_path / "song.lrc").read_text(encoding="utf-8").splitlines() == [
+        "[00:01.00]First line second line",
+        "[01:02.35]No blank line after this block 3 not a time line skipped",
+        "[00:08.50]no index, dot and short milliseconds",
+    ]
+    assert len(issues) == 1
+
+
+def test_convert_file_with_only_malformed_blocks_fails(tmp_path):
+    srt = tmp_path / "bad.srt"
+    srt.write_text("1\nnonsense\ntext\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        srt_to_lrc.convert_file(srt, tmp_path / "bad.lrc")
+    assert not (tmp_path / "bad.lrc").exists()
+
+
+
+def test_srt_to_lrc_replaces_the_srt(tmp_path):
+    srt = tmp_path / "song.srt"
+    srt.write_text("1\n00:00:01,000 --> 00:00:02,000\nhi\n", encoding="utf-8")
+    assert srt_to_lrc.srt_to_lrc(srt) == tmp_path / "song.lrc"
+    assert not srt.exists() and (tmp_path / "song.lrc").read_text(encoding="utf-8") == "[00:01.00]hi\n"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_convert_directory_mirrors_the_tree(tmp_path, monkeypatch, workers):
+    monkeypatch.setattr(srt_to_lrc, "BULK_CHUNKSIZE", 1) # Use the process pool with a handful of files
+    source, target = tmp_path / "srt", tmp_path / "lrc"
+    for rel in ("a.srt", "x/b.SRT", "x/y/c.srt", "x/done.srt"):
+        (source / rel).parent.mkdir(parents=True, exist_ok=True)
+        (source / rel).write_text("1\n00:00:01,000 --> 00:00:02,000\nhi\n", encoding="utf-8")
+    (source / "x" / "bad.srt").write_text("1\nnonsense\ntext\n", encoding="utf-8")
+    (target / "x").mkdir(parents=True)
+    (target / "x" / "done.lrc").write_text("kept", encoding="utf-8")
+
+    seen = []
+    summary = srt_to_lrc.convert_directory(source, target, workers=workers,
+                                           on_file=lambda relative, error, lines, issues: seen.append(relative.as_posix()))
+    assert summary == {"total": 5, "converted": 3, "skipped": 1, "failed": 1, "lines": 3, "malformed_blocks": 1}
+    assert sorted(seen) == ["a.srt", "x/b.SRT", "x/bad.srt", "x/y/c.srt"]
+    assert sorted(p.relative_to(target).as_posix() for p in target.rglob("*.lrc")) == [
+        "a.lrc", "x/b.lrc", "x/done.lrc", "x/y/c.lrc"]
+    assert (target / "x" / "done.lrc").read_text(encoding="utf-8") == "kept"
+    assert (source / "a.srt").exists() # Sources are kept
+
+
+def test_non_utf8_file_is_reported_and_kept(tmp_path):
+    srt = tmp_path / "latin1.srt"
+    srt.write_bytes("1\n00:00:01,000 --> 00:00:02,000\nok\n\n2\n00:00:03,000 --> 00:00:04,000\ncaf\xe9\n".encode("latin-1"))
+    issues = []
+    with pytest.raises(ValueError):
+        srt_to_lrc.convert_file(srt, tmp_path / "latin1.lrc", issues)
+    assert issues[0].line == 7 and "UTF-8" in issues[0].message
+    assert not (tmp_path / "latin1.lrc").exists()
+
+    assert srt_to_lrc.srt_to_lrc(srt) is None
+    assert srt.exists() # Not deleted
@@ -0,0 +1,68 @@
+import pytest
+
+import subtitles
+from subtitles import Cue, Word
+
+
+def test_cues_from_segments_strips_text_and_keeps_words():
+    segments = [{"start": 1.0, "end": 2.0, "text": " Hello there ",
+                 "words": [{"start": 1.0, "end": 1.4, "word": " Hello"}, {"start": 1.5, "end": 2.0, "word": " there"}]},
+                {"start": 3.0, "end": 4.0, "text": "No words"}]
+    assert subtitles.cues_from_segments(segments) == [
+        Cue(1.0, 2.0, "Hello there", (Word(1.0, 1.4, " Hello"), Word(1.5, 2.0, " there"))),
+        Cue(3.0, 4.0, "No words"),
+    ]
+
+
+@pytest.mark.parametrize("seconds, lrc_time", [
+    (0.0, "00:00.00"),
+    (1.004, "00:01.00"),
+    (1.005, "00:01.01"), # Hundredths round half up
+    (59.995, "01:00.00"), # ... carrying into the minutes
+    (3723.456, "62:03.46"), # Hours fold into the minutes
+])
+def test_format_lrc_time(seconds, lrc_time):
+    assert subtitles.format_lrc_time(seconds) == lrc_time
+
+
+def test_format_lrc_joins_lines_and_drops_empty_cues():
+    cues = [Cue(1.0, 2.0, "a\nb"), Cue(3.0, 4.0, "  "), Cue(5.5, 6.0, "c")]
+    assert subtitles.format_lrc(cues) == "[00:01.00]a b\n[00:05.50]c\n"
+
+
+def test_write_atomic_replaces_without_leaving_temp_files(tmp_path):
+    target = tmp_path / "song.lrc"
+    target.write_text("old", encoding="utf-8")
+    subtitles.write_atomic(target, "[00:01.00]ü\n")
+    assert target.read_text(encoding="utf-8") == "[00:01.00]ü\n"
+    assert [path.name for path in tmp_path.iterdir()] == ["song.lrc"]
+
+
+CUES = [Cue(1.0, 2.5, "Hello there", (Word(1.0, 1.4, " Hello"), Word(1.5, 2.5, " there"))), Cue(3.0, 4.0, "Bye")]
+
+
+def test_every_writer_renders_the_same_cues():
+    assert subtitles.format_srt(CUES) == "1\n00:00:01,000 --> 00:00:02,500\nHello there\n\n2\n00:00:03,000 --> 00:00:04,000\nBye\n\n"
+    assert subtitles.format_vtt(CUES) == "WEBVTT\n\n00:00:01.000 --> 00:00:02.500\nHello there\n\n00:00:03.000 --> 00:00:04.000\nBye\n\n"
+    assert subtitles.format_enhanced_lrc(CUES) == "[00:01.00]<00:01.00>Hello <00:01.50>there<00:02.50>\n[00:03.00]Bye\n"
+    assert '"text": "Hello"' in subtitles.format_json(CUES, {"language": "en"})
+
+
+def test_enhanced_lrc_keeps_unspaced_words_together():
+    cue = Cue(0.0, 1.0, "你好", (Word(0.0, 0.5, "你"), Word(0.5, 1.0, "好")))
+    assert subtitles.format_enhanced_lrc([cue]) == "[00:00.00]<00:00.00>你<00:00.50>好<00:01.00>\n"
+
+
+def test_parse_formats():
+    assert subtitles.parse_formats("LRC, srt,lrc") == ("lrc", "srt")
+    assert subtitles.output_suffixes(("lrc", "elrc")) == (".lrc", ".words.lrc")
+    assert subtitles.needs_word_timestamps(("srt", "elrc")) and not subtitles.needs_word_timestamps(("srt",))
+    for bad in ("lrc,ass", " , "):
+        with pytest.raises(ValueError):
+            subtitles.parse_formats(bad)
+
+
+def test_write_outputs_writes_each_format_next_to_the_audio(tmp_path):
+    written = subtitles.write_outputs(tmp_path / "song.mp3", CUES, ("lrc", "elrc", "srt"))
+    assert [path.name for path in written] == ["song.lrc", "song.words.lrc", "song.srt"]
+    assert (tmp_path / "song.lrc").read_text(encoding="utf-8") == "[00:01.00]Hello there\n[00:03.00]Bye\n"
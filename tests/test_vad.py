@@ -0,0 +1,68 @@
+import numpy as np
+
+import vad
+
+SR = vad.SAMPLE_RATE
+
+
+def tone(seconds, amplitude=0.3, frequency=440.0):
+    t = np.arange(int(seconds * SR)) / SR
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def test_silence_has_no_regions():
+    audio = np.zeros(5 * SR, dtype=np.float32)
+    assert vad.speech_regions(audio) == []
+    assert not vad.use_regions([], len(audio))
+
+
+def test_continuous_tone_is_one_region():
+    audio = tone(20)
+    assert vad.speech_regions(audio) == [(0, len(audio))]
+
+
+def test_vocals_over_bed_are_kept():
+    rng = np.random.default_rng(0)
+    audio = (0.05 * rng.standard_normal(20 * SR)).astype(np.float32)
+    for start in range(0, 20, 4): # Vocals 8 dB over the bed, half of the time
+        audio[start * SR:(start + 2) * SR] += tone(2, 0.05 * 10 ** (8 / 20), 300.0)
+    regions = vad.speech_regions(audio)
+    assert vad.coverage(regions, len(audio)) > 0.9
+    assert vad.use_regions(regions, len(audio))
+
+
+def test_speech_between_silence_is_padded():
+    rng = np.random.default_rng(0)
+    audio = (1e-4 * rng.standard_normal(20 * SR)).astype(np.float32)
+    audio[5 * SR:7 * SR] += tone(2, 0.2, 200.0)
+    [(start, end)] = vad.speech_regions(audio)
+    pad = SR * vad.VadOptions().pad_ms // 1000
+    assert abs(start - (5 * SR - pad)) < SR // 10
+    assert abs(end - (7 * SR + pad)) < SR // 10
+
+
+def test_short_gaps_are_bridged():
+    audio = np.zeros(10 * SR, dtype=np.float32)
+    audio[2 * SR:4 * SR] = tone(2)
+    audio[4 * SR + SR // 2:6 * SR] = tone(1.5) # 0.5 s gap < min_silence_ms
+    assert len(vad.speech_regions(audio)) == 1
+
+
+def test_tiny_coverage_falls_back_to_whole_file():
+    audio = np.zeros(60 * SR, dtype=np.float32)
+    audio[10 * SR:10 * SR + SR // 2] = tone(0.5)
+    regions = vad.speech_regions(audio)
+    assert regions and not vad.use_regions(regions, len(audio))
+
+
+def test_time_map_round_trip():
+    audio = np.arange(10 * SR, dtype=np.float32)
+    regions = [(SR, 2 * SR), (5 * SR, 7 * SR)]
+    compacted, time_map = vad.compact(audio, regions)
+    assert len(compacted) == 3 * SR
+    assert time_map(0.5) == 1.5
+    assert time_map(1.5) == 5.5
+    result = time_map.remap_result({"segments": [{"start": 0.0, "end": 2.0, "words": [{"start": 1.0, "end": 1.25}]}]})
+    segment = result["segments"][0]
+    assert (segment["start"], segment["end"]) == (1.0, 6.0)
+    assert (segment["words"][0]["start"], segment["words"][0]["end"]) == (5.0, 5.25)
@@ -0,0 +1,79 @@
+import os
+import time
+
+import model_cache
+import pipeline
+import watcher
+
+
+def test_debouncer_waits_for_a_file_to_settle(tmp_path):
+    path = tmp_path / "song.mp3"
+    path.write_bytes(b"a")
+    debouncer = watcher.Debouncer(settle_seconds=0.1)
+    debouncer.add(path)
+    assert debouncer.settled(10) == [] # First look records the size and mtime
+    time.sleep(0.15)
+    path.write_bytes(b"ab") # Still being written
+    assert debouncer.settled(10) == []
+    time.sleep(0.15)
+    assert debouncer.settled(10) == [path]
+    assert len(debouncer) == 0
+
+
+def test_debouncer_drops_vanished_files_and_limits_the_batch(tmp_path):
+    debouncer = watcher.Debouncer(settle_seconds=0)
+    paths = [tmp_path / f"{i}.mp3" for i in range(3)]
+    for path in paths:
+        path.write_bytes(b"a")
+        debouncer.add(path)
+    debouncer.settled(10)
+    os.remove(paths[1])
+    assert debouncer.settled(0) == []
+    assert debouncer.settled(1) == [paths[0]]
+    assert debouncer.settled(10) == [paths[2]]
+    assert len(debouncer) == 0
+
+
+def test_debouncer_overflow_asks_for_a_rescan(tmp_path):
+    debouncer = watcher.Debouncer(max_paths=2)
+    for i in range(3):
+        debouncer.add(tmp_path / f"{i}.mp3")
+    assert len(debouncer) == 2 and debouncer.overflowed
+
+
+# --- Idle unload ---
+def watch(tmp_path, monkeypatch, seconds):
+    """Runs watch_folder on tmp_path with a stub run_file; stops after `seconds` or on the first unload."""
+    manager = model_cache.ModelManager(loader=lambda *key: object())
+    monkeypatch.setattr(model_cache, "default_manager", manager)
+    monkeypatch.setattr(watcher, "LOOP_SECONDS", 0.01)
+    processed = []
+
+    def run_file(get_model, audio_file, settings, cache=None, **kwargs):
+        get_model(settings.model_name)
+        processed.append(audio_file.name)
+        return {"path": str(audio_file), "status": pipeline.STATUS_OK, "outputs": [], "error": None}, None
+
+    monkeypatch.setattr(pipeline, "run_file", run_file)
+    messages = []
+    deadline = time.monotonic() + seconds
+    summary = watcher.watch_folder(
+        tmp_path, "tiny", "en", use_cache=False, use_manifest=False, use_watchdog=False, settle_seconds=0,
+        poll_seconds=0.05, idle_unload_seconds=0.1, on_progress=lambda message, percent: messages.append(message),
+        should_stop=lambda: time.monotonic() > deadline or any(m.startswith("Unloaded") for m in messages))
+    assert summary["status"] == pipeline.RUN_FINISHED, summary["error"]
+    return summary, processed, manager
+
+
+def test_the_warm_model_stays_loaded_until_a_file_was_processed(tmp_path, monkeypatch):
+    summary, processed, manager = watch(tmp_path, monkeypatch, seconds=0.5)
+    assert processed == [] and summary["model_unloads"] == 0
+    assert manager.is_loaded("tiny")
+
+
+def test_the_model_is_unloaded_once_idle_after_work(tmp_path, monkeypatch):
+    (tmp_path / "song.mp3").write_bytes(b"a")
+    summary, processed, manager = watch(tmp_path, monkeypatch, seconds=5)
+    assert processed == ["song.mp3"] and summary["succeeded"] == 1
+    assert summary["model_unloads"] == 1
+    assert not manager.is_loaded("tiny")
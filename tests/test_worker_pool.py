@@ -0,0 +1,69 @@
+import threading
+import time
+from pathlib import Path
+
+import worker_pool
+
+DURATIONS = {"short.mp3": 30.0, "long.mp3": 600.0, "broken.mp3": None, "medium.mp3": 200.0, "same.mp3": 200.0}
+
+
+def probe(path):
+    return DURATIONS[Path(path).name]
+
+
+def wait_for_probes(candidates, count):
+    while len(candidates.durations) < count: # Every probe done before popping
+        time.sleep(0.01)
+
+
+def drain(candidates) -> list:
+    popped = []
+    while candidates.wait(timeout=5):
+        popped.append(candidates.pop().name)
+    return popped
+
+
+def test_longest_first_with_unknown_durations_last(monkeypatch):
+    monkeypatch.setattr(worker_pool, "probe_duration", probe)
+    candidates = worker_pool.LongestFirstQueue(Path(name) for name in DURATIONS)
+    wait_for_probes(candidates, len(DURATIONS))
+    try:
+        assert drain(candidates) == ["long.mp3", "medium.mp3", "same.mp3", "short.mp3", "broken.mp3"]
+        assert candidates.exhausted and candidates.pop() is None
+        assert candidates.durations[Path("broken.mp3")] is None
+    finally:
+        candidates.close()
+
+
+def test_files_found_later_are_ordered_among_the_rest(monkeypatch):
+    monkeypatch.setattr(worker_pool, "probe_duration", probe)
+    more = threading.Event()
+
+    def files():
+        yield Path("short.mp3")
+        more.wait(5)
+        yield Path("long.mp3")
+        yield Path("medium.mp3")
+
+    candidates = worker_pool.LongestFirstQueue(files())
+    try:
+        assert candidates.wait(timeout=5) and candidates.pop().name == "short.mp3" # Handed out before the scan ends
+        assert not candidates.exhausted
+        more.set()
+        wait_for_probes(candidates, 3)
+        assert drain(candidates) == ["long.mp3", "medium.mp3"]
+        assert candidates.exhausted
+    finally:
+        candidates.close()
+
+
+def test_duration_regex_reads_ffmpeg_header():
+    stderr = "Input #0, mp3, from 'a.mp3':\n  Duration: 01:02:03.45, start: 0.025057, bitrate: 320 kb/s\n"
+    h, m, s = worker_pool.DURATION_REGEX.search(stderr).groups()
+    assert int(h) * 3600 + int(m) * 60 + float(s) == 3723.45
+
+
+def test_default_threads_splits_the_cores(monkeypatch):
+    monkeypatch.setattr(worker_pool.os, "cpu_count", lambda: 8)
+    assert worker_pool.default_threads(3) == 2
+    assert worker_pool.default_threads(16) == 1
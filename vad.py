@@ -0,0 +1,131 @@
+"""
+Energy-based voice activity detection on 16 kHz mono PCM.
+
+speech_regions() finds the parts of a file that are not (near) silence, using
+frame RMS with a hysteresis threshold, compact() glues them together so Whisper
+only sees those parts in one transcribe() call, and TimeMap maps the timestamps
+of that result back to the original timeline. This mostly saves work on silence
+and quiet intros/outros and keeps Whisper from hallucinating lines there. Energy
+alone can't tell vocals from instruments, so steady or dense audio (music beds,
+sung vocals) is kept as a whole, and when the regions cover less than
+min_coverage of the file it should be transcribed without VAD (see use_regions()).
+"""
+import bisect
+from typing import NamedTuple
+
+import numpy as np
+
+from decoder import SAMPLE_RATE
+
+
+class VadOptions(NamedTuple):
+    frame_ms: int = 30
+    threshold_db: float = -45.0 # Frames quieter than this (dBFS) are never speech
+    margin_db: float = 12.0 # A region starts this far above the noise floor (10th percentile) ...
+    headroom_db: float = 12.0 # ... or this far below the loud level (90th percentile), whichever is lower
+    hysteresis_db: float = 6.0 # ... and goes on while frames stay within this of the start level
+    min_speech_ms: int = 250 # Shorter bursts are dropped
+    min_silence_ms: int = 1000 # Shorter gaps don't split a region
+    pad_ms: int = 300 # Kept around each region so word onsets aren't cut
+    min_coverage: float = 0.05 # Regions covering less of the file than this are not trusted
+
+
+def speech_regions(audio: np.ndarray, options: VadOptions = VadOptions(), sample_rate: int = SAMPLE_RATE) -> list:
+    """
+    Regions of audio that likely contain speech or singing.
+
+    Returns:
+        list: (start, end) sample offsets, sorted and non-overlapping.
+    """
+    frame = max(1, sample_rate * options.frame_ms // 1000)
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return []
+    frames = audio[:n_frames * frame].astype(np.float32, copy=False).reshape(n_frames, frame)
+    rms_db = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    floor, loud = (float(level) for level in np.percentile(rms_db, (10, 90)))
+    # Capped relative to the loud level, so audio that never rises far above its own floor
+    # (a continuous tone, vocals over a music bed) still counts as active
+    start_db = max(options.threshold_db, min(floor + options.margin_db, loud - options.headroom_db))
+    stop_db = max(options.threshold_db, start_db - options.hysteresis_db)
+
+    # Runs above stop_db that reach start_db somewhere -> regions, bridging short gaps
+    min_gap = options.min_silence_ms // options.frame_ms
+    regions = []
+    run_start, triggered = None, False
+    for index, level in enumerate(rms_db.tolist() + [float("-inf")]):
+        if level > stop_db:
+            if run_start is None:
+                run_start, triggered = index, False
+            triggered = triggered or level > start_db
+            continue
+        if run_start is not None and triggered:
+            if regions and run_start - regions[-1][1] <= min_gap:
+                regions[-1][1] = index
+            else:
+                regions.append([run_start, index])
+        run_start = None
+
+    min_frames = max(1, options.min_speech_ms // options.frame_ms)
+    pad = sample_rate * options.pad_ms // 1000
+    padded = []
+    for start, end in regions:
+        if end - start < min_frames:
+            continue
+        start, end = max(0, start * frame - pad), min(len(audio), end * frame + pad)
+        if padded and start <= padded[-1][1]:
+            padded[-1] = (padded[-1][0], end) # Padding made them touch
+        else:
+            padded.append((start, end))
+    return padded
+
+
+def coverage(regions, n_samples: int) -> float:
+    """Fraction of n_samples covered by the regions."""
+    return sum(end - start for start, end in regions) / n_samples if n_samples else 0.0
+
+
+def use_regions(regions, n_samples: int, options: VadOptions = VadOptions()) -> bool:
+    """
+    True if the regions should be transcribed instead of the whole file: no regions or
+    a tiny share of the file usually means the threshold missed, and transcribing
+    the whole file is cheaper than losing its lyrics.
+    """
+    return bool(regions) and coverage(regions, n_samples) >= options.min_coverage
+
+
+class TimeMap:
+    """Maps times in compacted audio (see compact()) back to the original file."""
+
+    def __init__(self, regions, sample_rate: int = SAMPLE_RATE):
+        self._compact_starts = []
+        self._original = [] # (start, end) in seconds
+        position = 0
+        for start, end in regions:
+            self._compact_starts.append(position / sample_rate)
+            self._original.append((start / sample_rate, end / sample_rate))
+            position += end - start
+
+    def __call__(self, seconds: float) -> float:
+        i = max(0, bisect.bisect_right(self._compact_starts, seconds) - 1)
+        start, end = self._original[i]
+        return min(end, start + max(0.0, seconds - self._compact_starts[i]))
+
+    def remap_result(self, result: dict) -> dict:
+        """Rewrites segment and word timestamps of a Whisper result in place and returns it."""
+        for segment in result["segments"]:
+            segment["start"], segment["end"] = self(segment["start"]), self(segment["end"])
+            for word in segment.get("words") or ():
+                word["start"], word["end"] = self(word["start"]), self(word["end"])
+        return result
+
+
+def compact(audio: np.ndarray, regions) -> tuple:
+    """
+    Concatenates the regions of audio.
+
+    Returns:
+        tuple: (compacted float32 audio, TimeMap back to the original timeline)
+    """
+    compacted = np.concatenate([audio[start:end] for start, end in regions]).astype(np.float32, copy=False)
+    return compacted, TimeMap(regions)
@@ -0,0 +1,374 @@
+"""
+Watch mode: keep running and transcribe audio files as they are added to a library or changed.
+
+Filesystem events come from watchdog (inotify, FSEvents, ReadDirectoryChangesW)
+when it is installed (pip install watchdog) and from a polling rescan otherwise
+(scanner.walk with the previous listings, so unchanged directories aren't read
+again); network shares often need polling. A reported file is only queued once
+its size and mtime have stayed the same for settle_seconds, so recordings that
+are still being written or copied aren't picked up half-way, and only if the
+manifest says it is new or changed. The model is loaded up front, stays loaded
+between files and is unloaded after idle_unload_seconds without work (then
+preloaded again as soon as the next file shows up).
+
+Backpressure: at most max_queued files wait for transcription and further
+files wait in the debouncer, one entry per path however many events it gets.
+Past MAX_PENDING_PATHS paths new events are dropped, and the library is rescanned
+once the backlog has drained (like an inotify queue overflow).
+"""
+import importlib.util
+import os
+import threading
+import time
+import traceback
+from collections import deque
+from pathlib import Path
+
+import backends
+import manifest
+import metrics
+import model_cache
+import pipeline
+import result_cache
+import routing
+import scanner
+import subtitles
+
+DEFAULT_SETTLE_SECONDS = 2.0 # Size and mtime unchanged this long = the file is complete
+DEFAULT_POLL_SECONDS = 5.0 # Rescan interval without watchdog
+DEFAULT_IDLE_UNLOAD_SECONDS = 300.0 # Unload the model after this long without work (0 = keep it)
+DEFAULT_MAX_QUEUED = 16 # Settled files waiting for transcription
+MAX_PENDING_PATHS = 10000 # Files waiting to settle; more events are dropped and a rescan is done
+LOOP_SECONDS = 0.5 # How often settling files are checked while nothing is being transcribed
+
+
+def watchdog_available() -> bool:
+    """watchdog is installed (checked without importing it)."""
+    try:
+        return importlib.util.find_spec("watchdog") is not None
+    except (ImportError, ValueError):
+        return False
+
+
+# --- Event Sources ---
+class PollingSource:
+    """Rescans the library every poll_seconds and reports audio files that are new or changed since the last scan."""
+
+    name = "polling"
+
+    def __init__(self, root: Path, on_path, poll_seconds: float = DEFAULT_POLL_SECONDS,
+                 threads: int = scanner.DEFAULT_SCAN_THREADS):
+        self.root = root
+        self.on_path = on_path
+        self.poll_seconds = poll_seconds
+        self.threads = threads
+        self._listings = {} # rel_dir -> (mtime_ns, audio names, output names, subdir names)
+        self._seen = {} # path -> (size, mtime_ns)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="watch-poll", daemon=True)
+        self._thread.start()
+
+    def _cached_listing(self, rel_dir, mtime_ns):
+        cached = self._listings.get(rel_dir)
+        return cached[1:] if cached and cached[0] == mtime_ns else None
+
+    def _scan(self, report: bool):
+        listings, seen = {}, {}
+        for listing in scanner.walk(self.root, pipeline.AUDIO_EXTENSIONS, self.threads,
+                                    cached_listing=self._cached_listing,
+                                    skip_dir_names=(manifest.MANIFEST_DIR_NAME,), stop_event=self._stop):
+            listings[listing.rel_dir] = (listing.mtime_ns, [name for name, _, _ in listing.audio],
+                                         listing.outputs, listing.subdirs)
+            for name, size, mtime_ns in listing.audio:
+                path = self.root / listing.rel_dir / name
+                seen[path] = (size, mtime_ns)
+                if report and self._seen.get(path) != (size, mtime_ns):
+                    self.on_path(path)
+        if not self._stop.is_set():
+            self._listings, self._seen = listings, seen
+
+    def _run(self):
+        report = False # The first scan is the baseline; files already there are left to the catch-up scan
+        while not self._stop.is_set():
+            try:
+                self._scan(report)
+                report = True
+            except OSError:
+                pass # Library unmounted for a moment; try again next time
+            self._stop.wait(self.poll_seconds)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+
+class WatchdogSource:
+    """Reports audio files created, modified or moved into the library, from watchdog's observer thread."""
+
+    name = "watchdog"
+
+    def __init__(self, root: Path, on_path, on_rescan):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.event_type not in ("created", "modified", "moved", "closed"):
+                    return
+                path = Path(os.fsdecode(getattr(event, "dest_path", "") or event.src_path))
+                if manifest.MANIFEST_DIR_NAME in path.parts:
+                    return
+                if event.is_directory:
+                    if event.event_type in ("created", "moved"):
+                        on_rescan() # A folder moved in arrives as one event, without events for its files
+                elif path.suffix.lower() in pipeline.AUDIO_EXTENSIONS:
+                    on_path(path)
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), str(root), recursive=True)
+        self._observer.daemon = True
+        self._observer.start()
+
+    def close(self):
+        self._observer.stop()
+        self._observer.join(timeout=5)
+
+
+# --- Debouncing ---
+class Debouncer:
+    """Reported files wait here until their size and mtime stop changing (thread-safe)."""
+
+    def __init__(self, settle_seconds: float = DEFAULT_SETTLE_SECONDS, max_paths: int = MAX_PENDING_PATHS):
+        self.settle_seconds = settle_seconds
+        self.max_paths = max_paths
+        self.overflowed = False # Events were dropped; the library needs a rescan
+        self._pending = {} # path -> ((size, mtime_ns) or None, monotonic time of the last change)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def add(self, path):
+        with self._lock:
+            if path in self._pending:
+                self._pending[path] = (self._pending[path][0], time.monotonic()) # Written to again
+            elif len(self._pending) < self.max_paths:
+                self._pending[path] = (None, time.monotonic())
+            else:
+                self.overflowed = True
+
+    def settled(self, limit: int) -> list:
+        """Up to limit files, oldest first, that haven't changed for settle_seconds (files that vanished are dropped)."""
+        ready = []
+        if limit <= 0:
+            return ready
+        with self._lock:
+            items = list(self._pending.items())
+        now = time.monotonic()
+        for path, (stat_key, changed) in items:
+            try:
+                st = os.stat(path)
+                current = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                current = None
+            with self._lock:
+                if current is None:
+                    self._pending.pop(path, None)
+                elif current != stat_key:
+                    self._pending[path] = (current, now)
+                elif now - changed >= self.settle_seconds and self._pending.get(path, (None, now))[1] == changed:
+                    del self._pending[path]
+                    ready.append(path)
+                    if len(ready) >= limit:
+                        break
+        return ready
+
+
+# --- Watch Loop ---
+def watch_folder(folder_path, model_name: str = "base", language="auto", *, backend: str = backends.DEFAULT_BACKEND,
+                 formats=subtitles.DEFAULT_FORMATS, use_cache: bool = True, cache_dir=None, vad: bool = False,
+                 chunk_seconds=None, route_languages: bool = False, routes=None,
+                 detect_model: str = routing.DEFAULT_DETECT_MODEL, threads=None, keep_model: bool = True,
+                 use_manifest: bool = True, manifest_path=None, requeue_weaker: bool = False, hash_files: bool = False, catch_up: bool = True,
+                 settle_seconds: float = DEFAULT_SETTLE_SECONDS, poll_seconds: float = DEFAULT_POLL_SECONDS,
+                 use_watchdog: bool = True, idle_unload_seconds: float = DEFAULT_IDLE_UNLOAD_SECONDS,
+                 max_queued: int = DEFAULT_MAX_QUEUED, scan_threads: int = scanner.DEFAULT_SCAN_THREADS,
+                 on_progress=None, on_error=None, on_file=None, should_stop=None, control=None) -> dict:
+    """
+    Watches folder_path and transcribes new or changed audio files until should_stop()
+    returns True (or control is cancelled). The arguments shared with
+    pipeline.transcribe_folder() mean the same; one process, one warm model.
+
+    Args:
+        catch_up (bool): First queue the files that are already missing outputs (found by an
+            incremental manifest scan, fed in as fast as they are transcribed).
+        settle_seconds (float): A file is queued once its size and mtime stayed the same this long.
+        poll_seconds (float): Rescan interval when polling.
+        use_watchdog (bool): Use filesystem events if watchdog is installed; False always polls.
+        idle_unload_seconds (float): Unload the model(s) this long after the last processed file; 0 keeps them.
+        max_queued (int): Settled files waiting for transcription (see the module docstring).
+
+    Returns:
+        dict: Summary with status, watcher ('watchdog' or 'polling'), succeeded, failed, cached,
+            ignored (reported but already done), rescans, model_unloads, elapsed_seconds and error.
+    """
+    root = Path(folder_path).resolve()
+    language = pipeline.normalize_language(language)
+    on_progress = on_progress or (lambda message, percent: None)
+    on_error = on_error or (lambda message: None)
+    on_file = on_file or (lambda entry: None)
+    if control is not None:
+        should_stop = control.should_stop
+    should_stop = should_stop or (lambda: False)
+    max_queued = max(1, max_queued)
+
+    started = time.monotonic()
+    summary = {"status": pipeline.RUN_FINISHED, "folder": str(root), "model": model_name, "backend": backend,
+               "language": language or "auto", "watcher": None, "succeeded": 0, "failed": 0, "cached": 0,
+               "ignored": 0, "rescans": 0, "model_unloads": 0, "elapsed_seconds": 0.0, "error": None}
+    index = None
+    source = None
+    rescan = None
+    scan_stop = threading.Event()
+    settings = None
+    models = {} # Model name -> model, while loaded
+    in_use = set() # Names of the models preloaded or loaded for this watch (unloaded together when idle)
+    try:
+        settings = pipeline.build_settings(model_name, language, backend=backend, formats=formats, vad=vad,
+                                           chunk_seconds=chunk_seconds, route_languages=route_languages,
+                                           routes=routes, detect_model=detect_model)
+        suffixes = subtitles.output_suffixes(settings.formats)
+        cache = result_cache.ResultCache(cache_dir or pipeline.default_result_cache_dir()) if use_cache else None
+        if use_manifest:
+            try:
+                index = manifest.Manifest(manifest_path or manifest.default_manifest_path(root, pipeline.user_cache_dir()),
+                                          root, pipeline.AUDIO_EXTENSIONS, suffixes)
+            except Exception as e:
+                on_error(f"Warning: Could not open the manifest, checking for existing output files instead: {e}")
+
+        def needs_processing(path) -> bool:
+            if index:
+                return index.needs_processing(path, model_name, requeue_weaker, hash_files)
+            return path.is_file() and not all(path.with_name(path.stem + suffix).exists() for suffix in suffixes)
+
+        def start_rescan():
+            if index:
+                return index.iter_scan(model_name, requeue_weaker=requeue_weaker, hash_files=hash_files,
+                                       threads=scan_threads, stop_event=scan_stop)
+            return scanner.iter_audio_files(root, pipeline.AUDIO_EXTENSIONS, suffixes, threads=scan_threads,
+                                            stop_event=scan_stop)
+
+        # --- Warm model ---
+        warm_model = settings.first_model()
+
+        def preload():
+            in_use.add(warm_model)
+            if not model_cache.default_manager.is_loaded(warm_model, backend=backend):
+                model_cache.default_manager.preload(warm_model, backend=backend) # get() below shares the load
+
+        load_model = pipeline.model_loader(backend, threads, lambda message: on_progress(message, 0), models)
+
+        def get_model(name):
+            in_use.add(name)
+            return load_model(name)
+
+        # --- Watch ---
+        debouncer = Debouncer(settle_seconds)
+        rescan_requested = threading.Event()
+        if use_watchdog and watchdog_available():
+            source = WatchdogSource(root, debouncer.add, rescan_requested.set)
+        else:
+            source = PollingSource(root, debouncer.add, poll_seconds, scan_threads)
+        summary["watcher"] = source.name
+        metrics.default.event("watch_started", folder=str(root), model=model_name, backend=backend,
+                              formats=list(settings.formats), watcher=source.name)
+        on_progress(f"Watching {root} for new audio files ({source.name})...", 0)
+        preload()
+        if catch_up:
+            rescan = start_rescan()
+
+        queue = deque() # Settled files that need transcribing
+        last_work = time.monotonic()
+        worked = False # A file was processed since the start or the last unload (a preload alone isn't work)
+        while not should_stop():
+            # --- Rescan after dropped events or a folder moved in, once the backlog has drained ---
+            if rescan is None and (debouncer.overflowed or rescan_requested.is_set()) and not queue:
+                debouncer.overflowed = False
+                rescan_requested.clear()
+                summary["rescans"] += 1
+                rescan = start_rescan()
+            # The scan is only read as fast as files are transcribed
+            while rescan is not None and len(debouncer) + len(queue) < max_queued:
+                path = next(rescan, None)
+                if path is None:
+                    rescan = None
+                else:
+                    debouncer.add(Path(path))
+
+            for path in debouncer.settled(max_queued - len(queue)):
+                if needs_processing(path):
+                    queue.append(path)
+                else:
+                    summary["ignored"] += 1 # Already done, e.g. only touched
+            metrics.default.gauge("queue_depth", len(queue) + len(debouncer))
+
+            if not queue:
+                if worked and idle_unload_seconds and time.monotonic() - last_work >= idle_unload_seconds:
+                    unloaded = sum(model_cache.default_manager.unload(name, backend=backend) for name in in_use)
+                    in_use.clear()
+                    models.clear()
+                    worked = False
+                    if unloaded:
+                        summary["model_unloads"] += 1
+                        on_progress(f"Unloaded the model after {idle_unload_seconds:g} s without new files.", 100)
+                if len(debouncer) and not in_use:
+                    preload() # Loads while the new file settles
+                time.sleep(LOOP_SECONDS)
+                continue
+
+            # --- Transcribe one file ---
+            path = queue.popleft()
+            on_progress(f"Processing: {path.name} ({len(queue)} queued, {len(debouncer)} waiting to settle)", 0)
+            entry, error_message = pipeline.run_file(get_model, path, settings, cache, should_stop=should_stop)
+            last_work = time.monotonic()
+            worked = True
+            if entry["status"] == pipeline.STATUS_CANCELLED:
+                break # Not recorded, so the next catch-up scan finds it
+            if error_message:
+                on_error(error_message)
+            summary["succeeded" if entry["status"] == pipeline.STATUS_OK else "failed"] += 1
+            summary["cached"] += entry.get("cached", False)
+            if index:
+                pipeline.record_entry(index, entry, settings, model_name, hash_files)
+            metrics.default.file_done(entry)
+            on_file(entry)
+            done = summary["succeeded"] + summary["failed"]
+            on_progress(f"Finished: {path.name} ({done} files so far, {len(queue)} queued)", 100 if not queue else 0)
+
+        on_progress("Stopped watching.", 100)
+
+    except (pipeline.ModelLoadError, pipeline.PipelineError) as e:
+        summary["status"], summary["error"] = pipeline.RUN_FAILED, str(e)
+        on_error(str(e))
+    except Exception as e:
+        summary["status"] = pipeline.RUN_FAILED
+        summary["error"] = f"An unexpected error occurred in watch mode: {e}\n{traceback.format_exc()}"
+        on_error(summary["error"])
+    finally:
+        # --- Cleanup ---
+        scan_stop.set()
+        if rescan is not None:
+            rescan.close()
+        if source:
+            source.close()
+        if index:
+            index.close()
+        if not keep_model and settings and backends.is_installed(backend):
+            for name in {settings.model_name, settings.detect_model, *dict(settings.routes).values()} - {None}:
+                model_cache.default_manager.unload(name, backend=backend)
+        summary["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        metrics.default.event("watch_finished", status=summary["status"], succeeded=summary["succeeded"],
+                              failed=summary["failed"], cached=summary["cached"],
+                              elapsed_seconds=summary["elapsed_seconds"])
+    return summary
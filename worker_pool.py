@@ -0,0 +1,332 @@
+"""
+Multi-process transcription for pipeline.transcribe_folder(workers=N).
+
+Each worker process loads its own Whisper model and pulls files from a shared
+task queue. Files are handed out longest-first (by duration) so a single long
+file doesn't end up holding the tail of the batch, and a new task is only queued
+when a worker becomes free, which keeps that order. A Stop reaches the workers
+through an event they poll inside their current file (see runcontrol.py), and a
+pause clears a second event they wait on, so they keep their model loaded. Files arrive from the streaming
+scanner while the workers run, so the order is longest-first among the files
+found so far; durations are probed in the background as files are found.
+"""
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import metrics
+import pipeline
+import result_cache
+
+# Messages sent from worker processes back to the parent
+MSG_READY = "ready"
+MSG_SETUP_ERROR = "setup_error"
+MSG_STARTED = "started"
+MSG_CHUNK = "chunk"
+MSG_DONE = "done"
+
+# ffmpeg prints e.g. "Duration: 00:03:25.47, start: ..." for its input
+DURATION_REGEX = re.compile(r'Duration:\s*(\d+):(\d{2}):(\d{2}(?:\.\d+)?)')
+
+# How often the parent checks for new files, Stop and crashed workers while waiting for results
+POLL_INTERVAL_SECONDS = 0.25
+
+
+def probe_duration(audio_file: Path):
+    """Returns the duration of audio_file in seconds using ffmpeg, or None if unknown."""
+    try:
+        completed = subprocess.run(["ffmpeg", "-hide_banner", "-nostdin", "-i", str(audio_file)],
+                                   capture_output=True, text=True, errors="replace", timeout=60)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    # ffmpeg exits non-zero because no output file is given; the header is still printed
+    match = DURATION_REGEX.search(completed.stderr)
+    if not match:
+        return None
+    h, m, s = match.groups()
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+
+class LongestFirstQueue:
+    """
+    Collects files from an iterable on a background thread, probes their durations
+    in parallel and hands them out longest-first. Files whose duration can't be
+    probed go after the ones that could.
+    """
+
+    def __init__(self, files, probe_threads: int = 8):
+        self._heap = []
+        self._order = itertools.count() # Tie-breaker: keep discovery order for equal durations
+        self._changed = threading.Condition()
+        self._probing = 0
+        self._feeding = True
+        self.durations = {} # path -> duration in seconds or None
+        self._executor = ThreadPoolExecutor(max_workers=probe_threads, thread_name_prefix="probe")
+        self._feeder = threading.Thread(target=self._feed, args=(files,), name="probe-feeder", daemon=True)
+        self._feeder.start()
+
+    def _feed(self, files):
+        try:
+            for path in files:
+                with self._changed:
+                    self._probing += 1
+                try:
+                    self._executor.submit(self._probe, path)
+                except RuntimeError: # Executor shut down by close()
+                    break
+        finally:
+            with self._changed:
+                self._feeding = False
+                self._changed.notify_all()
+
+    def _probe(self, path):
+        duration = probe_duration(path)
+        with self._changed:
+            self.durations[path] = duration
+            sort_key = -duration if duration is not None else 1.0
+            heapq.heappush(self._heap, (sort_key, next(self._order), path))
+            self._probing -= 1
+            self._changed.notify_all()
+
+    def pop(self):
+        """Longest file available right now, or None."""
+        with self._changed:
+            return heapq.heappop(self._heap)[2] if self._heap else None
+
+    @property
+    def exhausted(self) -> bool:
+        """True once every file has been found, probed and handed out."""
+        with self._changed:
+            return not self._feeding and self._probing == 0 and not self._heap
+
+    def wait(self, timeout=None) -> bool:
+        """Waits until a file is available or the queue is exhausted; returns True if a file is available."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._heap or (not self._feeding and self._probing == 0), timeout)
+            return bool(self._heap)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def default_threads(workers: int) -> int:
+    """Splits the cores between workers so N torch processes don't oversubscribe the CPU."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def _worker_main(worker_id, settings, cache_dir, threads, task_queue, result_queue, stop_event, running_event):
+    """Entry point of a worker process: load the model once, then process tasks until a None sentinel."""
+    def should_stop():
+        running_event.wait() # Cleared while the run is paused
+        return stop_event.is_set()
+
+    cache = result_cache.ResultCache(cache_dir) if cache_dir else None
+    # With the language pre-pass (see routing.py) every file needs the detection model first,
+    # and the routed models load the first time a file needs them
+    get_model = pipeline.model_loader(settings.backend, threads)
+    try:
+        load_started = time.perf_counter()
+        get_model(settings.first_model())
+    except pipeline.ModelLoadError as e:
+        result_queue.put((MSG_SETUP_ERROR, worker_id, f"Worker {worker_id + 1}: {e}"))
+        return
+    result_queue.put((MSG_READY, worker_id, time.perf_counter() - load_started)) # Payload: model load seconds
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        result_queue.put((MSG_STARTED, worker_id, task))
+
+        def on_chunk(done, total, task=task):
+            result_queue.put((MSG_CHUNK, worker_id, (task, done, total)))
+
+        try:
+            entry, error_message = pipeline.run_file(get_model, Path(task), settings, cache,
+                                                     on_chunk=on_chunk, should_stop=should_stop)
+        except pipeline.ModelLoadError as e: # A routed model, loaded the first time a file needed it
+            result_queue.put((MSG_SETUP_ERROR, worker_id, f"Worker {worker_id + 1}: {e}"))
+            return
+        entry["worker"] = worker_id
+        result_queue.put((MSG_DONE, worker_id, (entry, error_message)))
+
+
+def process_files(files, settings, *, cache_dir=None, workers: int, threads=None, on_progress=None, on_error=None,
+                  should_stop=None, control=None):
+    """
+    Transcribes files (any iterable, e.g. a scanner.BackgroundScan) with a pool of
+    worker processes, using pipeline.FileSettings settings.
+
+    Yields one summary entry per finished file (in completion order), like the
+    sequential path in pipeline.transcribe_folder(). cache_dir is the result cache
+    shared by the workers (None disables it); workers still load their model up
+    front, since a pool only pays off when most files need transcribing.
+    With a runcontrol.RunControl, pausing it also pauses the workers inside their current
+    file and cancelling it stops them there; should_stop alone stops them after it.
+
+    Raises:
+        pipeline.ModelLoadError: If no worker could load the model, or every worker failed to load a routed one.
+    """
+    model_name = settings.model_name
+    on_progress = on_progress or (lambda message, percent: None)
+    on_error = on_error or (lambda message: None)
+    if control is not None:
+        should_stop = lambda: control.cancelled # The parent keeps polling while paused
+    should_stop = should_stop or (lambda: False)
+    threads = threads or default_threads(workers)
+    candidates = LongestFirstQueue(files)
+
+    # Don't start any process if the scan finds nothing to do
+    while not candidates.wait(timeout=POLL_INTERVAL_SECONDS):
+        if candidates.exhausted or should_stop():
+            candidates.close()
+            return
+
+    # 'spawn' everywhere: forking a process that already imported torch isn't safe
+    ctx = multiprocessing.get_context("spawn")
+    task_queue = ctx.Queue()
+    result_queue = ctx.Queue()
+    stop_event = ctx.Event() # Lets workers stop in the middle of a file
+    running_event = ctx.Event() # Cleared to pause the workers
+    running_event.set()
+    processes = {
+        worker_id: ctx.Process(target=_worker_main, daemon=True,
+                               args=(worker_id, settings, str(cache_dir) if cache_dir else None, threads,
+                                     task_queue, result_queue, stop_event, running_event))
+        for worker_id in range(workers)
+    }
+    on_progress(f"Starting {workers} worker processes (model '{model_name}', {threads} threads each)...", 0)
+    for process in processes.values():
+        process.start()
+
+    alive = set(processes)
+    ready = set()
+    idle = 0 # Ready workers without a task
+    in_flight = {} # worker_id -> path
+    outstanding = 0 # Tasks queued but not reported done yet
+    done = 0
+    model_loaded = False # At least one worker got its model loaded
+    setup_errors = []
+
+    def counter():
+        found = max(getattr(files, "found", 0), done + outstanding)
+        scanning = not getattr(files, "done", True)
+        return f"{done}/{found}" + ("+" if scanning else ""), int((done / found) * 100) if found else 0
+
+    def dispatch():
+        nonlocal idle, outstanding
+        while idle > 0 and not should_stop() and running_event.is_set():
+            path = candidates.pop()
+            if path is None:
+                return
+            task_queue.put(str(path))
+            idle -= 1
+            outstanding += 1
+
+    def failed_entry(path, message):
+        return {"path": str(path), "status": pipeline.STATUS_ERROR, "lrc": None, "outputs": [], "cached": False,
+                "error": message, "elapsed_seconds": 0.0, "duration_seconds": candidates.durations.get(path)}
+
+    try:
+        while alive:
+            if should_stop():
+                stop_event.set()
+            if control is not None and control.paused and not should_stop():
+                running_event.clear() # Workers wait at their next check; no new tasks are handed out
+            else:
+                running_event.set()
+            dispatch() # Also picks up files found since the last result
+            if ready and outstanding == 0 and (candidates.exhausted or should_stop()):
+                break # Everything dispatched has been reported back
+
+            try:
+                kind, worker_id, payload = result_queue.get(timeout=POLL_INTERVAL_SECONDS)
+            except queue.Empty:
+                # --- Detect crashed workers (e.g. killed by the OOM killer) ---
+                for worker_id in [w for w in alive if not processes[w].is_alive()]:
+                    alive.discard(worker_id)
+                    if worker_id not in ready and not model_loaded:
+                        setup_errors.append(f"Worker {worker_id + 1} exited before loading the model.")
+                    if worker_id in ready and worker_id not in in_flight:
+                        idle -= 1
+                    ready.discard(worker_id)
+                    if worker_id in in_flight:
+                        path = in_flight.pop(worker_id)
+                        outstanding -= 1
+                        done += 1
+                        message = (f"Worker {worker_id + 1} died while processing {path.name} "
+                                   f"(exit code {processes[worker_id].exitcode})")
+                        on_error(message)
+                        yield failed_entry(path, message)
+                continue
+
+            if kind == MSG_READY:
+                metrics.default.span("model_load", payload, worker=worker_id, model=settings.first_model(),
+                                     backend=settings.backend)
+                ready.add(worker_id)
+                idle += 1
+                model_loaded = True
+            elif kind == MSG_SETUP_ERROR:
+                alive.discard(worker_id)
+                ready.discard(worker_id)
+                setup_errors.append(payload)
+                if alive:
+                    on_error(f"Warning: {payload}") # Other workers keep going
+                if worker_id in in_flight:
+                    outstanding -= 1
+                    done += 1
+                    yield failed_entry(in_flight.pop(worker_id), payload)
+            elif kind == MSG_STARTED:
+                path = Path(payload)
+                in_flight[worker_id] = path
+                text, percent = counter()
+                on_progress(f"Processing: {path.name} (worker {worker_id + 1}, {text})", percent)
+            elif kind == MSG_CHUNK:
+                path, chunk, chunks = payload
+                text, _ = counter()
+                found = max(getattr(files, "found", 0), done + outstanding)
+                on_progress(f"Processing: {Path(path).name}, chunk {chunk}/{chunks} (worker {worker_id + 1}, {text})",
+                            int((done + chunk / chunks) / found * 100) if found else 0)
+            elif kind == MSG_DONE:
+                entry, error_message = payload
+                in_flight.pop(worker_id, None)
+                idle += 1
+                outstanding -= 1
+                done += 1
+                if entry.get("duration_seconds") is None: # Decoding failed; fall back to the probe
+                    entry["duration_seconds"] = candidates.durations.get(Path(entry["path"]))
+                dispatch() # Keep the freed worker busy while the entry is handled
+                if error_message:
+                    on_error(error_message)
+                yield entry
+
+        if setup_errors and (not model_loaded or not alive):
+            raise pipeline.ModelLoadError(setup_errors[-1]) # Like the sequential path, a model that can't load ends the run
+        if not alive and not should_stop():
+            # Every worker died: report what is left so the summary stays complete
+            while not candidates.exhausted:
+                candidates.wait()
+                path = candidates.pop()
+                if path is not None:
+                    yield failed_entry(path, "Not processed: all worker processes exited.")
+
+    finally:
+        # --- Shut the pool down ---
+        candidates.close()
+        for _ in alive:
+            task_queue.put(None)
+        for process in processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        task_queue.close()
+        result_queue.close()